@@ -0,0 +1,189 @@
+"""
+Compare training checkpoints on held-out quality and inference cost, then pick one to serve.
+
+    cd backend/LLM_model_trainig
+    python evaluate_checkpoints.py                     # every checkpoint-*/ and final/
+    python evaluate_checkpoints.py --ppl-tolerance 0.10 --no-select
+
+Each adapter is loaded onto the base model and run over the examples
+prepare_dataset.py holds out of training:
+
+  - loss / perplexity of the reference description given its prompt
+  - generation latency (p50 / p95) through the serving code path
+    (TorchCustomBackend.generate_batch: same sampling params, stop sequences)
+  - generated length in tokens (p50 / p95) and how often it ran into
+    max_new_tokens, since long rambles cost latency on every request
+
+The table goes to sprintsync-model/evaluation.md (and .json). Unless
+--no-select is given, the fastest checkpoint whose perplexity is within
+--ppl-tolerance of the best one is written to sprintsync-model/serving.json,
+which the torch-custom backend reads at startup.
+"""
+import json
+import math
+import os
+import sys
+import time
+from typing import Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prepare_dataset import DATA_PATH, format_example, load_examples  # noqa: E402
+from services.ai_cache import model_fingerprint  # noqa: E402
+
+BASE_MODEL = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+MODEL_DIR = "./sprintsync-model"
+PPL_TOLERANCE = 0.05  # perplexity a faster checkpoint may give up, relative to the best
+
+
+def find_checkpoints(model_dir: str = MODEL_DIR) -> list[str]:
+    """Adapter directories under `model_dir`, in training order, final last."""
+    names = [
+        name for name in os.listdir(model_dir)
+        if os.path.exists(os.path.join(model_dir, name, "adapter_config.json"))
+    ]
+
+    def training_order(name: str) -> tuple:
+        steps = int(name.rsplit("-", 1)[1]) if name.startswith("checkpoint-") else math.inf
+        return steps, name
+
+    return sorted(names, key=training_order)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def evaluate_model(model, tokenizer, examples: list[dict]) -> dict:
+    """Quality and cost metrics of one loaded model on `examples`."""
+    import torch
+
+    from services.backends.torch_custom import GENERATION_PARAMS, TorchCustomBackend
+
+    # Loss over the description tokens only: the prompt is given
+    losses, counts = [], []
+    model.eval()
+    with torch.no_grad():
+        for example in examples:
+            prompt = tokenizer(f"{example['prompt']}\n\nDescription:")["input_ids"]
+            ids = tokenizer(format_example(example), return_tensors="pt")["input_ids"]
+            labels = ids.clone()
+            labels[:, : len(prompt)] = -100
+            losses.append(model(input_ids=ids, labels=labels).loss.item())
+            counts.append(int((labels[:, 1:] != -100).sum()))  # predicted positions
+    loss = sum(l * n for l, n in zip(losses, counts)) / max(1, sum(counts))
+
+    backend = TorchCustomBackend()
+    backend.install(model, tokenizer)
+    latencies, lengths = [], []
+    for example in examples:
+        title = example["prompt"].removeprefix("Task title:").strip()
+        start = time.perf_counter()
+        text = backend.generate_batch([title])[0]
+        latencies.append(time.perf_counter() - start)
+        lengths.append(len(tokenizer(text, add_special_tokens=False)["input_ids"]))
+
+    cap = GENERATION_PARAMS["max_new_tokens"]
+    return {
+        "examples": len(examples),
+        "loss": round(loss, 4),
+        "perplexity": round(math.exp(loss), 2),
+        "latency_p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "length_p50": _percentile(lengths, 50),
+        "length_p95": _percentile(lengths, 95),
+        # Generation stops at max_new_tokens mid-sentence; the row costs the most
+        "hit_max_tokens": round(sum(n >= cap - 1 for n in lengths) / len(lengths), 2),
+    }
+
+
+def choose_checkpoint(results: dict[str, dict], tolerance: float = PPL_TOLERANCE) -> Optional[str]:
+    """Fastest (p50 latency) checkpoint whose perplexity is within `tolerance` of the best."""
+    scored = {name: r for name, r in results.items() if "perplexity" in r}
+    if not scored:
+        return None
+    best = min(r["perplexity"] for r in scored.values())
+    eligible = [name for name, r in scored.items() if r["perplexity"] <= best * (1 + tolerance)]
+    return min(eligible, key=lambda name: (scored[name]["latency_p50_ms"], scored[name]["perplexity"]))
+
+
+def write_report(results: dict[str, dict], chosen: Optional[str], model_dir: str = MODEL_DIR) -> str:
+    """Markdown comparison table + JSON next to the checkpoints; returns the table."""
+    columns = ["perplexity", "loss", "latency_p50_ms", "latency_p95_ms", "length_p50", "length_p95", "hit_max_tokens"]
+    lines = [
+        "| checkpoint | " + " | ".join(columns) + " |",
+        "|---" * (len(columns) + 1) + "|",
+    ]
+    for name, r in results.items():
+        label = f"**{name}** (serving)" if name == chosen else name
+        cells = [str(r.get(c, "-")) for c in columns] if "error" not in r else [f"failed: {r['error']}"] + [""] * (len(columns) - 1)
+        lines.append(f"| {label} | " + " | ".join(cells) + " |")
+    table = "\n".join(lines) + "\n"
+
+    with open(os.path.join(model_dir, "evaluation.md"), "w") as f:
+        f.write(table)
+    with open(os.path.join(model_dir, "evaluation.json"), "w") as f:
+        json.dump({"results": results, "chosen": chosen}, f, indent=2)
+    return table
+
+
+def mark_serving(name: str, metrics: dict, model_dir: str = MODEL_DIR, base_model: str = BASE_MODEL) -> str:
+    """Point the torch-custom backend at checkpoint `name` (see torch_custom.serving_adapter_path)."""
+    path = os.path.join(model_dir, "serving.json")
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "checkpoint": name,
+                "adapter_fingerprint": model_fingerprint(os.path.join(model_dir, name), base_model),
+                "selected_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "metrics": metrics,
+            },
+            f,
+            indent=2,
+        )
+    return path
+
+
+def _load_checkpoint(base, path: str):
+    from peft import PeftModel
+    from transformers import AutoTokenizer
+
+    model = PeftModel.from_pretrained(base, path)
+    return model, AutoTokenizer.from_pretrained(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from transformers import AutoModelForCausalLM
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--ppl-tolerance", type=float, default=PPL_TOLERANCE)
+    parser.add_argument("--no-select", action="store_true", help="only write the table, keep serving.json")
+    args = parser.parse_args()
+
+    examples = load_examples(args.data, held_out=True)
+    print(f"Evaluating on {len(examples)} held-out examples")
+    results = {}
+    for name in find_checkpoints(args.model_dir):
+        print(f"Evaluating {name}...")
+        try:
+            # A fresh base per checkpoint: PeftModel wraps the modules in place
+            base = AutoModelForCausalLM.from_pretrained(BASE_MODEL, low_cpu_mem_usage=True)
+            model, tokenizer = _load_checkpoint(base, os.path.join(args.model_dir, name))
+            results[name] = evaluate_model(model, tokenizer, examples)
+        except Exception as e:
+            print(f"  skipped: {e}")
+            results[name] = {"error": str(e).splitlines()[0][:80]}
+
+    chosen = choose_checkpoint(results, args.ppl_tolerance)
+    print(write_report(results, chosen, args.model_dir))
+    if chosen and not args.no_select:
+        print(f"Serving {chosen}: {mark_serving(chosen, results[chosen], args.model_dir)}")
+    elif not chosen:
+        print("No checkpoint could be evaluated; serving.json left unchanged.")
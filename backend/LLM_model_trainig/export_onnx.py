@@ -0,0 +1,141 @@
+"""
+Export the fine-tuned model to ONNX for the onnx backend (AI_BACKEND=onnx).
+
+    cd backend/LLM_model_trainig
+    python export_onnx.py              # merged/ (or served adapter + base) -> onnx/
+
+The adapter is the one torch-custom serves (serving.json, else final/);
+merged/ is only used when it was merged from that same adapter.
+The graph is one decoder step with explicit KV-cache inputs/outputs
+(past.N.key / past.N.value -> present.N.key / present.N.value), so the
+server feeds the whole prompt once and then one token per step.
+export_info.json records the cache layout and which adapter the export
+came from. Needs `pip install onnx onnxruntime`.
+"""
+import json
+import os
+import sys
+from typing import Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.ai_cache import model_fingerprint  # noqa: E402
+from services.backends.torch_custom import serving_adapter_path  # noqa: E402
+
+BASE_MODEL = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+MODEL_DIR = "./sprintsync-model"
+MERGED_PATH = "./sprintsync-model/merged"
+OUTPUT_PATH = "./sprintsync-model/onnx"
+
+
+def _kv_layout(config) -> tuple[int, int, int]:
+    head_dim = getattr(config, "head_dim", None) or config.hidden_size // config.num_attention_heads
+    kv_heads = getattr(config, "num_key_value_heads", None) or config.num_attention_heads
+    return config.num_hidden_layers, kv_heads, head_dim
+
+
+def export_onnx(model, tokenizer, output_path: str, model_id: str, adapter_path: Optional[str] = None) -> str:
+    """Trace one decoder step of `model` (with KV cache) into output_path/model.onnx."""
+    import torch
+    from transformers import DynamicCache
+
+    layers, kv_heads, head_dim = _kv_layout(model.config)
+
+    class DecoderStep(torch.nn.Module):
+        def __init__(self, lm):
+            super().__init__()
+            self.lm = lm
+
+        def forward(self, input_ids, attention_mask, position_ids, *past):
+            cache = DynamicCache()
+            for i in range(layers):
+                cache.update(past[2 * i], past[2 * i + 1], i)
+            out = self.lm(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                position_ids=position_ids,
+                past_key_values=cache,
+                use_cache=True,
+            )
+            present = []
+            for layer in out.past_key_values.layers:
+                present += [layer.keys, layer.values]
+            return (out.logits[:, -1, :], *present)
+
+    past_names = [f"past.{i}.{kv}" for i in range(layers) for kv in ("key", "value")]
+    present_names = [name.replace("past", "present") for name in past_names]
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "seq"},
+        "attention_mask": {0: "batch", 1: "total"},
+        "position_ids": {0: "batch", 1: "seq"},
+        "logits": {0: "batch"},
+        **{name: {0: "batch", 2: "past"} for name in past_names},
+        **{name: {0: "batch", 2: "total"} for name in present_names},
+    }
+
+    # Trace with a non-empty cache so the concatenating code path is recorded
+    batch, seq, past_len = 2, 3, 2
+    sample = (
+        torch.ones(batch, seq, dtype=torch.long),
+        torch.ones(batch, past_len + seq, dtype=torch.long),
+        torch.arange(past_len, past_len + seq).repeat(batch, 1),
+        *[torch.zeros(batch, kv_heads, past_len, head_dim) for _ in past_names],
+    )
+    os.makedirs(output_path, exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            DecoderStep(model.float().eval()),
+            sample,
+            os.path.join(output_path, "model.onnx"),
+            input_names=["input_ids", "attention_mask", "position_ids", *past_names],
+            output_names=["logits", *present_names],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(output_path)
+
+    with open(os.path.join(output_path, "export_info.json"), "w") as f:
+        json.dump(
+            {
+                "adapter_fingerprint": model_id,
+                "adapter_path": adapter_path and os.path.abspath(adapter_path),
+                "num_layers": layers,
+                "num_kv_heads": kv_heads,
+                "head_dim": head_dim,
+                "eos_token_id": tokenizer.eos_token_id,
+            },
+            f,
+            indent=2,
+        )
+    return output_path
+
+
+if __name__ == "__main__":
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    adapter_path = serving_adapter_path(MODEL_DIR)
+    model_id = model_fingerprint(adapter_path, BASE_MODEL)
+    merge_info = os.path.join(MERGED_PATH, "merge_info.json")
+    merged = {}
+    if os.path.exists(merge_info):
+        with open(merge_info) as f:
+            merged = json.load(f)
+
+    # A merge is reused when it came from the served adapter, or when it was shipped without one
+    if merged and (merged["adapter_fingerprint"] == model_id or not os.path.isdir(adapter_path)):
+        model_id, adapter_path = merged["adapter_fingerprint"], merged.get("adapter_path", adapter_path)
+        print(f"Exporting {MERGED_PATH} (merged from {adapter_path})...")
+        model = AutoModelForCausalLM.from_pretrained(MERGED_PATH, low_cpu_mem_usage=True)
+        tokenizer = AutoTokenizer.from_pretrained(MERGED_PATH)
+    else:
+        from peft import PeftModel
+
+        print(f"Exporting {adapter_path} merged into {BASE_MODEL}...")
+        base = AutoModelForCausalLM.from_pretrained(BASE_MODEL, low_cpu_mem_usage=True)
+        model = PeftModel.from_pretrained(base, adapter_path).merge_and_unload()
+        tokenizer = AutoTokenizer.from_pretrained(adapter_path)
+
+    export_onnx(model, tokenizer, OUTPUT_PATH, model_id, adapter_path)
+    print(f"Done! ONNX model saved to {OUTPUT_PATH}")
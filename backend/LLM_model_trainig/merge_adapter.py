@@ -0,0 +1,58 @@
+"""
+Merge the LoRA adapter into the base weights and export one safetensors artifact.
+
+    cd backend/LLM_model_trainig
+    python merge_adapter.py            # served adapter -> merged/
+
+The adapter is the one the server would load: the checkpoint chosen in
+serving.json by evaluate_checkpoints.py, else final/. The server loads
+merged/ (memory-mapped, low-memory) instead of building base + PeftModel
+at every start, and skips the adapter layers per token. merge_info.json
+records which adapter the artifact came from so a stale merge is ignored
+after re-training or picking another checkpoint.
+"""
+import json
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.ai_cache import model_fingerprint  # noqa: E402
+from services.backends.torch_custom import serving_adapter_path  # noqa: E402
+
+BASE_MODEL = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+MODEL_DIR = "./sprintsync-model"
+OUTPUT_PATH = "./sprintsync-model/merged"
+
+
+def merge_adapter(base_model: str, adapter_path: str, output_path: str) -> str:
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    from peft import PeftModel
+
+    base = AutoModelForCausalLM.from_pretrained(base_model, low_cpu_mem_usage=True)
+    model = PeftModel.from_pretrained(base, adapter_path).merge_and_unload()
+    model.eval()
+
+    # One shard so the server maps a single file
+    model.save_pretrained(output_path, safe_serialization=True, max_shard_size="20GB")
+    AutoTokenizer.from_pretrained(adapter_path).save_pretrained(output_path)
+
+    with open(os.path.join(output_path, "merge_info.json"), "w") as f:
+        json.dump(
+            {
+                "base_model": base_model,
+                "adapter_path": os.path.abspath(adapter_path),
+                "adapter_fingerprint": model_fingerprint(adapter_path, base_model),
+            },
+            f,
+            indent=2,
+        )
+    return output_path
+
+
+if __name__ == "__main__":
+    adapter_path = serving_adapter_path(MODEL_DIR)
+    print(f"Merging {adapter_path} into {BASE_MODEL}...")
+    merge_adapter(BASE_MODEL, adapter_path, OUTPUT_PATH)
+    print(f"Done! Merged model saved to {OUTPUT_PATH}")
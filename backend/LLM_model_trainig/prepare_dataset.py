@@ -0,0 +1,150 @@
+"""
+Tokenize training_data.jsonl once and pack it into fixed-length sequences.
+
+    cd backend/LLM_model_trainig
+    python prepare_dataset.py                  # --seq-len 512 by default
+
+Examples are split deterministically by a hash of their prompt: about
+HOLDOUT_PERCENT of them are held out for evaluate_checkpoints.py and never
+trained on, and the split stays put as the file grows. The rest are
+formatted exactly as train_model.py always has, tokenized in
+one batch, joined with the eos token and cut into rows of `seq_len`
+tokens, so no step is spent on padding. The rows are saved as a .npy file
+under dataset-cache/ named after a hash of the tokenizer, the data file and
+the packing settings; train_model.py memory-maps it and only re-tokenizes
+when one of those changes.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+BASE_MODEL = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+DATA_PATH = "./training_data.jsonl"
+CACHE_DIR = "./dataset-cache"
+SEQ_LEN = 512
+# Bump when the text format, split or packing changes so old caches are not reused
+FORMAT_VERSION = 2
+HOLDOUT_PERCENT = 20
+IGNORE_INDEX = -100  # label value the loss skips
+
+
+def format_example(example: dict) -> str:
+    return f"{example['prompt']}\n\nDescription: {example['completion']}<|endoftext|>"
+
+
+def is_held_out(example: dict) -> bool:
+    digest = hashlib.sha256(example["prompt"].encode()).digest()
+    return int.from_bytes(digest[:4], "big") % 100 < HOLDOUT_PERCENT
+
+
+def load_examples(data_path: str = DATA_PATH, held_out: bool = False) -> list[dict]:
+    """The training (default) or held-out examples of a jsonl file."""
+    with open(data_path) as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+    return [example for example in examples if is_held_out(example) == held_out]
+
+
+def tokenizer_fingerprint(tokenizer) -> str:
+    """Hash of the vocabulary and merges, so a changed tokenizer gets a new cache."""
+    if getattr(tokenizer, "is_fast", False):
+        spec = tokenizer.backend_tokenizer.to_str()
+    else:
+        spec = json.dumps(sorted(tokenizer.get_vocab().items()))
+    return hashlib.sha256(f"{spec}|{tokenizer.eos_token_id}".encode()).hexdigest()[:16]
+
+
+def cache_key(tokenizer, data_path: str, seq_len: int) -> str:
+    digest = hashlib.sha256()
+    with open(data_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(f"|{tokenizer_fingerprint(tokenizer)}|{seq_len}|{FORMAT_VERSION}".encode())
+    return digest.hexdigest()[:16]
+
+
+def pack(token_lists: list[list[int]], eos_token_id: int, seq_len: int) -> tuple[np.ndarray, int]:
+    """
+    Concatenate examples (each followed by eos) and cut into `seq_len` rows.
+
+    The last row is padded with eos; returns (rows, real token count) so
+    the padding can be masked out of the loss.
+    """
+    stream = [token for tokens in token_lists for token in (*tokens, eos_token_id)]
+    rows = max(1, -(-len(stream) // seq_len))
+    dtype = np.uint16 if max(stream) < 2**16 else np.int32  # halves the cache for 32k vocabularies
+    packed = np.full(rows * seq_len, eos_token_id, dtype=dtype)
+    packed[: len(stream)] = stream
+    return packed.reshape(rows, seq_len), len(stream)
+
+
+def prepare_dataset(
+    tokenizer, data_path: str = DATA_PATH, seq_len: int = SEQ_LEN, cache_dir: str = CACHE_DIR
+) -> str:
+    """Path of the packed .npy for this tokenizer + data, building it if missing."""
+    key = cache_key(tokenizer, data_path, seq_len)
+    path = os.path.join(cache_dir, f"packed-{key}.npy")
+    if os.path.exists(path):
+        print(f"Using packed dataset {path}")
+        return path
+
+    examples = load_examples(data_path)
+    texts = [format_example(example) for example in examples]
+    token_lists = tokenizer(texts, add_special_tokens=True)["input_ids"]
+    rows, tokens = pack(token_lists, tokenizer.eos_token_id, seq_len)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write then rename, so an interrupted run never leaves a truncated cache
+    tmp = f"{path}.tmp.npy"
+    np.save(tmp, rows)
+    with open(os.path.join(cache_dir, f"packed-{key}.json"), "w") as f:
+        json.dump({"examples": len(examples), "tokens": tokens, "rows": len(rows), "seq_len": seq_len}, f)
+    os.replace(tmp, path)
+    print(f"Packed {len(examples)} examples ({tokens} tokens) into {len(rows)} x {seq_len} rows: {path}")
+    return path
+
+
+class PackedDataset:
+    """
+    Rows of a packed .npy, read lazily through a memory map.
+
+    Items are what a causal-LM Trainer expects; padding at the end of the
+    last row is masked out of attention and labels.
+    """
+
+    def __init__(self, path: str):
+        self.rows = np.load(path, mmap_mode="r")
+        with open(path[: -len(".npy")] + ".json") as f:
+            self.tokens = json.load(f)["tokens"]
+        self.seq_len = self.rows.shape[1]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def real_tokens(self, index: int) -> int:
+        return min(self.seq_len, max(0, self.tokens - index * self.seq_len))
+
+    def __getitem__(self, index: int) -> dict:
+        import torch
+
+        input_ids = torch.from_numpy(self.rows[index].astype(np.int64))
+        attention_mask = torch.zeros(self.seq_len, dtype=torch.long)
+        attention_mask[: self.real_tokens(index)] = 1
+        labels = input_ids.masked_fill(attention_mask == 0, IGNORE_INDEX)
+        return {"input_ids": input_ids, "attention_mask": attention_mask, "labels": labels}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from transformers import AutoTokenizer
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokenizer", default=BASE_MODEL)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--seq-len", type=int, default=SEQ_LEN)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    prepare_dataset(AutoTokenizer.from_pretrained(args.tokenizer), args.data, args.seq_len, args.cache_dir)
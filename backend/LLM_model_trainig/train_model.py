@@ -1,145 +1,108 @@
-# from datasets import load_dataset
-# from transformers import (
-#     AutoTokenizer,
-#     AutoModelForCausalLM,
-#     TrainingArguments,
-# )
-# from trl import SFTTrainer
-# from peft import LoraConfig
-# import torch
-
-# # ── 1. Load your training data ─────────────────────────────────────────
-# dataset = load_dataset("json", data_files="training_data.jsonl", split="train")
-
-# print(f"Loaded {len(dataset)} training examples")
-
-# # ── 2. Load base model ─────────────────────────────────────────────────
-# MODEL_NAME = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"  # small, fast, free
-
-# tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-# tokenizer.pad_token = tokenizer.eos_token
-
-# model = AutoModelForCausalLM.from_pretrained(
-#     MODEL_NAME,
-#     dtype=torch.float32,         # ← correct parameter
-#     device_map="auto",
-# )
-
-# # ── 3. LoRA config — fine-tunes only a small part of the model ─────────
-# # This is the magic that makes fine-tuning possible on a normal laptop
-# # Instead of updating all 1 billion parameters, we only update ~1 million
-# lora_config = LoraConfig(
-#     r=8,               # rank — how many parameters to train
-#     lora_alpha=16,     # scaling factor
-#     target_modules=["q_proj", "v_proj"],  # which layers to tune
-#     lora_dropout=0.05,
-#     bias="none",
-#     task_type="CAUSAL_LM",
-# )
-
-# # ── 4. Format training examples ────────────────────────────────────────
-# # NEW
-# def format_example(example):
-#     return {
-#         "text": f"{example['prompt']}\n\nDescription: {example['completion']}<|endoftext|>"
-#     }
-
-# dataset = dataset.map(format_example, remove_columns=["prompt", "completion"])
-
-# # ── 5. Training settings ───────────────────────────────────────────────
-# training_args = TrainingArguments(
-#     output_dir="./sprintsync-model",   # where to save
-#     num_train_epochs=10,               # how many times to see all data
-#     per_device_train_batch_size=2,     # examples per step
-#     learning_rate=2e-4,                # how fast to learn
-#     logging_steps=10,                  # print progress every 10 steps
-#     save_steps=50,                     # save checkpoint every 50 steps
-#     warmup_steps=20,
-#     fp16=False,                        # set True if you have GPU
-# )
-
-# # ── 6. Train! ──────────────────────────────────────────────────────────
-# trainer = SFTTrainer(
-#     model=model,
-#     processing_class=tokenizer,
-#     train_dataset=dataset,
-#     peft_config=lora_config,
-#     args=training_args,
-# )
-
-# print("Starting training...")
-# trainer.train()
-
-# # ── 7. Save the trained model ──────────────────────────────────────────
-# trainer.save_model("./sprintsync-model/final")
-# tokenizer.save_pretrained("./sprintsync-model/final")
-# print("Model saved to ./sprintsync-model/final")
-
-from datasets import load_dataset
-from transformers import AutoTokenizer, AutoModelForCausalLM, TrainingArguments
-from trl import SFTTrainer
-from peft import LoraConfig
-import torch
-
-# 1. Load data
-dataset = load_dataset("json", data_files="training_data.jsonl", split="train")
-print(f"Loaded {len(dataset)} training examples")
-
-# 2. Load base model
-MODEL_NAME = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+"""
+LoRA fine-tune of TinyLlama on the packed task-description dataset.
+
+    cd backend/LLM_model_trainig
+    python train_model.py
+
+Tokenization happens once in prepare_dataset.py; this script memory-maps
+the packed rows it produced (re-packing only when the data or tokenizer
+changed) and prints tokens/sec for every optimizer step.
+"""
+import math
+import os
+import sys
+import time
+
+from transformers import TrainerCallback
 
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-tokenizer.pad_token = tokenizer.eos_token
-
-model = AutoModelForCausalLM.from_pretrained(
-    MODEL_NAME,
-    device_map="auto",
-)
-
-# 3. LoRA config
-lora_config = LoraConfig(
-    r=8,
-    lora_alpha=16,
-    target_modules=["q_proj", "v_proj"],
-    lora_dropout=0.05,
-    bias="none",
-    task_type="CAUSAL_LM",
-)
-
-# 4. Format dataset
-def format_example(example):
-    return {
-        "text": f"{example['prompt']}\n\nDescription: {example['completion']}<|endoftext|>"
-    }
-
-dataset = dataset.map(format_example, remove_columns=["prompt", "completion"])
-
-# 5. Training args
-training_args = TrainingArguments(
-    output_dir="./sprintsync-model",
-    num_train_epochs=10,
-    per_device_train_batch_size=2,
-    learning_rate=2e-4,
-    logging_steps=10,
-    save_steps=50,
-    warmup_steps=20,
-    fp16=False,
-)
-
-# 6. Trainer
-trainer = SFTTrainer(
-    model=model,
-    processing_class=tokenizer,
-    train_dataset=dataset,
-    peft_config=lora_config,
-    args=training_args,
-)
-
-# 7. Train
-print("Starting training...")
-trainer.train()
-
-# 8. Save
-trainer.save_model("./sprintsync-model/final")
-tokenizer.save_pretrained("./sprintsync-model/final")
-print("Done! Model saved to ./sprintsync-model/final")
\ No newline at end of file
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from prepare_dataset import PackedDataset, prepare_dataset  # noqa: E402
+
+MODEL_NAME = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+SEQ_LEN = 512
+BATCH_SIZE = 1  # packed rows per step; one row holds several examples
+EPOCHS = 10
+
+
+class TokensPerSecondCallback(TrainerCallback):
+    """Throughput of each optimizer step, counting real (non-padding) tokens."""
+
+    def __init__(self, tokens_per_step: float):
+        self.tokens_per_step = tokens_per_step
+        self.rates: list[float] = []
+        self._started = None
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        self._started = time.perf_counter()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        if self._started is None:
+            return
+        rate = self.tokens_per_step / (time.perf_counter() - self._started)
+        self.rates.append(rate)
+        print(f"step {state.global_step}: {rate:,.0f} tokens/s")
+
+    def on_train_end(self, args, state, control, **kwargs):
+        if self.rates:
+            print(f"Mean throughput: {sum(self.rates) / len(self.rates):,.0f} tokens/s over {len(self.rates)} steps")
+
+
+def train():
+    from peft import LoraConfig, get_peft_model
+    from transformers import AutoModelForCausalLM, AutoTokenizer, Trainer, TrainingArguments, default_data_collator
+
+    # 1. Tokenizer + packed data (cached across runs)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    tokenizer.pad_token = tokenizer.eos_token
+    dataset = PackedDataset(prepare_dataset(tokenizer, seq_len=SEQ_LEN))
+    print(f"Loaded {len(dataset)} packed rows ({dataset.tokens} tokens)")
+
+    # 2. Base model with LoRA adapters on the attention projections
+    model = AutoModelForCausalLM.from_pretrained(MODEL_NAME, device_map="auto")
+    lora_config = LoraConfig(
+        r=8,
+        lora_alpha=16,
+        target_modules=["q_proj", "v_proj"],
+        lora_dropout=0.05,
+        bias="none",
+        task_type="CAUSAL_LM",
+    )
+    model = get_peft_model(model, lora_config)
+
+    # 3. Training args; packing means far fewer, fuller steps, so warm up
+    # over a tenth of them instead of a fixed count
+    total_steps = math.ceil(len(dataset) / BATCH_SIZE) * EPOCHS
+    training_args = TrainingArguments(
+        output_dir="./sprintsync-model",
+        num_train_epochs=EPOCHS,
+        per_device_train_batch_size=BATCH_SIZE,
+        learning_rate=2e-4,
+        logging_steps=10,
+        save_steps=50,
+        warmup_steps=max(1, total_steps // 10),
+        fp16=False,
+        dataloader_pin_memory=False,
+    )
+
+    # 4. Trainer
+    trainer = Trainer(
+        model=model,
+        args=training_args,
+        train_dataset=dataset,
+        data_collator=default_data_collator,
+        callbacks=[TokensPerSecondCallback(dataset.tokens / len(dataset) * BATCH_SIZE)],
+    )
+
+    # 5. Train
+    print("Starting training...")
+    trainer.train()
+
+    # 6. Save
+    trainer.save_model("./sprintsync-model/final")
+    tokenizer.save_pretrained("./sprintsync-model/final")
+    print("Done! Model saved to ./sprintsync-model/final")
+
+
+if __name__ == "__main__":
+    train()
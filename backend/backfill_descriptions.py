@@ -0,0 +1,223 @@
+"""
+Fill in empty task descriptions with the configured AI backend, offline.
+
+    python backfill_descriptions.py                       # resumes from .backfill_state.json
+    python backfill_descriptions.py --batch-size 16 --max-per-minute 120
+    python backfill_descriptions.py --restart --limit 500 --dry-run
+
+Tasks are read in keyset order (id > last seen id, LIMIT --chunk-size), so
+only one chunk of ids and titles is in memory however large the table is.
+Titles are answered from the retrieval index when it has a near-identical
+one and otherwise generated --batch-size at a time with the backend's
+batched generate (torch-custom / onnx). Each batch is written with one
+executemany UPDATE in its own transaction, guarded so a description someone
+typed in the meantime is never overwritten. The last committed id goes to
+the state file after every batch; a rerun carries on from there.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Callable, Iterator, Optional
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from models import Task
+
+STATE_PATH = "./.backfill_state.json"
+
+_tasks = Task.__table__
+_EMPTY = or_(_tasks.c.description == "", _tasks.c.description.is_(None))
+
+
+def pending_count(db: Session, after_id: int = 0) -> int:
+    return db.execute(select(func.count()).select_from(_tasks).where(_EMPTY, _tasks.c.id > after_id)).scalar_one()
+
+
+def iter_pending(db: Session, after_id: int, chunk_size: int) -> Iterator[list[tuple[int, str, int]]]:
+    """Chunks of (id, title, owner id) of tasks without a description, in id order."""
+    while True:
+        rows = db.execute(
+            select(_tasks.c.id, _tasks.c.title, _tasks.c.owner_id)
+            .where(_EMPTY, _tasks.c.id > after_id)
+            .order_by(_tasks.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        yield [(row.id, row.title, row.owner_id) for row in rows]
+        after_id = rows[-1].id
+
+
+def write_descriptions(db: Session, updates: list[dict]) -> int:
+    """One executemany UPDATE + commit; rows that gained a description meanwhile are left alone."""
+    if not updates:
+        return 0
+    stmt = (
+        update(_tasks)
+        .where(_tasks.c.id == bindparam("task_id"), _EMPTY)
+        .values(description=bindparam("new_description"), updated_at=func.now(), version=_tasks.c.version + 1)
+    )
+    result = db.execute(stmt, updates)
+    db.commit()
+    return result.rowcount
+
+
+def generate_descriptions(backend, titles: list[str], owner_ids: list[int], runner: asyncio.Runner) -> list[str]:
+    """
+    Descriptions for `titles`, retrieval hits first, the rest in one batched
+    call. A title is only matched against its owner's own saved tasks.
+    Backends without a batched generate are driven on `runner`'s loop.
+    """
+    from services.retrieval import lookup_description
+
+    results = [lookup_description(title, owner_id) for title, owner_id in zip(titles, owner_ids)]
+    missing = [i for i, found in enumerate(results) if found is None]
+    if missing:
+        todo = [titles[i] for i in missing]
+        if hasattr(backend, "generate_batch"):
+            generated = backend.generate_batch(todo)
+        else:
+            async def describe_all():
+                return await asyncio.gather(*(backend.describe(title) for title in todo))
+            generated = runner.run(describe_all())
+        for i, text in zip(missing, generated):
+            results[i] = text
+    return results
+
+
+class RateLimiter:
+    """Keeps the average rate at or below `per_minute` items (0 = unlimited)."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic, sleep=time.sleep):
+        self.per_minute = per_minute
+        self._clock, self._sleep = clock, sleep
+        self._started = clock()
+        self._count = 0
+
+    def acquire(self, n: int) -> None:
+        if self.per_minute > 0:
+            due = self._started + self._count * 60.0 / self.per_minute
+            delay = due - self._clock()
+            if delay > 0:
+                self._sleep(delay)
+        self._count += n
+
+
+def _load_state(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"last_id": 0, "updated": 0}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_state(path: str, state: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def backfill(
+    db: Session,
+    backend,
+    chunk_size: int = 500,
+    batch_size: int = 8,
+    max_per_minute: float = 0,
+    state_path: Optional[str] = STATE_PATH,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+    report: Callable[[str], None] = print,
+) -> dict:
+    """Run the backfill; returns counts of updated / skipped tasks and the last processed id."""
+    from services.openai_client import close_openai
+
+    state = _load_state(state_path) if state_path else {"last_id": 0, "updated": 0}
+    total = pending_count(db, state["last_id"])
+    if limit is not None:
+        total = min(total, limit)
+    report(f"{total} tasks without a description after id {state['last_id']}")
+
+    limiter = RateLimiter(max_per_minute)
+    started = time.perf_counter()
+    seen = skipped = 0
+    # One event loop for the whole run: the OpenAI gateway's connection pool
+    # and semaphore stay bound to the loop that first used them
+    runner = asyncio.Runner()
+    try:
+        for chunk in iter_pending(db, state["last_id"], chunk_size):
+            for start in range(0, len(chunk), batch_size):
+                batch = chunk[start:start + batch_size]
+                if limit is not None:
+                    batch = batch[: limit - seen]
+                if not batch:
+                    break
+                limiter.acquire(len(batch))
+                titles, owner_ids = [title for _, title, _ in batch], [owner for *_, owner in batch]
+                texts = generate_descriptions(backend, titles, owner_ids, runner)
+                updates = [
+                    {"task_id": task_id, "new_description": text.strip()}
+                    for (task_id, *_), text in zip(batch, texts) if text and text.strip()
+                ]
+                written = 0 if dry_run else write_descriptions(db, updates)
+                seen += len(batch)
+                skipped += len(batch) - (len(updates) if dry_run else written)
+                state = {"last_id": batch[-1][0], "updated": state["updated"] + written}
+                if state_path and not dry_run:
+                    _save_state(state_path, state)
+
+                elapsed = time.perf_counter() - started
+                rate = seen / elapsed if elapsed else 0.0
+                eta = (total - seen) / rate if rate else 0.0
+                report(
+                    f"{seen}/{total} ({seen / max(1, total):.0%})  {rate:.1f} tasks/s  "
+                    f"ETA {eta:.0f}s  last id {state['last_id']}"
+                )
+            if limit is not None and seen >= limit:
+                break
+    finally:
+        runner.run(close_openai())
+        runner.close()
+
+    report(f"Done: {state['updated']} descriptions written in total, {skipped} skipped this run")
+    return {"updated": state["updated"], "skipped": skipped, "processed": seen, "last_id": state["last_id"]}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database import SessionLocal, init_db
+    from services.ai import load_backend
+    from services.backends import get_backend
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=500, help="task ids read per query")
+    parser.add_argument("--batch-size", type=int, default=8, help="titles per generate call / transaction")
+    parser.add_argument("--max-per-minute", type=float, default=0, help="0 = as fast as the model goes")
+    parser.add_argument("--limit", type=int, help="stop after this many tasks")
+    parser.add_argument("--state-file", default=STATE_PATH)
+    parser.add_argument("--restart", action="store_true", help="ignore the saved position")
+    parser.add_argument("--dry-run", action="store_true", help="generate but do not write")
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.state_file):
+        os.remove(args.state_file)
+
+    init_db()
+    load_backend()
+    backend = get_backend()
+    if backend.name == "stub" or not backend.ready:
+        sys.exit(f"AI backend '{backend.name}' is not usable ({backend.state['status']}); refusing to write stub text.")
+
+    db = SessionLocal()
+    try:
+        backfill(
+            db, backend, args.chunk_size, args.batch_size, args.max_per_minute,
+            args.state_file, args.limit, args.dry_run,
+        )
+    finally:
+        db.close()
@@ -0,0 +1,81 @@
+"""Shared helpers for the offline benchmark scripts (run from backend/ with `python -m benchmarks.<name>`)."""
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmarks never touch the real database or network
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("AI_CACHE_ENABLED", "false")
+os.environ.setdefault("AI_RETRIEVAL_ENABLED", "false")
+
+ADAPTER_PATH = os.path.join(BACKEND_DIR, "LLM_model_trainig", "sprintsync-model", "final")
+
+SAMPLE_TITLES = [
+    "Build login page",
+    "Fix database connection bug",
+    "Add search feature",
+    "Write unit tests",
+    "Set up CI pipeline",
+    "Refactor payment service",
+    "Add rate limiting to API",
+    "Migrate users table",
+]
+
+
+def load_tiny_model(layers: int = 2, hidden: int = 64):
+    """
+    A randomly initialised Llama with the fine-tuned tokenizer.
+
+    Output is gibberish but the shapes, padding and decode path match the
+    real model, so relative numbers (batching, threading) are meaningful
+    without downloading TinyLlama.
+    """
+    import torch
+    from transformers import AutoTokenizer, LlamaConfig, LlamaForCausalLM
+
+    tokenizer = AutoTokenizer.from_pretrained(ADAPTER_PATH)
+    config = LlamaConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=hidden,
+        intermediate_size=hidden * 2,
+        num_hidden_layers=layers,
+        num_attention_heads=4,
+        num_key_value_heads=4,
+        max_position_embeddings=512,
+        bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+    )
+    torch.manual_seed(0)
+    model = LlamaForCausalLM(config).eval()
+    return model, tokenizer
+
+
+def install_model(model, tokenizer):
+    """Make the torch-custom backend serve `model` as if it had loaded it; returns the backend."""
+    from services.backends import create_backend, set_backend
+
+    backend = create_backend("torch-custom")
+    backend.install(model, tokenizer, "bench")
+    set_backend(backend)
+    return backend
+
+
+def load_real_backend(name: str = "torch-custom"):
+    """Load a backend from its configured artifacts, exiting if that fails."""
+    from services.backends import create_backend, set_backend
+
+    backend = create_backend(name)
+    backend.load()
+    if not backend.ready:
+        raise SystemExit(f"{name} backend failed to load: {backend.state['error']}")
+    set_backend(backend)
+    return backend
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
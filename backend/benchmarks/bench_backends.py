@@ -0,0 +1,125 @@
+"""
+Latency and throughput of each description backend behind the same service code.
+
+    python -m benchmarks.bench_backends                          # tiny random model: torch vs onnx
+    python -m benchmarks.bench_backends --real --backends torch-custom,onnx,openai
+    python -m benchmarks.bench_backends --json > backends.json
+
+Every backend is driven through services.ai (generate_task_description /
+stream_task_description), so batching, the inference pool and the OpenAI
+gateway are all part of the measurement:
+
+  - latency: one request at a time, p50 / p95 in ms
+  - ttft: time to the first streamed token (streaming backends only)
+  - throughput: --concurrency distinct titles submitted at once, req/s
+
+Without --real the torch backend serves a tiny random Llama and the onnx
+backend serves that same model exported with export_onnx.py, so the numbers
+compare runtimes rather than model sizes.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+from benchmarks._common import SAMPLE_TITLES, install_model, load_real_backend, load_tiny_model, percentile
+
+
+def _prepare(name: str, real: bool, workdir: str):
+    from config import settings
+    from services.backends import create_backend, set_backend
+
+    if real or name in ("stub", "openai"):
+        if name == "stub":
+            backend = create_backend("stub")
+            set_backend(backend)
+            return backend
+        return load_real_backend(name)
+
+    model, tokenizer = load_tiny_model(layers=4, hidden=256)
+    if name == "torch-custom":
+        return install_model(model, tokenizer)
+
+    from LLM_model_trainig.export_onnx import export_onnx
+
+    export_onnx(model, tokenizer, workdir, "bench")
+    settings.AI_ONNX_MODEL_PATH = workdir
+    return load_real_backend("onnx")
+
+
+async def _measure(runs: int, concurrency: int) -> dict:
+    from services import ai as ai_service
+
+    titles = iter(f"{SAMPLE_TITLES[i % len(SAMPLE_TITLES)]} #{i}" for i in range(10**9))
+    await ai_service.generate_task_description(next(titles))  # warm-up
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await ai_service.generate_task_description(next(titles))
+        latencies.append(time.perf_counter() - start)
+    if result["source"] == "stub-fallback":
+        raise SystemExit(f"backend failed during generation: {result['error']}")
+
+    ttfts = []
+    for _ in range(runs):
+        start, first = time.perf_counter(), None
+        async for event in ai_service.stream_task_description(next(titles)):
+            if first is None and event["event"] == "token":
+                first = time.perf_counter() - start
+        ttfts.append(first)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(ai_service.generate_task_description(next(titles)) for _ in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "ttft_p50_ms": round(percentile(ttfts, 50) * 1000, 1),
+        "throughput_rps": round(concurrency / elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="stub,torch-custom,onnx")
+    parser.add_argument("--real", action="store_true", help="use the configured model artifacts / API key")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    from config import settings
+    from services.backends.torch_custom import GENERATION_PARAMS
+
+    # Same token count for every local runtime; greedy so runs are repeatable
+    GENERATION_PARAMS.update(max_new_tokens=args.max_new_tokens, do_sample=False)
+    settings.USE_AI_STUB = False
+    settings.AI_INFERENCE_QUEUE_SIZE = max(settings.AI_INFERENCE_QUEUE_SIZE, args.concurrency)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.backends.split(","):
+            backend = _prepare(name, args.real, workdir)
+            row = {"backend": name, **backend.capabilities}
+            row.update(asyncio.run(_measure(args.runs, args.concurrency)))
+            results.append(row)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'backend':<13} {'batch':>5} {'stream':>6} {'p50 ms':>8} {'p95 ms':>8} {'ttft ms':>8} {'req/s':>7}")
+    for r in results:
+        print(
+            f"{r['backend']:<13} {str(r['batching']):>5} {str(r['streaming']):>6} {r['p50_ms']:>8}"
+            f" {r['p95_ms']:>8} {r['ttft_p50_ms']:>8} {r['throughput_rps']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
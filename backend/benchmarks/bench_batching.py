@@ -0,0 +1,49 @@
+"""
+Throughput of /ai/suggest description generation against batch size.
+
+    python -m benchmarks.bench_batching --requests 32 --batch-sizes 1,2,4,8
+
+Submits N concurrent titles through the BatchScheduler for each batch size
+and reports requests/sec. Uses a tiny random model unless --real is given.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks._common import SAMPLE_TITLES, install_model, load_real_backend, load_tiny_model
+
+
+async def _run(backend, batch_size: int, requests: int, wait_ms: float) -> float:
+    from services.batching import BatchScheduler
+
+    scheduler = BatchScheduler(backend.generate_batch, batch_size, wait_ms)
+    titles = [SAMPLE_TITLES[i % len(SAMPLE_TITLES)] for i in range(requests)]
+    start = time.perf_counter()
+    await asyncio.gather(*(scheduler.submit(t) for t in titles))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--batch-sizes", default="1,2,4,8,16")
+    parser.add_argument("--wait-ms", type=float, default=10.0)
+    parser.add_argument("--real", action="store_true", help="load the fine-tuned model instead of a tiny one")
+    args = parser.parse_args()
+
+    backend = load_real_backend() if args.real else install_model(*load_tiny_model())
+
+    # Warm up kernels so the first row is not penalised
+    backend.generate_batch(SAMPLE_TITLES[:1])
+
+    print(f"{'batch':>5}  {'seconds':>8}  {'req/s':>8}  {'speedup':>7}")
+    baseline = None
+    for size in [int(x) for x in args.batch_sizes.split(",")]:
+        elapsed = asyncio.run(_run(backend, size, args.requests, args.wait_ms))
+        rate = args.requests / elapsed
+        baseline = baseline or rate
+        print(f"{size:>5}  {elapsed:>8.2f}  {rate:>8.2f}  {rate / baseline:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Startup time, resident memory and per-token latency: base + LoRA vs merged.
+
+    python -m benchmarks.bench_model_load          # TinyLlama + sprintsync-model/final and merged/
+    python -m benchmarks.bench_model_load --tiny   # synthetic tiny base + random adapter, fully offline
+
+Each variant is measured in a fresh subprocess through the same loader
+functions services.ai uses, so RSS is not polluted by the other variant.
+Run LLM_model_trainig/merge_adapter.py first for the real comparison.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks._common import BACKEND_DIR, load_tiny_model
+
+NEW_TOKENS = 32
+
+
+def _current_rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _measure(variant: str, base: str, adapter: str, merged: str) -> dict:
+    import peft  # noqa: F401 - import cost is not part of model load
+    import torch
+    import transformers  # noqa: F401
+    from services.backends import torch_custom
+
+    rss_before = _current_rss_mb()
+    start = time.perf_counter()
+    if variant == "merged":
+        model, tokenizer, _ = torch_custom._load_merged(merged)
+    else:
+        model, tokenizer, _ = torch_custom._load_with_adapter(base, adapter)
+    model.eval()
+    load_s = time.perf_counter() - start
+    load_rss_mb = _current_rss_mb() - rss_before
+
+    inputs = tokenizer("Task title: Fix login bug\n\nDescription:", return_tensors="pt")
+    with torch.no_grad():
+        model.generate(**inputs, max_new_tokens=4, do_sample=False)  # warm-up
+        start = time.perf_counter()
+        model.generate(**inputs, max_new_tokens=NEW_TOKENS, min_new_tokens=NEW_TOKENS, do_sample=False)
+        per_token_ms = (time.perf_counter() - start) * 1000 / NEW_TOKENS
+
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "variant": variant,
+        "load_s": load_s,
+        "load_rss_mb": load_rss_mb,
+        "peak_rss_mb": rss_mb,
+        "ms_per_token": per_token_ms,
+    }
+
+
+def _build_tiny(workdir: str) -> tuple[str, str, str]:
+    """Save a tiny base, a random LoRA on q/v projections, and their merge."""
+    import torch
+    from peft import LoraConfig, get_peft_model
+    from LLM_model_trainig.merge_adapter import merge_adapter
+
+    model, tokenizer = load_tiny_model(layers=4, hidden=256)
+    base, adapter, merged = (os.path.join(workdir, d) for d in ("base", "adapter", "merged"))
+    model.save_pretrained(base)
+    tokenizer.save_pretrained(base)
+
+    lora = get_peft_model(model, LoraConfig(r=8, lora_alpha=16, target_modules=["q_proj", "v_proj"], task_type="CAUSAL_LM"))
+    with torch.no_grad():
+        for name, param in lora.named_parameters():
+            if "lora_B" in name:
+                param.normal_(std=0.02)  # non-zero so the merge actually changes weights
+    lora.save_pretrained(adapter)
+    tokenizer.save_pretrained(adapter)
+
+    merge_adapter(base, adapter, merged)
+    return base, adapter, merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiny", action="store_true")
+    parser.add_argument("--measure", choices=["peft", "merged"], help=argparse.SUPPRESS)
+    parser.add_argument("--base", default="TinyLlama/TinyLlama-1.1B-Chat-v1.0")
+    parser.add_argument("--adapter", default=os.path.join(BACKEND_DIR, "LLM_model_trainig", "sprintsync-model", "final"))
+    parser.add_argument("--merged", default=os.path.join(BACKEND_DIR, "LLM_model_trainig", "sprintsync-model", "merged"))
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(_measure(args.measure, args.base, args.adapter, args.merged)))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        base, adapter, merged = _build_tiny(workdir) if args.tiny else (args.base, args.adapter, args.merged)
+        rows = []
+        for variant in ("peft", "merged"):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_model_load", "--measure", variant,
+                 "--base", base, "--adapter", adapter, "--merged", merged],
+                cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+            )
+            rows.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"{'variant':<8}  {'load s':>7}  {'load RSS MB':>11}  {'peak RSS MB':>11}  {'ms/token':>8}")
+    for row in rows:
+        print(
+            f"{row['variant']:<8}  {row['load_s']:>7.2f}  {row['load_rss_mb']:>11.1f}"
+            f"  {row['peak_rss_mb']:>11.0f}  {row['ms_per_token']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
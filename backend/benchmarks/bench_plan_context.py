@@ -0,0 +1,114 @@
+"""
+Daily-plan prompt size and build time at 10 / 100 / 1000 tasks.
+
+    python -m benchmarks.bench_plan_context
+    python -m benchmarks.bench_plan_context --sizes 10,100,1000,5000 --budget 600
+
+"full" is the previous approach (hydrate every Task, dump them all as
+indented JSON); "budgeted" is load_plan_tasks + build_plan_context.
+Prompt tokens are estimated at ~4 characters per token.
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks._common import SAMPLE_TITLES, percentile  # noqa: F401 - sets env defaults
+
+STATUS_MIX = ["backlog"] * 4 + ["in_progress"] * 2 + ["review"] + ["done"] * 5
+
+
+def _session(n_tasks: int):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from database import Base
+    from models import Task, TaskStatus, User
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(email="bench@example.com", username="bench", hashed_password="x")
+    db.add(user)
+    db.commit()
+    rng = random.Random(0)
+    db.add_all(
+        Task(
+            title=f"{rng.choice(SAMPLE_TITLES)} #{i}",
+            description="Lorem ipsum " * 20,
+            status=TaskStatus(rng.choice(STATUS_MIX)),
+            total_minutes=rng.randint(0, 600),
+            owner_id=user.id,
+        )
+        for i in range(n_tasks)
+    )
+    db.commit()
+    return db, user.id
+
+
+def _full_prompt(db, owner_id: int) -> str:
+    from models import Task
+
+    tasks = db.query(Task).filter(Task.owner_id == owner_id).all()
+    return json.dumps(
+        [{"title": t.title, "status": t.status.value, "minutes": t.total_minutes} for t in tasks],
+        indent=2,
+    )
+
+
+def _budgeted_prompt(db, owner_id: int, budget: int) -> str:
+    from services.plan_context import build_plan_context, load_plan_tasks
+
+    return build_plan_context(load_plan_tasks(db, owner_id), budget)
+
+
+def _time(fn, runs: int) -> tuple[str, float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = fn()
+        timings.append(time.perf_counter() - start)
+    return out, percentile(timings, 50) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--budget", type=int, default=None, help="token budget (default: AI_PLAN_CONTEXT_TOKENS)")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    from config import settings
+    from services.plan_context import estimate_tokens
+
+    budget = args.budget or settings.AI_PLAN_CONTEXT_TOKENS
+    results = []
+    for n in (int(s) for s in args.sizes.split(",")):
+        db, owner_id = _session(n)
+        for name, fn in (
+            ("full", lambda: _full_prompt(db, owner_id)),
+            ("budgeted", lambda: _budgeted_prompt(db, owner_id, budget)),
+        ):
+            db.expunge_all()
+            prompt, p50_ms = _time(fn, args.runs)
+            results.append({
+                "tasks": n,
+                "builder": name,
+                "prompt_chars": len(prompt),
+                "prompt_tokens_est": estimate_tokens(prompt),
+                "build_p50_ms": round(p50_ms, 2),
+            })
+        db.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'tasks':>6} {'builder':>9} {'chars':>8} {'~tokens':>8} {'p50 ms':>8}")
+    for r in results:
+        print(f"{r['tasks']:>6} {r['builder']:>9} {r['prompt_chars']:>8} {r['prompt_tokens_est']:>8} {r['build_p50_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Tokens/sec, p50/p99 latency and RSS per inference profile (fp32 / bf16 / int8).
+
+    python -m benchmarks.bench_profiles --real --threads 2   # fine-tuned model
+    python -m benchmarks.bench_profiles                      # tiny random model, offline
+
+Each profile runs in a fresh subprocess with AI_INFERENCE_PROFILE and
+AI_TORCH_THREADS set, exactly as a uvicorn worker would see them.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks._common import BACKEND_DIR, SAMPLE_TITLES, install_model, load_real_backend, load_tiny_model, percentile
+
+NEW_TOKENS = 32
+
+
+def _measure(real: bool, runs: int) -> dict:
+    import torch
+    from config import settings
+    from services.backends import torch_custom
+
+    if real:
+        backend = load_real_backend()
+    else:
+        torch_custom._configure_threads(settings.AI_TORCH_THREADS, settings.AI_TORCH_INTEROP_THREADS)
+        model, tokenizer = load_tiny_model(layers=4, hidden=256)
+        backend = install_model(torch_custom._apply_profile(model, settings.AI_INFERENCE_PROFILE).eval(), tokenizer)
+
+    model, tokenizer = backend.model, backend.tokenizer
+    latencies = []
+    with torch.no_grad():
+        for i in range(runs + 1):
+            inputs = tokenizer(f"Task title: {SAMPLE_TITLES[i % len(SAMPLE_TITLES)]}\n\nDescription:", return_tensors="pt")
+            start = time.perf_counter()
+            model.generate(**inputs, max_new_tokens=NEW_TOKENS, min_new_tokens=NEW_TOKENS, do_sample=False)
+            if i:  # first run is warm-up
+                latencies.append(time.perf_counter() - start)
+
+    return {
+        "profile": settings.AI_INFERENCE_PROFILE,
+        "threads": torch.get_num_threads(),
+        "tokens_per_s": NEW_TOKENS * len(latencies) / sum(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--real", action="store_true", help="benchmark the fine-tuned model")
+    parser.add_argument("--profiles", default="fp32,bf16,int8")
+    parser.add_argument("--threads", type=int, default=0, help="AI_TORCH_THREADS (0 = torch default)")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(_measure(args.real, args.runs)))
+        return
+
+    print(f"{'profile':<8}  {'threads':>7}  {'tok/s':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'peak RSS MB':>11}")
+    for profile in args.profiles.split(","):
+        env = {**os.environ, "AI_INFERENCE_PROFILE": profile, "AI_TORCH_THREADS": str(args.threads)}
+        cmd = [sys.executable, "-m", "benchmarks.bench_profiles", "--measure", "--runs", str(args.runs)]
+        if args.real:
+            cmd.append("--real")
+        out = subprocess.run(cmd, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True)
+        row = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{row['profile']:<8}  {row['threads']:>7}  {row['tokens_per_s']:>8.1f}  {row['p50_ms']:>8.1f}"
+            f"  {row['p99_ms']:>8.1f}  {row['peak_rss_mb']:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
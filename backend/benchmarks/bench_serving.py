@@ -0,0 +1,258 @@
+"""
+End-to-end AI serving benchmark through the FastAPI app, fully offline.
+
+    python -m benchmarks.bench_serving                                  # concurrency 1..64
+    python -m benchmarks.bench_serving --model real --concurrency 1,4,16
+    python -m benchmarks.bench_serving --output bench/$(git rev-parse --short HEAD).json
+    python -m benchmarks.bench_serving --compare bench/abc123.json bench/def456.json
+    python -m benchmarks.bench_serving --endpoint suggest               # batched, non-streaming
+
+The app is served by uvicorn on a loopback port inside this process (the
+httpx ASGI transport buffers whole responses, which would hide time to first
+token). Each request is POST /ai/suggest/stream?mode=description (or
+/ai/suggest with --endpoint suggest, which goes through the batcher but has
+no TTFT) with a unique title, so the description cache, retrieval index and request
+coalescing never answer it. For every concurrency level, that many clients
+each send --rounds requests back to back, and the report has:
+
+  - ttft p50 / p95: time to the first `token` event
+  - e2e p50 / p95 / p99: time to the `done` event
+  - tok/s: generated tokens (the final descriptions re-tokenized) per wall second
+  - peak RSS of the process so far, in MB
+
+--model auto serves the fine-tuned adapter when its weights and the base
+model are available locally, else a tiny random Llama (see _common); the
+Hugging Face hub is never contacted.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+from benchmarks._common import (  # noqa: E402
+    ADAPTER_PATH, BACKEND_DIR, SAMPLE_TITLES, install_model, load_real_backend, load_tiny_model, percentile,
+)
+
+LEVELS = "1,2,4,8,16,32,64"
+
+
+def _prepare(model: str):
+    """Install the backend to serve; returns (backend, model label)."""
+    has_adapter = os.path.exists(os.path.join(ADAPTER_PATH, "adapter_model.safetensors"))
+    if model == "real" or (model == "auto" and has_adapter):
+        try:
+            return load_real_backend("torch-custom"), "real"
+        except SystemExit as exc:
+            if model == "real":
+                raise
+            print(f"{exc}; falling back to the tiny model", file=sys.stderr)
+    return install_model(*load_tiny_model(layers=4, hidden=256)), "tiny"
+
+
+def _start_server(app) -> tuple[str, object]:
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", access_log=False))
+    threading.Thread(target=server.run, name="bench-uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
+
+
+async def _one(client, title: str, endpoint: str) -> dict:
+    start, ttft = time.perf_counter(), None
+    params = {"mode": "description", "title": title}
+    if endpoint == "suggest":
+        resp = await client.post("/ai/suggest", params=params)
+        if resp.status_code != 200:
+            return {"error": resp.status_code}
+        return {"ttft": None, "e2e": time.perf_counter() - start, "result": resp.json()}
+
+    event, done = None, None
+    async with client.stream("POST", "/ai/suggest/stream", params=params) as resp:
+        if resp.status_code != 200:
+            await resp.aread()
+            return {"error": resp.status_code}
+        async for line in resp.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                if event == "token" and ttft is None:
+                    ttft = time.perf_counter() - start
+            elif line.startswith("data: ") and event == "done":
+                done = json.loads(line[len("data: "):])
+    return {"ttft": ttft, "e2e": time.perf_counter() - start, "result": done}
+
+
+async def _level(base_url: str, endpoint: str, concurrency: int, rounds: int, count_tokens) -> dict:
+    import httpx
+
+    titles = (f"{SAMPLE_TITLES[i % len(SAMPLE_TITLES)]} #{concurrency}-{i}" for i in range(10**9))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=600) as client:
+        async def worker():
+            return [await _one(client, next(titles), endpoint) for _ in range(rounds)]
+
+        start = time.perf_counter()
+        runs = [r for batch in await asyncio.gather(*(worker() for _ in range(concurrency))) for r in batch]
+        elapsed = time.perf_counter() - start
+
+    ok = [r for r in runs if "error" not in r and r["result"] and r["result"]["source"] != "stub-fallback"]
+    tokens = sum(count_tokens(r["result"]["description"]) for r in ok)
+    ttfts = [r["ttft"] for r in ok if r["ttft"] is not None]
+    e2e = [r["e2e"] for r in ok]
+
+    def ms(values: list[float], pct: float) -> Optional[float]:
+        return round(percentile(values, pct) * 1000, 1) if values else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(runs),
+        "errors": len(runs) - len(ok),
+        "ttft_p50_ms": ms(ttfts, 50),
+        "ttft_p95_ms": ms(ttfts, 95),
+        "e2e_p50_ms": ms(e2e, 50),
+        "e2e_p95_ms": ms(e2e, 95),
+        "e2e_p99_ms": ms(e2e, 99),
+        "tokens_per_s": round(tokens / elapsed, 1),
+        "requests_per_s": round(len(ok) / elapsed, 2),
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != "darwin" else 1024**2), 1),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def _print_levels(levels: list[dict]) -> None:
+    print(
+        f"{'conc':>4} {'reqs':>5} {'err':>4} {'ttft50':>8} {'ttft95':>8} {'e2e50':>8} {'e2e95':>8}"
+        f" {'e2e99':>8} {'tok/s':>8} {'req/s':>7} {'rss MB':>7}"
+    )
+    for r in levels:
+        print(
+            f"{r['concurrency']:>4} {r['requests']:>5} {r['errors']:>4} {r['ttft_p50_ms'] or '-':>8} {r['ttft_p95_ms'] or '-':>8}"
+            f" {r['e2e_p50_ms']:>8} {r['e2e_p95_ms']:>8} {r['e2e_p99_ms']:>8} {r['tokens_per_s']:>8}"
+            f" {r['requests_per_s']:>7} {r['peak_rss_mb']:>7}"
+        )
+
+
+def _delta(before: dict, after: dict, key: str) -> str:
+    if not before[key] or after[key] is None:
+        return "n/a"
+    return f"{(after[key] - before[key]) / before[key] * 100:+.1f}%"
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """Per-level change between two result files (negative latency / positive tok/s is better)."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old['meta']['commit']} → {new['meta']['commit']}")
+    before = {r["concurrency"]: r for r in old["levels"]}
+    print(f"{'conc':>4} {'ttft50':>9} {'e2e95':>9} {'e2e99':>9} {'tok/s':>9}")
+    for r in new["levels"]:
+        b = before.get(r["concurrency"])
+        if b is None:
+            continue
+        print(
+            f"{r['concurrency']:>4} {_delta(b, r, 'ttft_p50_ms'):>9} {_delta(b, r, 'e2e_p95_ms'):>9}"
+            f" {_delta(b, r, 'e2e_p99_ms'):>9} {_delta(b, r, 'tokens_per_s'):>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", choices=["auto", "tiny", "real"], default="auto")
+    parser.add_argument("--endpoint", choices=["stream", "suggest"], default="stream")
+    parser.add_argument("--concurrency", default=LEVELS, help="comma-separated client counts")
+    parser.add_argument("--rounds", type=int, default=2, help="requests per client at each level")
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    import logging
+
+    import structlog
+
+    from config import settings
+    from main import app
+    from models import User
+    from services.auth import get_current_user
+    from services.backends.torch_custom import GENERATION_PARAMS
+
+    levels = [int(x) for x in args.concurrency.split(",")]
+    # Greedy with a fixed length so runs on different commits do the same work
+    GENERATION_PARAMS.update(max_new_tokens=args.max_new_tokens, do_sample=False)
+    settings.USE_AI_STUB = False
+    settings.AI_INFERENCE_QUEUE_SIZE = max(settings.AI_INFERENCE_QUEUE_SIZE, max(levels))
+    # One request log line each would drown the report
+    structlog.configure(logger_factory=structlog.PrintLoggerFactory(file=open(os.devnull, "w")))
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, username="bench", email="bench@example.com")
+
+    backend, label = _prepare(args.model)
+
+    def count_tokens(text: str) -> int:
+        return len(backend.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    base_url, server = _start_server(app)
+
+    asyncio.run(_level(base_url, args.endpoint, 1, 1, count_tokens))  # warm-up
+    results = []
+    for concurrency in levels:
+        results.append(asyncio.run(_level(base_url, args.endpoint, concurrency, args.rounds, count_tokens)))
+        print(f"concurrency {concurrency} done", file=sys.stderr)
+    server.should_exit = True
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "model": label,
+            "endpoint": args.endpoint,
+            "backend": backend.name,
+            "max_new_tokens": args.max_new_tokens,
+            "rounds": args.rounds,
+            "batch_max_size": settings.AI_BATCH_MAX_SIZE,
+            "inference_workers": settings.AI_INFERENCE_WORKERS,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "levels": results,
+    }
+    _print_levels(results)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Cold-start budget: import time of `main` and time to first served request.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget-import-ms 1500 --budget-first-request-ms 5000
+
+Reports the slowest modules from `python -X importtime -c "import main"`,
+fails if a heavy ML/OpenAI module is imported eagerly, then starts uvicorn
+and measures how long until /health answers. Exits non-zero when a budget
+is exceeded so CI catches cold-start regressions.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks._common import BACKEND_DIR
+
+# Must only be imported on first use, never by `import main`
+LAZY_MODULES = ("torch", "transformers", "peft", "openai", "onnxruntime")
+
+
+def _env() -> dict:
+    return {**os.environ, "DATABASE_URL": "sqlite://", "SEED_ON_STARTUP": "false"}
+
+
+def import_report(top: int) -> tuple[float, list[tuple[int, str]], list[str]]:
+    """Total import ms for `main`, slowest modules (cumulative us) and eager heavy modules."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    total_ms = next(us for us, name in rows if name == "main") / 1000
+    eager = sorted({name.split(".")[0] for _, name in rows} & set(LAZY_MODULES))
+    return total_ms, sorted(rows, reverse=True)[:top], eager
+
+
+def first_request_ms(timeout_s: float = 60.0) -> float:
+    """Spawn uvicorn and time until GET /health returns 200."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout_s:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.02)
+        raise SystemExit(f"server did not answer /health within {timeout_s}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-import-ms", type=float, default=None)
+    parser.add_argument("--budget-first-request-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    total_ms, slowest, eager = import_report(args.top)
+    print(f"import main: {total_ms:.0f} ms")
+    for cumulative_us, name in slowest:
+        print(f"  {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    ttfr_ms = first_request_ms()
+    print(f"time to first request: {ttfr_ms:.0f} ms")
+
+    failures = []
+    if eager:
+        failures.append(f"heavy modules imported at startup: {', '.join(eager)}")
+    if args.budget_import_ms is not None and total_ms > args.budget_import_ms:
+        failures.append(f"import main {total_ms:.0f} ms > budget {args.budget_import_ms:.0f} ms")
+    if args.budget_first_request_ms is not None and ttfr_ms > args.budget_first_request_ms:
+        failures.append(f"first request {ttfr_ms:.0f} ms > budget {args.budget_first_request_ms:.0f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
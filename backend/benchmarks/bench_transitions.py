@@ -0,0 +1,204 @@
+"""
+Concurrent kanban drags: the old read-check-write transition vs the single conditional UPDATE.
+
+    python -m benchmarks.bench_transitions
+    python -m benchmarks.bench_transitions --workers 32 --tasks 10 --drags 200
+    python -m benchmarks.bench_transitions --database-url postgresql://…/bench   # tables are dropped
+
+Each worker is a browser tab with its own view of the board: it drags a
+random task to a status its view allows (short of done, which nothing
+leaves), sending that task's version as If-Match, and re-reads the task
+when told it is out of date. Few tasks and many workers make drags of the
+same card collide.
+
+"legacy" is the previous transition_task (SELECT, check STATUS_TRANSITIONS
+in Python, UPDATE + COMMIT, SELECT again via refresh; the version is bumped
+in Python the way an ORM read-modify-write would). "atomic" calls the
+current endpoint. Per mode the report has round trips per drag (statements
++ commits), p50 / p95 latency, drags/s, how many drags were refused, and
+lost updates: successful drags whose version bump did not survive.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks._common import percentile
+
+
+def _engine(url: str):
+    from sqlalchemy import create_engine
+
+    from database import Base, init_db
+
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 30}, pool_size=64)
+    else:
+        engine = create_engine(url, pool_size=64)
+    Base.metadata.drop_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
+        if engine.dialect.name == "postgresql":
+            conn.exec_driver_sql("DROP TYPE IF EXISTS taskstatus")
+    init_db(engine)
+    return engine
+
+
+def _seed(Session, n_tasks: int):
+    from models import Task, User
+
+    with Session(expire_on_commit=False) as db:
+        user = User(email="bench@example.com", username="bench", hashed_password="x")
+        db.add(user)
+        db.flush()
+        tasks = [Task(title=f"Card {i}", owner_id=user.id) for i in range(n_tasks)]
+        db.add_all(tasks)
+        db.commit()
+        return user, [t.id for t in tasks]
+
+
+def _legacy(db, task_id: int, new_status, user, version: int):
+    """The transition as it was: three round trips, check in Python."""
+    from fastapi import HTTPException
+
+    from models import STATUS_TRANSITIONS, Task
+
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not user.is_admin and task.owner_id != user.id:
+        raise HTTPException(status_code=403, detail="Not allowed")
+    if new_status not in STATUS_TRANSITIONS[task.status]:
+        raise HTTPException(status_code=400, detail="Cannot transition")
+    task.status = new_status
+    task.version = task.version + 1
+    db.commit()
+    db.refresh(task)
+    return {"status": task.status, "version": task.version}
+
+
+def _atomic(db, task_id: int, new_status, user, version: int):
+    from fastapi import Response
+
+    from routers.tasks import StatusTransition, transition_task
+
+    return transition_task(task_id, StatusTransition(new_status=new_status), Response(), f'"{version}"', db, user)
+
+
+def run(engine, mode: str, n_tasks: int, workers: int, drags: int, seed: int = 0) -> dict:
+    from fastapi import HTTPException
+    from sqlalchemy import event, func, select
+    from sqlalchemy.orm import sessionmaker
+
+    from models import STATUS_TRANSITIONS, Task, TaskStatus, User
+
+    # Nothing leaves done, so cards are dragged back and forth short of it
+    moves = {status: [s for s in targets if s != TaskStatus.done] for status, targets in STATUS_TRANSITIONS.items()}
+    Session = sessionmaker(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Task.__table__.delete())
+        conn.execute(User.__table__.delete())
+    user, task_ids = _seed(Session, n_tasks)
+    transition = {"legacy": _legacy, "atomic": _atomic}[mode]
+
+    round_trips = threading.local()
+
+    def count(*args):
+        round_trips.n = getattr(round_trips, "n", 0) + 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    event.listen(engine, "commit", count)
+
+    results, lock = [], threading.Lock()
+    start_gate = threading.Barrier(workers)
+
+    def worker(index: int):
+        rng = random.Random(seed * 1000 + index)
+        with Session() as db:
+            view = {row.id: (row.status, row.version) for row in db.execute(select(Task.id, Task.status, Task.version))}
+        start_gate.wait()
+        mine = []
+        for _ in range(drags):
+            task_id = rng.choice(task_ids)
+            status, version = view[task_id]
+            target = rng.choice(moves[status])
+            round_trips.n = 0
+            t0 = time.perf_counter()
+            with Session() as db:
+                try:
+                    out = transition(db, task_id, target, user, version)
+                    outcome = "ok"
+                    view[task_id] = (out["status"], out["version"])
+                except HTTPException as exc:
+                    outcome = exc.status_code
+                    db.rollback()
+                    row = db.execute(select(Task.status, Task.version).where(Task.id == task_id)).one()
+                    view[task_id] = (row.status, row.version)
+            mine.append((outcome, time.perf_counter() - t0, round_trips.n))
+        with lock:
+            results.extend(mine)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    event.remove(engine, "before_cursor_execute", count)
+    event.remove(engine, "commit", count)
+
+    with Session() as db:
+        applied = db.execute(select(func.sum(Task.version - 1))).scalar_one() or 0
+    ok = [r for r in results if r[0] == "ok"]
+    latencies = [r[1] for r in ok]
+    return {
+        "mode": mode,
+        "drags": len(results),
+        "ok": len(ok),
+        "refused": len(results) - len(ok),
+        "lost_updates": len(ok) - applied,
+        "round_trips_per_ok": round(sum(r[2] for r in ok) / max(1, len(ok)), 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "drags_per_s": round(len(results) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=8, help="cards on the board (fewer = more collisions)")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--drags", type=int, default=100, help="drags per client")
+    parser.add_argument("--database-url", help="default: a temporary SQLite file")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    import logging
+
+    import structlog
+
+    structlog.configure(logger_factory=structlog.PrintLoggerFactory(file=open(os.devnull, "w")))
+    logging.getLogger("alembic").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = _engine(args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        results = [run(engine, mode, args.tasks, args.workers, args.drags) for mode in ("legacy", "atomic")]
+        engine.dispose()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':>7} {'drags':>6} {'ok':>6} {'refused':>8} {'lost':>5} {'trips/ok':>9} {'p50 ms':>8} {'p95 ms':>8} {'drags/s':>8}")
+    for r in results:
+        print(
+            f"{r['mode']:>7} {r['drags']:>6} {r['ok']:>6} {r['refused']:>8} {r['lost_updates']:>5}"
+            f" {r['round_trips_per_ok']:>9} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['drags_per_s']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
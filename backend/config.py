@@ -1,6 +1,19 @@
+import re
+
+from pydantic import field_validator, model_validator
 from pydantic_settings import BaseSettings
 from typing import Optional
 
+_CLOCK = re.compile(r"([01]?\d|2[0-3]):([0-5]\d)")
+
+
+def clock_minutes(hhmm: str) -> int:
+    """"09:30" -> 570. Raises ValueError for anything that is not a HH:MM time of day."""
+    match = _CLOCK.fullmatch(hhmm.strip())
+    if not match:
+        raise ValueError(f"expected a HH:MM time, got {hhmm!r}")
+    return int(match[1]) * 60 + int(match[2])
+
 
 class Settings(BaseSettings):
     # App
@@ -9,6 +22,7 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "sqlite:///./sprintsync.db"
+    SEED_ON_STARTUP: bool = False  # insert demo users/tasks into an empty DB at boot
 
     # JWT
     SECRET_KEY: str = "change-me-in-production-use-a-long-random-string"
@@ -18,6 +32,67 @@ class Settings(BaseSettings):
     # AI
     OPENAI_API_KEY: Optional[str] = None
     USE_AI_STUB: bool = False  # force stub even if key present
+    AI_BACKEND: str = "torch-custom"  # stub | torch-custom | openai | onnx (task descriptions)
+    OPENAI_BASE_URL: Optional[str] = None  # None = api.openai.com; point at a fake server in tests
+    OPENAI_MAX_CONCURRENCY: int = 8  # upstream calls in flight per process
+    OPENAI_MAX_CONNECTIONS: int = 20  # pooled keep-alive HTTP connections
+    OPENAI_TIMEOUT_S: float = 30.0
+    OPENAI_MAX_RETRIES: int = 2  # retries for connection errors, 429 and 5xx
+    OPENAI_BACKOFF_BASE_S: float = 0.5  # full-jitter backoff: uniform(0, base * 2**attempt)
+    OPENAI_BREAKER_THRESHOLD: int = 5  # consecutive failures before the breaker opens
+    OPENAI_BREAKER_RESET_S: float = 30.0  # how long the breaker stays open before a probe
+    AI_INFERENCE_WORKERS: int = 1  # threads running model.generate concurrently
+    AI_INFERENCE_QUEUE_SIZE: int = 8  # jobs allowed to wait for a worker before 503
+    AI_BATCH_MAX_SIZE: int = 8  # descriptions generated per model.generate call
+    AI_BATCH_WAIT_MS: float = 10.0  # how long to hold a batch open for more requests
+    AI_GENERATION_TIME_BUDGET_S: float = 20.0  # per description; partial text is returned when hit (0 = none)
+    AI_MERGED_MODEL_PATH: str = "./LLM_model_trainig/sprintsync-model/merged"  # from merge_adapter.py
+    AI_INFERENCE_PROFILE: str = "fp32"  # fp32 | bf16 | int8 (dynamic-quantized linear layers)
+    # Torch thread pools per process; with N uvicorn workers keep threads * N <= cores
+    AI_TORCH_THREADS: int = 0  # 0 = torch default
+    AI_TORCH_INTEROP_THREADS: int = 0
+    AI_ONNX_MODEL_PATH: str = "./LLM_model_trainig/sprintsync-model/onnx"  # from export_onnx.py
+    AI_ONNX_THREADS: int = 0  # onnxruntime intra-op threads; 0 = one per core
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_PATH: str = "./ai_cache.db"  # SQLite file for the persistent description cache
+    AI_CACHE_MEMORY_ITEMS: int = 512
+    AI_CACHE_DISK_ITEMS: int = 10000
+    AI_RETRIEVAL_ENABLED: bool = True  # answer near-duplicate titles with a known description
+    AI_RETRIEVAL_THRESHOLD: float = 0.85  # cosine similarity of title trigrams needed for a hit
+    AI_RETRIEVAL_MAX_ITEMS: int = 2000  # indexed descriptions (training examples + saved tasks)
+    AI_PLAN_CACHE_ITEMS: int = 1024  # users whose daily plan is kept in memory
+    AI_PLAN_CONTEXT_TOKENS: int = 600  # prompt budget for the task list in daily plans
+    # Daily plans: auto = OpenAI when a key is set, else the local scheduler
+    AI_PLAN_ENGINE: str = "auto"  # auto | local | openai (USE_AI_STUB still wins)
+    AI_PLAN_REPHRASE: bool = False  # local engine: let OpenAI reword activities, keeping the times
+    AI_PLAN_DAY_START: str = "09:00"
+    AI_PLAN_DAY_END: str = "17:30"
+    AI_PLAN_BREAKS: str = "12:00-13:00"  # comma-separated HH:MM-HH:MM spans
+    AI_PLAN_BLOCK_MINUTES: int = 90  # focus block for a backlog task
+
+    # A bad workday template fails here, at startup, not on every daily-plan request
+    @field_validator("AI_PLAN_DAY_START", "AI_PLAN_DAY_END")
+    @classmethod
+    def _check_clock(cls, value: str) -> str:
+        clock_minutes(value)
+        return value
+
+    @field_validator("AI_PLAN_BREAKS")
+    @classmethod
+    def _check_breaks(cls, value: str) -> str:
+        for span in filter(str.strip, value.split(",")):
+            bounds = span.split("-")
+            if len(bounds) != 2:
+                raise ValueError(f"expected comma-separated HH:MM-HH:MM spans, got {span.strip()!r}")
+            if clock_minutes(bounds[1]) <= clock_minutes(bounds[0]):
+                raise ValueError(f"break {span.strip()!r} must end after it starts")
+        return value
+
+    @model_validator(mode="after")
+    def _check_workday(self) -> "Settings":
+        if clock_minutes(self.AI_PLAN_DAY_END) <= clock_minutes(self.AI_PLAN_DAY_START):
+            raise ValueError("AI_PLAN_DAY_END must be after AI_PLAN_DAY_START")
+        return self
 
     class Config:
         env_file = ".env"
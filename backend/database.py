@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from config import settings
@@ -22,7 +24,27 @@ def get_db():
         db.close()
 
 
-def init_db():
-    """Create all tables."""
-    from models import user, task  # noqa: F401 - registers models
-    Base.metadata.create_all(bind=engine)
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+# Revision matching the tables create_all() made before there were migrations
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(connection=None):
+    from alembic.config import Config
+
+    cfg = Config(ALEMBIC_INI)
+    cfg.attributes["connection"] = connection
+    return cfg
+
+
+def init_db(bind=None):
+    """Upgrade the schema to the latest migration (see migrations/)."""
+    from alembic import command
+
+    with (bind or engine).begin() as connection:
+        cfg = alembic_config(connection)
+        tables = inspect(connection).get_table_names()
+        if "tasks" in tables and "alembic_version" not in tables:
+            # Database from before migrations: adopt it instead of re-creating the tables
+            command.stamp(cfg, BASELINE_REVISION)
+        command.upgrade(cfg, "head")
@@ -32,6 +32,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # ── Routers ───────────────────────────────────────────────────────────────────
@@ -54,6 +55,13 @@ def health():
     return {"status": "ok", "service": settings.APP_NAME}
 
 
+@app.get("/ready", tags=["observability"])
+def ready():
+    """API readiness plus AI backend state (idle/loading/ready/failed/disabled) and capabilities."""
+    from services.ai import model_status
+    return {"status": "ok", "service": settings.APP_NAME, "model": model_status()}
+
+
 # ── Serve React SPA (if built) ────────────────────────────────────────────────
 FRONTEND_DIST = os.path.join(os.path.dirname(__file__), "..", "frontend", "dist")
 
@@ -70,15 +78,32 @@ if os.path.isdir(FRONTEND_DIST):
 @app.on_event("startup")
 def startup():
     init_db()
+    if settings.SEED_ON_STARTUP:
+        try:
+            from seed import seed
+            seed()
+        except Exception as exc:
+            logger.warning("seed_skipped", reason=str(exc))
+
+    from database import SessionLocal
+    from services.retrieval import warm_retrieval_index
+    db = SessionLocal()
     try:
-        from seed import seed
-        seed()
-    except Exception as exc:
-        logger.warning("seed_skipped", reason=str(exc))
+        warm_retrieval_index(db)
+    finally:
+        db.close()
 
-    # ── ADD THIS LINE ──────────────────────────────
-    from services.ai import load_custom_model
-    load_custom_model()
-    # ──────────────────────────────────────────────
+    # The custom model takes tens of seconds to load; do it in the background
+    # so the API serves traffic immediately. /ready reports progress.
+    from services.ai import start_model_loading
+    start_model_loading()
 
     logger.info("startup", app=settings.APP_NAME)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    from services.inference import shutdown_executor
+    from services.openai_client import close_openai
+    shutdown_executor()
+    await close_openai()
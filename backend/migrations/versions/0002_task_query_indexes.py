@@ -0,0 +1,27 @@
+"""composite indexes for the task list, plan context and stats queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+- (owner_id, status): list_tasks / load_plan_tasks filter on the owner (and
+  status); /stats/top-users joins tasks on owner_id.
+- (status, updated_at): the admin status filter, and /stats/cycle-time
+  groups by status in index order instead of sorting the table.
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_tasks_owner_status", "tasks", ["owner_id", "status"])
+    op.create_index("ix_tasks_status_updated", "tasks", ["status", "updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_status_updated", table_name="tasks")
+    op.drop_index("ix_tasks_owner_status", table_name="tasks")
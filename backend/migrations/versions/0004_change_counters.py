@@ -0,0 +1,60 @@
+"""change counters behind the ETags: users.version, users.tasks_version + triggers
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+users.tasks_version is bumped by triggers on every insert / update / delete
+of the user's tasks, so the list ETag can be read from the (already loaded)
+user row instead of scanning tasks.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+TRIGGERS = {
+    "sqlite": [
+        """CREATE TRIGGER tasks_bump_owner_insert AFTER INSERT ON tasks BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id = NEW.owner_id; END""",
+        """CREATE TRIGGER tasks_bump_owner_update AFTER UPDATE ON tasks BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id IN (OLD.owner_id, NEW.owner_id); END""",
+        """CREATE TRIGGER tasks_bump_owner_delete AFTER DELETE ON tasks BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id = OLD.owner_id; END""",
+    ],
+    "postgresql": [
+        """CREATE OR REPLACE FUNCTION tasks_bump_owner() RETURNS trigger AS $$
+        BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id IN (SELECT owner_id FROM changed);
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""",
+        """CREATE TRIGGER tasks_bump_owner_insert AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION tasks_bump_owner()""",
+        """CREATE TRIGGER tasks_bump_owner_update AFTER UPDATE ON tasks
+        REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION tasks_bump_owner()""",
+        """CREATE TRIGGER tasks_bump_owner_delete AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION tasks_bump_owner()""",
+    ],
+}
+TRIGGER_NAMES = ["tasks_bump_owner_insert", "tasks_bump_owner_update", "tasks_bump_owner_delete"]
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    op.add_column("users", sa.Column("tasks_version", sa.Integer(), nullable=False, server_default="0"))
+    for statement in TRIGGERS.get(op.get_bind().dialect.name, []):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for name in TRIGGER_NAMES:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}" + (" ON tasks" if dialect == "postgresql" else ""))
+    if dialect == "postgresql":
+        op.execute("DROP FUNCTION IF EXISTS tasks_bump_owner()")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("tasks_version")
+        batch.drop_column("version")
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime
+from sqlalchemy import DDL, Column, Integer, String, Text, Enum, ForeignKey, DateTime, Index, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -24,6 +24,12 @@ STATUS_TRANSITIONS: dict[TaskStatus, list[TaskStatus]] = {
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # A user's tasks (list, plan context, per-user stats), optionally by status
+        Index("ix_tasks_owner_status", "owner_id", "status"),
+        # Tasks in a status across users (admin filter, cycle-time stats), by recency
+        Index("ix_tasks_status_updated", "status", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -31,7 +37,42 @@ class Task(Base):
     status = Column(Enum(TaskStatus), default=TaskStatus.backlog, nullable=False)
     total_minutes = Column(Integer, default=0)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Bumped on every write; clients send it back in If-Match (see routers/tasks.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     owner = relationship("User", back_populates="tasks")
+
+
+# Every write to tasks bumps the owner's users.tasks_version, whoever makes
+# it (ORM, bulk statements, the backfill script) and without a round trip.
+# Migration 0004 installs the same triggers on migrated databases.
+OWNER_VERSION_TRIGGERS = {
+    "sqlite": [
+        """CREATE TRIGGER tasks_bump_owner_insert AFTER INSERT ON tasks BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id = NEW.owner_id; END""",
+        """CREATE TRIGGER tasks_bump_owner_update AFTER UPDATE ON tasks BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id IN (OLD.owner_id, NEW.owner_id); END""",
+        """CREATE TRIGGER tasks_bump_owner_delete AFTER DELETE ON tasks BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id = OLD.owner_id; END""",
+    ],
+    # Statement-level: a bulk UPDATE of 500 tasks bumps each owner once
+    "postgresql": [
+        """CREATE OR REPLACE FUNCTION tasks_bump_owner() RETURNS trigger AS $$
+        BEGIN
+            UPDATE users SET tasks_version = tasks_version + 1 WHERE id IN (SELECT owner_id FROM changed);
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""",
+        """CREATE TRIGGER tasks_bump_owner_insert AFTER INSERT ON tasks
+        REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION tasks_bump_owner()""",
+        """CREATE TRIGGER tasks_bump_owner_update AFTER UPDATE ON tasks
+        REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION tasks_bump_owner()""",
+        """CREATE TRIGGER tasks_bump_owner_delete AFTER DELETE ON tasks
+        REFERENCING OLD TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION tasks_bump_owner()""",
+    ],
+}
+
+for _dialect, _statements in OWNER_VERSION_TRIGGERS.items():
+    for _statement in _statements:
+        event.listen(Task.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
@@ -13,6 +13,11 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_admin = Column(Boolean, default=False)
+    # Bumped by routers/users.py on every profile change; ETag of /users reads
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Bumped by a trigger on every write to this user's tasks (see models/task.py);
+    # ETag of the task list and stats
+    tasks_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -1,16 +1,55 @@
-from fastapi import APIRouter, Depends, Query
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models import User, Task
+from models import User
 from services.auth import get_current_user
 from services import ai as ai_service
+from services.inference import InferenceUnavailable
+from services.logging import incr
+from services.plan_context import load_plan_tasks
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
+# How often a pending /ai/suggest checks whether its client is still there
+DISCONNECT_POLL_S = 0.25
+CLIENT_CLOSED_REQUEST = 499  # nginx convention; nobody is left to read it
+
+
+def _unavailable(exc: InferenceUnavailable) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=exc.detail,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def _unless_disconnected(request: Request, work: Awaitable[Any]) -> Any:
+    """
+    Await `work`, cancelling it if the client hangs up first.
+
+    Cancellation reaches the model: the request's batch row stops decoding
+    (or the OpenAI call is dropped) unless another client shares the result.
+    """
+    task = asyncio.ensure_future(work)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_S)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            incr("ai_requests_cancelled_total")
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+
 
 @router.post("/suggest")
 async def suggest(
+    request: Request,
     mode: str = Query("description", enum=["description", "daily_plan"]),
     title: str = Query(None, description="Task title (required for mode=description)"),
     db: Session = Depends(get_db),
@@ -23,14 +62,63 @@ async def suggest(
     """
     if mode == "description":
         if not title:
-            from fastapi import HTTPException
             raise HTTPException(status_code=400, detail="title is required for mode=description")
-        return await ai_service.generate_task_description(title)
+        try:
+            return await _unless_disconnected(request, ai_service.generate_task_description(title, owner_id=current_user.id))
+        except InferenceUnavailable as exc:
+            raise _unavailable(exc)
 
     # daily_plan mode
-    tasks = db.query(Task).filter(Task.owner_id == current_user.id).all()
-    task_list = [
-        {"title": t.title, "status": t.status.value, "total_minutes": t.total_minutes}
-        for t in tasks
-    ]
-    return await ai_service.generate_daily_plan(current_user.username, task_list)
+    tasks = load_plan_tasks(db, current_user.id)
+    return await _unless_disconnected(
+        request, ai_service.generate_daily_plan(current_user.username, tasks, owner_id=current_user.id)
+    )
+
+
+@router.post("/suggest/stream")
+async def suggest_stream(
+    mode: str = Query("description", enum=["description", "daily_plan"]),
+    title: str = Query(None, description="Task title (required for mode=description)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Same as /ai/suggest, streamed as Server-Sent Events.
+
+    Emits `token` events with `{"text": ...}` as output is decoded, then a
+    single `done` event whose data is the full /ai/suggest response.
+    """
+    if mode == "description":
+        if not title:
+            raise HTTPException(status_code=400, detail="title is required for mode=description")
+        events = ai_service.stream_task_description(title, owner_id=current_user.id)
+    else:
+        events = ai_service.stream_daily_plan(
+            current_user.username, load_plan_tasks(db, current_user.id), owner_id=current_user.id
+        )
+
+    # Pull the first event before committing to a 200 so that a saturated
+    # or still-loading model still surfaces as a proper 503
+    try:
+        first = await events.__anext__()
+    except InferenceUnavailable as exc:
+        raise _unavailable(exc)
+
+    return StreamingResponse(
+        _sse(first, events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _sse(first: dict, events: AsyncIterator[dict]) -> AsyncIterator[str]:
+    event = first
+    while True:
+        name = event.pop("event")
+        yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+        try:
+            event = await events.__anext__()
+        except StopAsyncIteration:
+            return
+        except InferenceUnavailable as exc:
+            event = {"event": "error", "detail": exc.detail, "retry_after": exc.retry_after}
@@ -1,21 +1,28 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from database import get_db
 from models import User, Task
 from services.auth import get_current_user
+from services.conditional import global_versions, not_modified, weak_etag
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
 
 @router.get("/top-users")
 def top_users(
+    response: Response,
     limit: int = 5,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
 ):
     """Top users by total minutes logged on their tasks."""
+    if (cached := not_modified(if_none_match, weak_etag("stats", *global_versions(db)), response)) is not None:
+        return cached
     rows = (
         db.query(User.id, User.username, func.sum(Task.total_minutes).label("total_minutes"))
         .join(Task, Task.owner_id == User.id)
@@ -29,10 +36,14 @@ def top_users(
 
 @router.get("/cycle-time")
 def avg_cycle_time(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     _: User = Depends(get_current_user),
 ):
     """Average total_minutes per task status."""
+    if (cached := not_modified(if_none_match, weak_etag("stats", *global_versions(db)), response)) is not None:
+        return cached
     rows = (
         db.query(Task.status, func.avg(Task.total_minutes).label("avg_minutes"), func.count(Task.id).label("count"))
         .group_by(Task.status)
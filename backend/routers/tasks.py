@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import base64
+import binascii
+from collections import defaultdict
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import case, delete, insert, select, tuple_, update
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Annotated, Literal, Optional, Union
 from datetime import datetime
 
 from database import get_db
 from models import User, Task, TaskStatus, STATUS_TRANSITIONS
 from services.auth import get_current_user, get_admin_user
+from services.conditional import global_versions, not_modified, owner_tasks_version, weak_etag
+from services.plan_cache import invalidate_plan
+from services.retrieval import forget_task, index_task
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_BULK_OPERATIONS = 1000
+
 
 class TaskOut(BaseModel):
     id: int
@@ -18,6 +29,7 @@ class TaskOut(BaseModel):
     status: TaskStatus
     total_minutes: int
     owner_id: int
+    version: int
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -25,6 +37,10 @@ class TaskOut(BaseModel):
         from_attributes = True
 
 
+# Columns of a TaskOut, for queries that skip building ORM objects
+TASK_OUT_COLUMNS = [getattr(Task, field) for field in TaskOut.model_fields]
+
+
 class TaskCreate(BaseModel):
     title: str
     description: str = ""
@@ -43,14 +59,191 @@ class StatusTransition(BaseModel):
     new_status: TaskStatus
 
 
+class BulkCreate(TaskCreate):
+    op: Literal["create"]
+
+
+class BulkUpdate(TaskUpdate):
+    op: Literal["update"]
+    id: int
+    version: Optional[int] = None  # like If-Match: 409 if the task changed since
+
+
+class BulkTransition(StatusTransition):
+    op: Literal["transition"]
+    id: int
+    version: Optional[int] = None
+
+
+class BulkDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+    version: Optional[int] = None
+
+
+BulkOperation = Annotated[Union[BulkCreate, BulkUpdate, BulkTransition, BulkDelete], Field(discriminator="op")]
+
+
+class BulkRequest(BaseModel):
+    operations: list[BulkOperation] = Field(..., min_length=1, max_length=MAX_BULK_OPERATIONS)
+
+
+class BulkResult(BaseModel):
+    index: int
+    op: str
+    status: int  # what the single-task endpoint would have answered
+    task: Optional[TaskOut] = None
+    error: Optional[str] = None
+
+
+class BulkResponse(BaseModel):
+    applied: int
+    failed: int
+    results: list[BulkResult]
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, _, last_id = raw.partition(":")
+        if prefix != "id":
+            raise ValueError(raw)
+        return int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """The task version an If-Match header requires (None for no header or `*`)."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a task ETag, e.g. \"3\"")
+
+
+def _conditional_update(
+    db: Session, task_id: int, values: dict, user: User, expected_version: Optional[int], *conditions
+) -> Optional[dict]:
+    """
+    UPDATE the task if it is the user's, at `expected_version` (if given)
+    and matches `conditions`, bumping its version; returns the new TaskOut
+    row, or None when nothing matched. One round trip where the dialect
+    has UPDATE ... RETURNING.
+    """
+    stmt = (
+        update(Task)
+        .where(Task.id == task_id, *conditions)
+        .values(**values, version=Task.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if not user.is_admin:
+        stmt = stmt.where(Task.owner_id == user.id)
+    if expected_version is not None:
+        stmt = stmt.where(Task.version == expected_version)
+
+    if db.get_bind().dialect.update_returning:
+        row = db.execute(stmt.returning(*TASK_OUT_COLUMNS)).mappings().first()
+    else:
+        matched = db.execute(stmt).rowcount
+        row = db.execute(select(*TASK_OUT_COLUMNS).where(Task.id == task_id)).mappings().first() if matched else None
+    db.commit()
+    return row
+
+
+def _explain_miss(db: Session, task_id: int, user: User, expected_version: Optional[int]) -> TaskStatus:
+    """
+    Raise the 404 / 403 / 409 for a conditional update that matched
+    nothing; otherwise return the task's current status for the caller.
+    """
+    current = db.execute(select(Task.owner_id, Task.status, Task.version).where(Task.id == task_id)).first()
+    if current is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not user.is_admin and current.owner_id != user.id:
+        raise HTTPException(status_code=403, detail="Not allowed")
+    if expected_version is not None and current.version != expected_version:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Task was modified (now version {current.version}, you had {expected_version}); reload and retry",
+            headers={"ETag": etag(current.version)},
+        )
+    return current.status
+
+
+def _changed_concurrently() -> HTTPException:
+    # The row changed between the UPDATE and the look at why it missed
+    return HTTPException(status_code=409, detail="Task was modified concurrently; reload and retry")
+
+
 @router.get("/", response_model=list[TaskOut])
 def list_tasks(
+    response: Response,
+    status_filter: Optional[TaskStatus] = Query(None, alias="status"),
+    owner_id: Optional[int] = Query(None, description="Admins only; others always see their own tasks"),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    updated_after: Optional[datetime] = None,
+    updated_before: Optional[datetime] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    if current_user.is_admin:
-        return db.query(Task).all()
-    return db.query(Task).filter(Task.owner_id == current_user.id).all()
+    """
+    One page of tasks in id order.
+
+    When more tasks match, the `X-Next-Cursor` response header holds the
+    cursor for the next page; the body stays a plain list. The weak ETag
+    comes from the owner's tasks_version, so an unchanged list is a 304
+    without reading any task.
+    """
+    if not current_user.is_admin:
+        if owner_id is not None and owner_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not allowed")
+        owner_id = current_user.id
+
+    if owner_id == current_user.id:
+        tag = weak_etag("tasks", owner_id, current_user.tasks_version)
+    elif owner_id is not None:
+        tag = weak_etag("tasks", owner_id, owner_tasks_version(db, owner_id))
+    else:
+        tag = weak_etag("tasks", "all", global_versions(db)[0])
+    if (cached := not_modified(if_none_match, tag, response)) is not None:
+        return cached
+
+    query = select(*TASK_OUT_COLUMNS)
+    if owner_id is not None:
+        query = query.where(Task.owner_id == owner_id)
+    if status_filter is not None:
+        query = query.where(Task.status == status_filter)
+    if created_after is not None:
+        query = query.where(Task.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(Task.created_at < created_before)
+    if updated_after is not None:
+        query = query.where(Task.updated_at >= updated_after)
+    if updated_before is not None:
+        query = query.where(Task.updated_at < updated_before)
+    if cursor is not None:
+        query = query.where(Task.id > decode_cursor(cursor))
+
+    # Column rows instead of ORM objects; one extra row tells us whether
+    # there is a next page
+    rows = db.execute(query.order_by(Task.id).limit(limit + 1)).mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["id"])
+    return rows
 
 
 @router.post("/", response_model=TaskOut, status_code=status.HTTP_201_CREATED)
@@ -74,45 +267,192 @@ def create_task(
     db.add(task)
     db.commit()
     db.refresh(task)
+    invalidate_plan(owner_id)
+    index_task(task.id, task.title, task.description, task.owner_id)
     return task
 
 
+@router.post("/bulk", response_model=BulkResponse)
+def bulk_tasks(
+    payload: BulkRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Apply up to MAX_BULK_OPERATIONS create / update / transition / delete
+    operations in one request.
+
+    All operations are checked (ownership, `version`, STATUS_TRANSITIONS)
+    against one lookup of the tasks they name; the valid ones are then
+    written in a single transaction with one statement per kind of change,
+    and the rest are reported in `results` without holding them up. A task
+    may be named by at most one operation per request.
+    """
+    ops = payload.operations
+    results: list[Optional[BulkResult]] = [None] * len(ops)
+
+    def fail(i: int, code: int, detail: str) -> None:
+        results[i] = BulkResult(index=i, op=ops[i].op, status=code, error=detail)
+
+    # ── Validate ──────────────────────────────────────────────────────────
+    ids = [op.id for op in ops if op.op != "create"]
+    current = {}
+    if ids:
+        # FOR UPDATE (Postgres) keeps the checked rows from moving until the
+        # commit; the writes below are guarded on what was checked regardless
+        query = select(Task.id, Task.owner_id, Task.status, Task.version).where(Task.id.in_(ids)).with_for_update()
+        current = {row.id: row for row in db.execute(query)}
+    other_owners = {op.owner_id for op in ops if op.op == "create" and op.owner_id not in (None, current_user.id)}
+    known_owners = set()
+    if other_owners and current_user.is_admin:
+        known_owners = set(db.execute(select(User.id).where(User.id.in_(other_owners))).scalars())
+
+    creates, updates, transitions, deletes = [], [], defaultdict(list), []
+    named = set()
+    for i, op in enumerate(ops):
+        if op.op == "create":
+            owner_id = op.owner_id or current_user.id
+            if owner_id != current_user.id and not current_user.is_admin:
+                fail(i, 403, "Cannot create tasks for other users")
+            elif owner_id != current_user.id and owner_id not in known_owners:
+                fail(i, 404, "Owner not found")
+            else:
+                creates.append((i, {**op.model_dump(exclude={"op"}), "owner_id": owner_id}))
+            continue
+
+        task = current.get(op.id)
+        if op.id in named:
+            fail(i, 400, "Task is named by more than one operation")
+        elif task is None:
+            fail(i, 404, "Task not found")
+        elif not current_user.is_admin and task.owner_id != current_user.id:
+            fail(i, 403, "Not allowed")
+        elif op.version is not None and op.version != task.version:
+            fail(i, 409, f"Task was modified (now version {task.version}, you had {op.version})")
+        elif op.op == "transition" and op.new_status not in STATUS_TRANSITIONS[task.status]:
+            allowed = STATUS_TRANSITIONS[task.status]
+            fail(i, 400, f"Cannot transition from '{task.status}' to '{op.new_status}'. "
+                         f"Allowed: {[s.value for s in allowed]}")
+        elif op.op == "update":
+            updates.append((i, op.id, op.model_dump(exclude={"op", "id", "version"}, exclude_none=True)))
+        elif op.op == "transition":
+            transitions[op.new_status].append((i, op.id))
+        else:
+            deletes.append((i, op.id))
+        named.add(op.id)
+
+    # ── Apply, one statement per kind of change ───────────────────────────
+    # Like _conditional_update, every statement only matches rows still at
+    # the version (and, for transitions, in a status) checked above, and
+    # RETURNING says which ones it touched: an operation whose task was
+    # changed or deleted by a concurrent write is reported as a 409.
+    tasks = Task.__table__
+
+    def as_checked(stmt, items: list[tuple[int, int]]):
+        task_ids = [task_id for _, task_id in items]
+        stmt = stmt.where(
+            tasks.c.id.in_(task_ids),  # keeps the primary key lookup
+            tuple_(tasks.c.id, tasks.c.version).in_([(task_id, current[task_id].version) for task_id in task_ids]),
+        )
+        if not current_user.is_admin:
+            stmt = stmt.where(tasks.c.owner_id == current_user.id)
+        return stmt
+
+    def settle(items: list[tuple[int, int]], rows, code: int) -> None:
+        touched = {row["id"]: row for row in rows}
+        for i, task_id in items:
+            if task_id not in touched:
+                fail(i, 409, _changed_concurrently().detail)
+            else:
+                results[i] = BulkResult(index=i, op=ops[i].op, status=code, task=touched[task_id] if code != 204 else None)
+
+    if creates:
+        stmt = insert(Task).returning(*TASK_OUT_COLUMNS, sort_by_parameter_order=True)
+        rows = db.execute(stmt, [values for _, values in creates]).mappings().all()
+        for (i, _), row in zip(creates, rows):
+            results[i] = BulkResult(index=i, op="create", status=201, task=row)
+
+    if updates:
+        # One statement for every edit: each field is a CASE on the task id
+        # that leaves tasks which do not change it alone
+        fields = sorted({field for _, _, values in updates for field in values})
+        stmt = update(tasks).values(
+            version=tasks.c.version + 1,
+            **{
+                field: case(
+                    {task_id: values[field] for _, task_id, values in updates if field in values},
+                    value=tasks.c.id,
+                    else_=tasks.c[field],
+                )
+                for field in fields
+            },
+        )
+        items = [(i, task_id) for i, task_id, _ in updates]
+        settle(items, db.execute(as_checked(stmt, items).returning(*TASK_OUT_COLUMNS)).mappings(), 200)
+    for new_status, items in transitions.items():
+        sources = [s for s, targets in STATUS_TRANSITIONS.items() if new_status in targets]
+        stmt = update(tasks).where(tasks.c.status.in_(sources)).values(status=new_status, version=tasks.c.version + 1)
+        settle(items, db.execute(as_checked(stmt, items).returning(*TASK_OUT_COLUMNS)).mappings(), 200)
+    if deletes:
+        settle(deletes, db.execute(as_checked(delete(tasks), deletes).returning(tasks.c.id)).mappings(), 204)
+    db.commit()
+
+    # ── Caches and the retrieval index, as the single-task endpoints do ───
+    applied = [r for r in results if r.error is None]
+    owners = {r.task.owner_id for r in applied if r.task} | {
+        current[ops[r.index].id].owner_id for r in applied if r.op == "delete"
+    }
+    for owner_id in owners:
+        invalidate_plan(owner_id)
+    for r in applied:
+        op = ops[r.index]
+        if r.op == "create" or (r.op == "update" and (op.title is not None or op.description is not None)):
+            index_task(r.task.id, r.task.title, r.task.description, r.task.owner_id)
+        elif r.op == "delete":
+            forget_task(op.id)
+
+    return BulkResponse(applied=len(applied), failed=len(results) - len(applied), results=results)
+
+
 @router.get("/{task_id}", response_model=TaskOut)
 def get_task(
     task_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
+    head = db.execute(select(Task.owner_id, Task.version).where(Task.id == task_id)).first()
+    if not head:
         raise HTTPException(status_code=404, detail="Task not found")
-    if not current_user.is_admin and task.owner_id != current_user.id:
+    if not current_user.is_admin and head.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not allowed")
-    return task
+    # Strong, since the same value is what If-Match takes on writes
+    if (cached := not_modified(if_none_match, etag(head.version), response)) is not None:
+        return cached
+    return db.execute(select(*TASK_OUT_COLUMNS).where(Task.id == task_id)).mappings().one()
 
 
 @router.patch("/{task_id}", response_model=TaskOut)
 def update_task(
     task_id: int,
     payload: TaskUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag from an earlier response; 409 if the task changed since"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if not current_user.is_admin and task.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not allowed")
-
-    if payload.title is not None:
-        task.title = payload.title
-    if payload.description is not None:
-        task.description = payload.description
-    if payload.total_minutes is not None:
-        task.total_minutes = payload.total_minutes
+    expected_version = parse_if_match(if_match)
+    values = payload.model_dump(exclude_none=True)
+    task = _conditional_update(db, task_id, values, current_user, expected_version)
+    if task is None:
+        _explain_miss(db, task_id, current_user, expected_version)
+        raise _changed_concurrently()
 
-    db.commit()
-    db.refresh(task)
+    response.headers["ETag"] = etag(task["version"])
+    invalidate_plan(task["owner_id"])
+    if payload.title is not None or payload.description is not None:
+        index_task(task["id"], task["title"], task["description"], task["owner_id"])
     return task
 
 
@@ -120,26 +460,34 @@ def update_task(
 def transition_task(
     task_id: int,
     payload: StatusTransition,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag from an earlier response; 409 if the task changed since"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if not current_user.is_admin and task.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not allowed")
-
-    allowed = STATUS_TRANSITIONS[task.status]
-    if payload.new_status not in allowed:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot transition from '{task.status}' to '{payload.new_status}'. "
-                   f"Allowed: {[s.value for s in allowed]}",
-        )
+    """
+    Move the task to `new_status` with a single conditional UPDATE: it only
+    matches while the task is still in a status that may move there, so two
+    concurrent drags cannot both succeed.
+    """
+    expected_version = parse_if_match(if_match)
+    sources = [s for s, targets in STATUS_TRANSITIONS.items() if payload.new_status in targets]
+    task = _conditional_update(
+        db, task_id, {"status": payload.new_status}, current_user, expected_version, Task.status.in_(sources)
+    )
+    if task is None:
+        current = _explain_miss(db, task_id, current_user, expected_version)
+        allowed = STATUS_TRANSITIONS[current]
+        if payload.new_status not in allowed:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot transition from '{current}' to '{payload.new_status}'. "
+                       f"Allowed: {[s.value for s in allowed]}",
+            )
+        raise _changed_concurrently()
 
-    task.status = payload.new_status
-    db.commit()
-    db.refresh(task)
+    response.headers["ETag"] = etag(task["version"])
+    invalidate_plan(task["owner_id"])
     return task
 
 
@@ -154,5 +502,8 @@ def delete_task(
         raise HTTPException(status_code=404, detail="Task not found")
     if not current_user.is_admin and task.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not allowed")
+    owner_id = task.owner_id
     db.delete(task)
     db.commit()
+    invalidate_plan(owner_id)
+    forget_task(task_id)
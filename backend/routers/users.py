@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from typing import Optional
@@ -6,6 +7,7 @@ from typing import Optional
 from database import get_db
 from models import User
 from services.auth import hash_password, get_current_user, get_admin_user
+from services.conditional import not_modified, weak_etag
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -28,7 +30,14 @@ class UserUpdate(BaseModel):
 
 
 @router.get("/me", response_model=UserOut)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    tag = weak_etag("user", current_user.id, current_user.version)
+    if (cached := not_modified(if_none_match, tag, response)) is not None:
+        return cached
     return current_user
 
 
@@ -43,16 +52,20 @@ def list_users(
 @router.get("/{user_id}", response_model=UserOut)
 def get_user(
     user_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     # Admins can see anyone; regular users can only see themselves
     if not current_user.is_admin and current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not allowed")
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    version = db.execute(select(User.version).where(User.id == user_id)).scalar()
+    if version is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    if (cached := not_modified(if_none_match, weak_etag("user", user_id, version), response)) is not None:
+        return cached
+    return db.query(User).filter(User.id == user_id).first()
 
 
 @router.patch("/{user_id}", response_model=UserOut)
@@ -76,6 +89,7 @@ def update_user(
         user.hashed_password = hash_password(payload.password)
     if payload.is_admin is not None and current_user.is_admin:
         user.is_admin = payload.is_admin
+    user.version = User.version + 1
 
     db.commit()
     db.refresh(user)
@@ -86,10 +100,20 @@ def update_user(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(get_admin_user),
+    admin: User = Depends(get_admin_user),
 ):
+    # The admin must outlive the delete: they inherit the deleted counter below
+    if admin.id == user_id:
+        raise HTTPException(status_code=400, detail="Admins cannot delete their own account")
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    # Keep the sum of tasks_version growing (see services/conditional.global_versions)
+    # by handing the deleted counter, plus one, to the admin doing the delete
+    db.execute(
+        update(User).where(User.id == admin.id)
+        .values(tasks_version=User.tasks_version + user.tasks_version + 1)
+        .execution_options(synchronize_session=False)
+    )
     db.delete(user)
     db.commit()
@@ -1,173 +1,53 @@
-# """AI service: live OpenAI call with deterministic stub fallback."""
-# from typing import Optional
-# import json
-
-# from config import settings
-
-
-# STUB_DESCRIPTION = (
-#     "This task involves researching, planning, and implementing the core feature. "
-#     "Break it down into subtasks: (1) gather requirements, (2) design the approach, "
-#     "(3) implement incrementally, (4) write tests, (5) review and iterate."
-# )
-
-# STUB_DAILY_PLAN = {
-#     "plan": [
-#         {"time": "09:00", "activity": "Review backlog and pick top 3 tasks"},
-#         {"time": "09:30", "activity": "Deep work block — tackle highest-priority task"},
-#         {"time": "12:00", "activity": "Lunch + async comms (email/Slack)"},
-#         {"time": "13:00", "activity": "Continue top-priority task or start second task"},
-#         {"time": "15:30", "activity": "Code review / collaboration / unblocking teammates"},
-#         {"time": "16:30", "activity": "Wrap up, update task statuses, log time"},
-#         {"time": "17:00", "activity": "Plan tomorrow — update estimates.csv"},
-#     ],
-#     "source": "stub",
-# }
-
-
-# def _use_stub() -> bool:
-#     return settings.USE_AI_STUB or not settings.OPENAI_API_KEY
-
-
-# async def generate_task_description(title: str) -> dict:
-#     """Generate a task description from a short title."""
-#     if _use_stub():
-#         return {
-#             "title": title,
-#             "description": f"[STUB] {STUB_DESCRIPTION}",
-#             "source": "stub",
-#         }
-
-#     try:
-#         from openai import AsyncOpenAI
-
-#         client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-#         response = await client.chat.completions.create(
-#             model="gpt-4o-mini",
-#             messages=[
-#                 {
-#                     "role": "system",
-#                     "content": (
-#                         "You are a helpful engineering project manager. "
-#                         "Given a short task title, write a clear, concise task description "
-#                         "(2-4 sentences) that explains what needs to be done and why it matters. "
-#                         "Be specific and actionable."
-#                     ),
-#                 },
-#                 {"role": "user", "content": f"Task title: {title}"},
-#             ],
-#             max_tokens=200,
-#             temperature=0.7,
-#         )
-#         description = response.choices[0].message.content.strip()
-#         return {"title": title, "description": description, "source": "openai"}
-#     except Exception as exc:
-#         # Graceful degradation: fall back to stub on any error
-#         return {
-#             "title": title,
-#             "description": STUB_DESCRIPTION,
-#             "source": "stub-fallback",
-#             "error": str(exc),
-#         }
-
-
-# async def generate_daily_plan(username: str, tasks: list[dict]) -> dict:
-#     """Return a concise daily plan for the signed-in user."""
-#     if _use_stub():
-#         return {**STUB_DAILY_PLAN, "user": username}
-
-#     try:
-#         from openai import AsyncOpenAI
-
-#         client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-#         task_summary = json.dumps(
-#             [{"title": t["title"], "status": t["status"], "minutes": t["total_minutes"]} for t in tasks],
-#             indent=2,
-#         )
-#         response = await client.chat.completions.create(
-#             model="gpt-4o-mini",
-#             messages=[
-#                 {
-#                     "role": "system",
-#                     "content": (
-#                         "You are an expert engineering coach. Given a user's current tasks, "
-#                         "produce a concise daily schedule in JSON with a 'plan' array of "
-#                         "objects with 'time' (HH:MM) and 'activity' fields. Max 8 items. "
-#                         "Respond ONLY with valid JSON."
-#                     ),
-#                 },
-#                 {
-#                     "role": "user",
-#                     "content": f"User: {username}\nTasks:\n{task_summary}",
-#                 },
-#             ],
-#             max_tokens=400,
-#             temperature=0.5,
-#             response_format={"type": "json_object"},
-#         )
-#         plan_data = json.loads(response.choices[0].message.content)
-#         return {**plan_data, "user": username, "source": "openai"}
-#     except Exception as exc:
-#         return {**STUB_DAILY_PLAN, "user": username, "source": "stub-fallback", "error": str(exc)}
-"""AI service: custom trained model with stub fallback."""
-from typing import Optional
+"""AI service: pluggable description backend (services.backends) with stub fallback.
+
+torch / transformers / peft / onnxruntime / openai are imported inside the
+backends that use them, so importing this module (every worker, test run
+and seed.py) stays cheap when the stub is in use.
+"""
+from typing import AsyncIterator, Optional
 import json
-import torch
+import threading
 
 from config import settings
+from services.ai_cache import get_cache, make_key
+from services.backends import get_backend
+from services.backends.stub import STUB_DESCRIPTION
+from services.inference import InferenceUnavailable, ModelLoading
+from services.logging import logger, register_gauge
+from services.openai_client import get_openai
+from services.plan_cache import get_plan_cache, plan_fingerprint
+from services.plan_context import build_plan_context
+from services.retrieval import lookup_description
+from services.scheduler import schedule_day
+from services.singleflight import SingleFlight
 
-# ── Load custom model once at startup ─────────────────────────────────────
-_model = None
-_tokenizer = None
 
-def load_custom_model():
-    global _model, _tokenizer
-    try:
-        from transformers import AutoTokenizer, AutoModelForCausalLM
-        from peft import PeftModel
-
-        print("Loading custom SprintSync model...")
-        MODEL_PATH = "./LLM_model_trainig/sprintsync-model/final"
-        BASE_MODEL  = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
-
-        base = AutoModelForCausalLM.from_pretrained(BASE_MODEL)
-        _model = PeftModel.from_pretrained(base, MODEL_PATH)
-        _tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH)
-        _model.eval()
-        print("Custom model loaded successfully!")
-    except Exception as e:
-        print(f"Custom model failed to load: {e}")
-        print("Will use stub fallback.")
-
-
-def _generate_with_model(title: str) -> str:
-    prompt = f"Task title: {title}\n\nDescription:"
-    inputs = _tokenizer(prompt, return_tensors="pt")
-
-    with torch.no_grad():
-        outputs = _model.generate(
-            **inputs,
-            max_new_tokens=150,
-            temperature=0.7,
-            do_sample=True,
-            pad_token_id=_tokenizer.eos_token_id,
-        )
+# ── Backend loading ────────────────────────────────────────────────────────
+def load_backend() -> None:
+    """Load the configured backend in the calling thread (weights, sessions, ...)."""
+    get_backend().load()
 
-    full_text = _tokenizer.decode(outputs[0], skip_special_tokens=True)
-    # Extract only the description part after "Description:"
-    description = full_text.split("Description:")[-1].strip()
-    # Clean up — stop at end of text token if present
-    description = description.split("<|endoftext|>")[0].strip()
-    return description
 
+def start_model_loading() -> None:
+    """Load the backend on a background thread so startup is not blocked."""
+    backend = get_backend()
+    if backend.state["status"] != "idle":
+        return
+    if not backend.needs_loading:
+        backend.load()
+        return
+    backend.state["status"] = "loading"
+    threading.Thread(target=backend.load, name="model-loader", daemon=True).start()
+
+
+def model_status() -> dict:
+    return get_backend().status()
+
+
+register_gauge("ai_model_ready", lambda: int(get_backend().ready))
 
-# ── Stub fallbacks ─────────────────────────────────────────────────────────
-STUB_DESCRIPTION = (
-    "This task involves researching, planning, and implementing the core feature. "
-    "Break it down into subtasks: (1) gather requirements, (2) design the approach, "
-    "(3) implement incrementally, (4) write tests, (5) review and iterate."
-)
 
+# ── Stub fallbacks ─────────────────────────────────────────────────────────
 STUB_DAILY_PLAN = {
     "plan": [
         {"time": "09:00", "activity": "Review backlog and pick top 3 tasks"},
@@ -183,12 +63,42 @@ STUB_DAILY_PLAN = {
 
 
 def _use_stub() -> bool:
-    return settings.USE_AI_STUB or _model is None
+    backend = get_backend()
+    return backend.name == "stub" or not backend.ready
+
+
+def _check_model_loaded() -> None:
+    """While the backend is still loading, ask the client to retry instead of serving the stub."""
+    if get_backend().state["status"] == "loading":
+        raise ModelLoading(retry_after=5)
+
+
+def _cache_key(title: str) -> str:
+    backend = get_backend()
+    return make_key(title, backend.model_id or "unversioned", backend.cache_params())
+
+
+# Identical requests that arrive while one is already running share its result
+_description_flights = SingleFlight("ai_description")
+_plan_flights = SingleFlight("ai_daily_plan")
 
 
 # ── Public functions ───────────────────────────────────────────────────────
-async def generate_task_description(title: str) -> dict:
-    """Generate a task description using custom trained model."""
+async def generate_task_description(title: str, owner_id: Optional[int] = None) -> dict:
+    """
+    Generate a task description with the configured backend.
+
+    `owner_id` is the requester: only their own saved descriptions (and the
+    training examples) may be handed back by retrieval.
+    """
+    backend = get_backend()
+    # A near-identical title already has a description: no model needed,
+    # so this is served even while the backend is still loading
+    known = lookup_description(title, owner_id) if backend.name != "stub" else None
+    if known is not None:
+        return {"title": title, "description": known, "source": "retrieval"}
+
+    _check_model_loaded()
     if _use_stub():
         return {
             "title": title,
@@ -196,13 +106,28 @@ async def generate_task_description(title: str) -> dict:
             "source": "stub",
         }
 
+    cache = get_cache()
+    key = _cache_key(title)
+    if cache is not None:
+        cached = await cache.get(key)
+        if cached is not None:
+            return {"title": title, "description": cached, "source": "cache"}
+
+    async def generate() -> str:
+        description = await backend.describe(title)
+        if cache is not None and description:
+            await cache.put(key, description)
+        return description
+
     try:
-        description = _generate_with_model(title)
+        description = await _description_flights.do(key, generate)
         return {
             "title": title,
             "description": description,
-            "source": "custom-model",   # shows custom-model in UI
+            "source": backend.source,   # "custom-model" shows in the UI
         }
+    except InferenceUnavailable:
+        raise
     except Exception as exc:
         return {
             "title": title,
@@ -212,40 +137,196 @@ async def generate_task_description(title: str) -> dict:
         }
 
 
-async def generate_daily_plan(username: str, tasks: list[dict]) -> dict:
-    """Daily plan — still uses OpenAI if available, else stub."""
-    if settings.USE_AI_STUB or not settings.OPENAI_API_KEY:
-        return {**STUB_DAILY_PLAN, "user": username}
+async def stream_task_description(title: str, owner_id: Optional[int] = None) -> AsyncIterator[dict]:
+    """
+    Stream a task description as it is decoded.
 
+    Yields {"event": "token", "text": ...} per decoded chunk and finally
+    {"event": "done", ...} carrying the same payload generate_task_description
+    would have returned. Backends without streaming send one token event.
+    """
+    backend = get_backend()
+    known = lookup_description(title, owner_id) if backend.name != "stub" else None
+    if known is not None:
+        yield {"event": "token", "text": known}
+        yield {"event": "done", "title": title, "description": known, "source": "retrieval"}
+        return
+
+    _check_model_loaded()
+    if _use_stub():
+        description = f"[STUB] {STUB_DESCRIPTION}"
+        for word in description.split(" "):
+            yield {"event": "token", "text": word + " "}
+        yield {"event": "done", "title": title, "description": description, "source": "stub"}
+        return
+
+    cache = get_cache()
+    key = _cache_key(title)
+    cached = await cache.get(key) if cache is not None else None
+    if cached is not None:
+        yield {"event": "token", "text": cached}
+        yield {"event": "done", "title": title, "description": cached, "source": "cache"}
+        return
+
+    # Streaming needs its own generation, so it bypasses batching and coalescing
+    text = ""
     try:
-        from openai import AsyncOpenAI
-        client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-        task_summary = json.dumps(
-            [{"title": t["title"], "status": t["status"], "minutes": t["total_minutes"]} for t in tasks],
-            indent=2,
-        )
-        response = await client.chat.completions.create(
+        async for chunk in backend.stream(title):
+            text += chunk
+            yield {"event": "token", "text": chunk}
+    except InferenceUnavailable:
+        raise
+    except Exception as exc:
+        yield {"event": "done", "title": title, "description": STUB_DESCRIPTION,
+               "source": "stub-fallback", "error": str(exc)}
+        return
+    description = text.strip()
+    if cache is not None and description:
+        await cache.put(key, description)
+    yield {"event": "done", "title": title, "description": description, "source": backend.source}
+
+
+def _daily_plan_messages(username: str, tasks: list[dict]) -> list[dict]:
+    task_summary = build_plan_context(tasks, settings.AI_PLAN_CONTEXT_TOKENS)
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are an expert engineering coach. Given a user's current tasks, "
+                "produce a concise daily schedule in JSON with a 'plan' array of "
+                "objects with 'time' (HH:MM) and 'activity' fields. Max 8 items. "
+                "Respond ONLY with valid JSON."
+            ),
+        },
+        {
+            "role": "user",
+            "content": f"User: {username}\nTasks:\n{task_summary}",
+        },
+    ]
+
+
+def _plan_engine() -> str:
+    """Which engine serves daily plans: stub | local | openai."""
+    if settings.USE_AI_STUB:
+        return "stub"
+    engine = settings.AI_PLAN_ENGINE
+    if engine == "local" or (engine == "auto" and not settings.OPENAI_API_KEY):
+        return "local"
+    return "openai" if settings.OPENAI_API_KEY else "stub"
+
+
+async def _rephrase_plan(plan: list[dict]) -> dict:
+    """Have OpenAI reword a scheduled plan; the times must come back unchanged."""
+    response = await get_openai().chat(
+        model="gpt-4o-mini",
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "Rewrite each 'activity' of this daily schedule to be short, concrete "
+                    "and motivating. Keep the same items, order and 'time' values. "
+                    "Respond ONLY with valid JSON of the same shape."
+                ),
+            },
+            {"role": "user", "content": json.dumps({"plan": plan})},
+        ],
+        max_tokens=400,
+        temperature=0.3,
+        response_format={"type": "json_object"},
+    )
+    rephrased = json.loads(response.choices[0].message.content)["plan"]
+    if [item["time"] for item in rephrased] != [item["time"] for item in plan]:
+        raise ValueError("rephrased plan changed the schedule")
+    return {"plan": rephrased, "rephrased": True}
+
+
+async def generate_daily_plan(username: str, tasks: list[dict], owner_id: Optional[int] = None) -> dict:
+    """
+    Daily plan from the local scheduler or OpenAI (see AI_PLAN_ENGINE), else stub.
+
+    With `owner_id` LLM-produced plans are cached until the owner's tasks
+    change or the day ends (see services.plan_cache).
+    """
+    engine = _plan_engine()
+    if engine == "stub":
+        return {**STUB_DAILY_PLAN, "user": username}
+    if engine == "local":
+        local = {**schedule_day(tasks), "user": username, "source": "local-scheduler"}
+        if not (settings.AI_PLAN_REPHRASE and settings.OPENAI_API_KEY):
+            return local
+
+    cache = get_plan_cache() if owner_id is not None else None
+    fingerprint = plan_fingerprint(username, tasks)
+    if cache is not None:
+        cached = cache.get(owner_id, fingerprint)
+        if cached is not None:
+            return {**cached, "user": username, "source": "cache"}
+
+    async def generate() -> dict:
+        if engine == "local":
+            return await _rephrase_plan(local["plan"])
+        response = await get_openai().chat(
             model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an expert engineering coach. Given a user's current tasks, "
-                        "produce a concise daily schedule in JSON with a 'plan' array of "
-                        "objects with 'time' (HH:MM) and 'activity' fields. Max 8 items. "
-                        "Respond ONLY with valid JSON."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": f"User: {username}\nTasks:\n{task_summary}",
-                },
-            ],
+            messages=_daily_plan_messages(username, tasks),
             max_tokens=400,
             temperature=0.5,
             response_format={"type": "json_object"},
         )
-        plan_data = json.loads(response.choices[0].message.content)
-        return {**plan_data, "user": username, "source": "openai"}
+        return json.loads(response.choices[0].message.content)
+
+    try:
+        plan_data = await _plan_flights.do(f"{engine}:{fingerprint}", generate)
+        if cache is not None:
+            cache.put(owner_id, fingerprint, plan_data)
+        return {**plan_data, "user": username, "source": "openai" if engine == "openai" else "local-scheduler"}
+    except Exception as exc:
+        logger.warning("daily_plan_fallback", reason=str(exc), error_type=type(exc).__name__)
+        if engine == "local":
+            return local
+        return {**STUB_DAILY_PLAN, "user": username, "source": "stub-fallback", "error": str(exc)}
+
+
+async def stream_daily_plan(
+    username: str, tasks: list[dict], owner_id: Optional[int] = None
+) -> AsyncIterator[dict]:
+    """
+    Stream the raw JSON of a daily plan as OpenAI produces it.
+
+    Token events carry JSON fragments; the final "done" event carries the
+    parsed plan, exactly as generate_daily_plan returns it. Stub and local
+    plans are ready at once and arrive as a single token event.
+    """
+    if _plan_engine() != "openai":
+        plan = await generate_daily_plan(username, tasks, owner_id)
+        yield {"event": "token", "text": json.dumps({"plan": plan["plan"]})}
+        yield {"event": "done", **plan}
+        return
+
+    cache = get_plan_cache() if owner_id is not None else None
+    fingerprint = plan_fingerprint(username, tasks)
+    cached = cache.get(owner_id, fingerprint) if cache is not None else None
+    if cached is not None:
+        yield {"event": "token", "text": json.dumps(cached)}
+        yield {"event": "done", **cached, "user": username, "source": "cache"}
+        return
+
+    try:
+        content = ""
+        async for delta in get_openai().stream_chat(
+            model="gpt-4o-mini",
+            messages=_daily_plan_messages(username, tasks),
+            max_tokens=400,
+            temperature=0.5,
+            response_format={"type": "json_object"},
+        ):
+            content += delta
+            yield {"event": "token", "text": delta}
+        plan_data = json.loads(content)
     except Exception as exc:
-        return {**STUB_DAILY_PLAN, "user": username, "source": "stub-fallback", "error": str(exc)}
\ No newline at end of file
+        logger.warning("daily_plan_fallback", reason=str(exc), error_type=type(exc).__name__)
+        yield {"event": "done", **STUB_DAILY_PLAN, "user": username,
+               "source": "stub-fallback", "error": str(exc)}
+        return
+    if cache is not None:
+        cache.put(owner_id, fingerprint, plan_data)
+    yield {"event": "done", **plan_data, "user": username, "source": "openai"}
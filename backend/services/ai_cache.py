@@ -0,0 +1,174 @@
+"""Two-tier (memory LRU + SQLite) cache for generated task descriptions."""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import settings
+from services.logging import incr, register_gauge
+
+
+def normalize_title(title: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", title).strip().casefold().rstrip(".!?:;")
+
+
+def model_fingerprint(model_path: str, base_model: str) -> str:
+    """
+    Identity of a model/adapter on disk.
+
+    Hashes the base model name plus the name and content of every file
+    under `model_path`, so re-training or swapping the adapter changes the
+    fingerprint while a fresh checkout of the same files does not.
+    """
+    digest = hashlib.sha256(base_model.encode())
+    for root, _, files in sorted(os.walk(model_path)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, model_path).encode())
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def make_key(title: str, model_id: str, params: dict) -> str:
+    payload = json.dumps(
+        {"title": normalize_title(title), "model": model_id, "params": params},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class DescriptionCache:
+    """
+    In-process LRU in front of a size-bounded SQLite table.
+
+    Disk entries survive restarts; when the table grows past `disk_items`
+    the least recently used rows are evicted. The memory tier is used on
+    the event loop; all SQLite work runs on one dedicated thread. The row
+    count is tracked in memory, and hits only note their `last_used` time,
+    which is written along with the next insert.
+    """
+
+    def __init__(self, path: str, memory_items: int, disk_items: int):
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._touched: dict[str, float] = {}  # key → last_used not yet written
+        self._disk = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-cache")
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS description_cache ("
+            " key TEXT PRIMARY KEY, description TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS ix_description_cache_last_used"
+            " ON description_cache (last_used)"
+        )
+        self._db.commit()
+        (self._rows,) = self._db.execute("SELECT COUNT(*) FROM description_cache").fetchone()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    async def get(self, key: str) -> Optional[str]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self._touched[key] = time.time()
+            incr("ai_cache_hits_memory")
+            return self._memory[key]
+
+        description = await self._on_disk_thread(self._read, key)
+        if description is None:
+            incr("ai_cache_misses")
+            return None
+        self._touched[key] = time.time()
+        self._remember(key, description)
+        incr("ai_cache_hits_disk")
+        return description
+
+    async def put(self, key: str, description: str) -> None:
+        self._remember(key, description)
+        self._touched.pop(key, None)
+        touched, self._touched = self._touched, {}
+        await self._on_disk_thread(self._write, key, description, touched)
+
+    async def _on_disk_thread(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._disk, fn, *args)
+
+    def _read(self, key: str) -> Optional[str]:
+        row = self._db.execute(
+            "SELECT description FROM description_cache WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _write(self, key: str, description: str, touched: dict[str, float]) -> None:
+        self._flush_touched(touched)
+        now = time.time()
+        inserted = self._db.execute(
+            "INSERT OR IGNORE INTO description_cache (key, description, last_used) VALUES (?, ?, ?)",
+            (key, description, now),
+        ).rowcount
+        if inserted:
+            self._rows += 1
+        else:
+            self._db.execute(
+                "UPDATE description_cache SET description = ?, last_used = ? WHERE key = ?",
+                (description, now, key),
+            )
+        if self._rows > self.disk_items:
+            evicted = self._db.execute(
+                "DELETE FROM description_cache WHERE key IN ("
+                " SELECT key FROM description_cache ORDER BY last_used LIMIT ?)",
+                (self._rows - self.disk_items,),
+            ).rowcount
+            self._rows -= evicted
+            incr("ai_cache_evictions_disk", evicted)
+        self._db.commit()
+
+    def _flush_touched(self, touched: dict[str, float]) -> None:
+        if touched:
+            self._db.executemany(
+                "UPDATE description_cache SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in touched.items()],
+            )
+
+    def _remember(self, key: str, description: str) -> None:
+        self._memory[key] = description
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def close(self) -> None:
+        self._disk.shutdown(wait=True)
+        self._flush_touched(self._touched)
+        self._touched = {}
+        self._db.commit()
+        self._db.close()
+
+
+_cache: Optional[DescriptionCache] = None
+
+
+def get_cache() -> Optional[DescriptionCache]:
+    """The process-wide cache, or None when AI_CACHE_ENABLED is off."""
+    global _cache
+    if not settings.AI_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = DescriptionCache(
+            settings.AI_CACHE_PATH, settings.AI_CACHE_MEMORY_ITEMS, settings.AI_CACHE_DISK_ITEMS
+        )
+    return _cache
+
+
+register_gauge("ai_cache_memory_items", lambda: len(_cache) if _cache else 0)
@@ -0,0 +1,41 @@
+"""Registry of task-description backends, selected by AI_BACKEND."""
+import importlib
+from typing import Optional
+
+from config import settings
+from services.backends.base import AIBackend
+
+# name -> "module:Class"; imported on first use so unused runtimes stay unloaded
+BACKENDS = {
+    "stub": "services.backends.stub:StubBackend",
+    "torch-custom": "services.backends.torch_custom:TorchCustomBackend",
+    "openai": "services.backends.openai_backend:OpenAIBackend",
+    "onnx": "services.backends.onnx_backend:OnnxBackend",
+}
+
+
+def create_backend(name: str) -> AIBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown AI_BACKEND '{name}', expected one of {sorted(BACKENDS)}")
+    module_name, class_name = BACKENDS[name].split(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+_backend: Optional[AIBackend] = None
+
+
+def get_backend() -> AIBackend:
+    """The process-wide backend; USE_AI_STUB forces the stub whatever AI_BACKEND says."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend("stub" if settings.USE_AI_STUB else settings.AI_BACKEND)
+    return _backend
+
+
+def set_backend(backend: Optional[AIBackend]) -> None:
+    """Swap the process-wide backend (benchmarks, tests); None re-reads settings."""
+    global _backend
+    _backend = backend
+
+
+__all__ = ["AIBackend", "BACKENDS", "create_backend", "get_backend", "set_backend"]
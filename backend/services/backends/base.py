@@ -0,0 +1,105 @@
+"""Interface shared by every task-description backend."""
+import threading
+import time
+from typing import AsyncIterator, Optional
+
+from config import settings
+
+# Prompt format the custom model was fine-tuned on
+PROMPT_TEMPLATE = "Task title: {title}\n\nDescription:"
+END_OF_TEXT = "<|endoftext|>"
+# A description ends at the end-of-text marker or the first blank line
+STOP_SEQUENCES = (END_OF_TEXT, "\n\n")
+
+
+def find_stop(text: str) -> int:
+    """Index of the earliest stop sequence in `text`, or -1."""
+    hits = [i for i in (text.find(stop) for stop in STOP_SEQUENCES) if i >= 0]
+    return min(hits) if hits else -1
+
+
+def trim_at_stop(text: str) -> str:
+    cut = find_stop(text)
+    return text if cut < 0 else text[:cut]
+
+
+class GenerationJob:
+    """
+    One title being generated, with the limits that can end it early.
+
+    `cancelled` is set from the event loop when every client waiting for the
+    result has gone away; `deadline` (time.monotonic) comes from
+    AI_GENERATION_TIME_BUDGET_S. Decoding loops check both after each token
+    and return whatever text they have so far.
+    """
+
+    def __init__(self, title: str, time_budget_s: Optional[float] = None):
+        budget = settings.AI_GENERATION_TIME_BUDGET_S if time_budget_s is None else time_budget_s
+        self.title = title
+        self.cancelled = threading.Event()
+        self.deadline = time.monotonic() + budget if budget > 0 else None
+
+    def should_stop(self) -> bool:
+        return self.cancelled.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+
+class AIBackend:
+    """
+    One way of turning a task title into a description.
+
+    Subclasses set `name` (the AI_BACKEND value), `source` (reported to
+    clients) and their capabilities, implement `describe` and, if
+    `supports_streaming`, `stream`. Heavy setup goes in `_load`, which runs
+    once on a background thread; until it finishes `state["status"]` is
+    "loading" and callers get a 503 instead of a stub answer.
+    """
+
+    name = "base"
+    source = "base"
+    supports_batching = False  # concurrent requests share one forward pass
+    supports_streaming = False  # text arrives incrementally from the model
+    needs_loading = False  # `_load` does real work (weights, sessions, ...)
+
+    def __init__(self):
+        # idle → loading → ready | failed
+        self.state = {"status": "idle", "load_seconds": None, "error": None}
+        self.model_id: Optional[str] = None  # cache-key identity, see ai_cache.model_fingerprint
+
+    @property
+    def capabilities(self) -> dict:
+        return {"batching": self.supports_batching, "streaming": self.supports_streaming}
+
+    @property
+    def ready(self) -> bool:
+        return self.state["status"] == "ready"
+
+    def status(self) -> dict:
+        return {**self.state, "backend": self.name, "capabilities": self.capabilities}
+
+    def cache_params(self) -> dict:
+        """Generation settings that change the output; part of the cache key."""
+        return {}
+
+    def load(self) -> None:
+        self.state.update(status="loading", load_seconds=None, error=None)
+        started = time.perf_counter()
+        try:
+            self._load()
+        except Exception as e:
+            self.state.update(
+                status="failed", load_seconds=round(time.perf_counter() - started, 2), error=str(e)
+            )
+            print(f"{self.name} backend failed to load: {e}")
+            print("Will use stub fallback.")
+            return
+        self.state.update(status="ready", load_seconds=round(time.perf_counter() - started, 2))
+
+    def _load(self) -> None:
+        pass
+
+    async def describe(self, title: str) -> str:
+        raise NotImplementedError
+
+    async def stream(self, title: str) -> AsyncIterator[str]:
+        """Text chunks of the description; backends without streaming yield it whole."""
+        yield await self.describe(title)
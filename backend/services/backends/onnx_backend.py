@@ -0,0 +1,170 @@
+"""Exported decoder (LLM_model_trainig/export_onnx.py) run with ONNX Runtime on CPU."""
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Callable, Optional
+
+from config import settings
+from services.backends.base import PROMPT_TEMPLATE, AIBackend, GenerationJob, find_stop, trim_at_stop
+from services.ai_cache import model_fingerprint
+from services.backends.torch_custom import BASE_MODEL, GENERATION_PARAMS, STOP_WINDOW_TOKENS, serving_adapter_path
+from services.batching import BatchScheduler
+from services.inference import get_executor
+
+
+class OnnxBackend(AIBackend):
+    """
+    Token-by-token decoding with an explicit KV cache.
+
+    The prompt is run once, then each step feeds only the newly sampled
+    token plus the cache returned by the previous step. Batches are
+    left-padded with position ids derived from the attention mask, so
+    concurrent requests share steps exactly like the torch backend.
+    """
+
+    name = "onnx"
+    source = "onnx-model"
+    supports_batching = True
+    supports_streaming = True
+    needs_loading = True
+
+    def __init__(self):
+        super().__init__()
+        self.session = None
+        self.tokenizer = None
+        self.info: dict = {}
+        self._batcher: Optional[BatchScheduler] = None
+        self._rng = None
+
+    def cache_params(self) -> dict:
+        return {**GENERATION_PARAMS, "runtime": "onnx"}
+
+    def _load(self) -> None:
+        import numpy as np
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = settings.AI_ONNX_MODEL_PATH
+        print(f"Loading ONNX model from {path}...")
+        with open(os.path.join(path, "export_info.json")) as f:
+            info = json.load(f)
+        adapter_path = serving_adapter_path()
+        if os.path.isdir(adapter_path) and info["adapter_fingerprint"] != model_fingerprint(adapter_path, BASE_MODEL):
+            print(f"ONNX export is stale (not made from {adapter_path}); re-run export_onnx.py.")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.AI_ONNX_THREADS > 0:
+            options.intra_op_num_threads = settings.AI_ONNX_THREADS
+        session = ort.InferenceSession(
+            os.path.join(path, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        tokenizer = AutoTokenizer.from_pretrained(path)
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        self._rng = np.random.default_rng()
+        self.info, self.tokenizer, self.model_id = info, tokenizer, info["adapter_fingerprint"]
+        self.session = session
+        print("ONNX model loaded successfully!")
+
+    def _next_tokens(self, logits):
+        import numpy as np
+
+        if not GENERATION_PARAMS["do_sample"]:
+            return logits.argmax(-1)
+        scaled = logits / GENERATION_PARAMS["temperature"]
+        probs = np.exp(scaled - scaled.max(-1, keepdims=True))
+        probs /= probs.sum(-1, keepdims=True)
+        return np.array([self._rng.choice(len(p), p=p) for p in probs])
+
+    def generate_batch(
+        self,
+        titles: list[str],
+        on_text: Optional[Callable[[str], None]] = None,
+        jobs: Optional[list[GenerationJob]] = None,
+    ) -> list[str]:
+        """Decode several titles together; `on_text` receives new text of the first row."""
+        import numpy as np
+
+        jobs = jobs or [GenerationJob(title) for title in titles]
+        prompts = [PROMPT_TEMPLATE.format(title=title) for title in titles]
+        encoded = self.tokenizer(prompts, return_tensors="np", padding=True)
+        input_ids = encoded["input_ids"].astype(np.int64)
+        mask = encoded["attention_mask"].astype(np.int64)
+        position_ids = np.clip(mask.cumsum(-1) - 1, 0, None)
+
+        batch = len(titles)
+        shape = (batch, self.info["num_kv_heads"], 0, self.info["head_dim"])
+        past = {
+            f"past.{i}.{kv}": np.zeros(shape, np.float32)
+            for i in range(self.info["num_layers"])
+            for kv in ("key", "value")
+        }
+        eos = self.info["eos_token_id"]
+        generated = [[] for _ in titles]
+        finished = np.zeros(batch, dtype=bool)
+        sent = ""
+
+        for _ in range(GENERATION_PARAMS["max_new_tokens"]):
+            logits, *present = self.session.run(
+                None,
+                {"input_ids": input_ids, "attention_mask": mask, "position_ids": position_ids, **past},
+            )
+            tokens = self._next_tokens(logits)
+            for row, token in enumerate(tokens):
+                if not finished[row]:
+                    generated[row].append(int(token))
+                    tail = self.tokenizer.decode(generated[row][-STOP_WINDOW_TOKENS:])
+                    finished[row] = token == eos or find_stop(tail) >= 0
+                finished[row] |= jobs[row].should_stop()
+            if on_text is not None:
+                text = trim_at_stop(self.tokenizer.decode(generated[0], skip_special_tokens=True))
+                if len(text) > len(sent):
+                    on_text(text[len(sent):])
+                    sent = text
+            if finished.all():
+                break
+            past = dict(zip(past, present))
+            input_ids = np.where(finished, self.tokenizer.pad_token_id, tokens)[:, None].astype(np.int64)
+            mask = np.concatenate([mask, np.ones((batch, 1), np.int64)], axis=1)
+            position_ids = position_ids[:, -1:] + 1
+
+        texts = self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+        return [trim_at_stop(text).strip() for text in texts]
+
+    def _run_jobs(self, jobs: list[GenerationJob]) -> list[str]:
+        return self.generate_batch([job.title for job in jobs], jobs=jobs)
+
+    def _get_batcher(self) -> BatchScheduler:
+        if self._batcher is None:
+            self._batcher = BatchScheduler(
+                self._run_jobs,
+                max_batch_size=settings.AI_BATCH_MAX_SIZE,
+                max_wait_ms=settings.AI_BATCH_WAIT_MS,
+            )
+        return self._batcher
+
+    async def describe(self, title: str) -> str:
+        job = GenerationJob(title)
+        try:
+            return await self._get_batcher().submit(job)
+        except asyncio.CancelledError:
+            job.cancelled.set()
+            raise
+
+    async def stream(self, title: str) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def on_text(text: str) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, text)
+
+        job = GenerationJob(title)
+        task = asyncio.ensure_future(get_executor().run(self.generate_batch, [title], on_text, [job]))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+            await task
+        finally:
+            job.cancelled.set()
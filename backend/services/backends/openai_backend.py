@@ -0,0 +1,49 @@
+"""Descriptions from gpt-4o-mini through the shared OpenAI gateway."""
+from typing import AsyncIterator
+
+from config import settings
+from services.backends.base import AIBackend
+from services.openai_client import get_openai
+
+MODEL = "gpt-4o-mini"
+GENERATION_PARAMS = {"max_tokens": 200, "temperature": 0.7}
+
+
+def _messages(title: str) -> list[dict]:
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a helpful engineering project manager. "
+                "Given a short task title, write a clear, concise task description "
+                "(2-4 sentences) that explains what needs to be done and why it matters. "
+                "Be specific and actionable."
+            ),
+        },
+        {"role": "user", "content": f"Task title: {title}"},
+    ]
+
+
+class OpenAIBackend(AIBackend):
+    name = "openai"
+    source = "openai"
+    supports_streaming = True
+
+    def __init__(self):
+        super().__init__()
+        self.model_id = MODEL
+
+    def cache_params(self) -> dict:
+        return GENERATION_PARAMS
+
+    def _load(self) -> None:
+        if not settings.OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY is not set")
+
+    async def describe(self, title: str) -> str:
+        response = await get_openai().chat(model=MODEL, messages=_messages(title), **GENERATION_PARAMS)
+        return response.choices[0].message.content.strip()
+
+    async def stream(self, title: str) -> AsyncIterator[str]:
+        async for delta in get_openai().stream_chat(model=MODEL, messages=_messages(title), **GENERATION_PARAMS):
+            yield delta
@@ -0,0 +1,28 @@
+"""Deterministic canned descriptions — no model, no network."""
+from typing import AsyncIterator
+
+from services.backends.base import AIBackend
+
+STUB_DESCRIPTION = (
+    "This task involves researching, planning, and implementing the core feature. "
+    "Break it down into subtasks: (1) gather requirements, (2) design the approach, "
+    "(3) implement incrementally, (4) write tests, (5) review and iterate."
+)
+
+
+class StubBackend(AIBackend):
+    name = "stub"
+    source = "stub"
+    supports_streaming = True
+
+    def __init__(self):
+        super().__init__()
+        self.state["status"] = "disabled"  # nothing to load; ai.py answers directly
+        self.model_id = "stub"
+
+    async def describe(self, title: str) -> str:
+        return f"[STUB] {STUB_DESCRIPTION}"
+
+    async def stream(self, title: str) -> AsyncIterator[str]:
+        for word in (await self.describe(title)).split(" "):
+            yield word + " "
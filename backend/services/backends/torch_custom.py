@@ -0,0 +1,262 @@
+"""Fine-tuned TinyLlama (LoRA adapter or merged artifact) served with PyTorch."""
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Optional
+
+from config import settings
+from services.ai_cache import model_fingerprint
+from services.backends.base import PROMPT_TEMPLATE, AIBackend, GenerationJob, find_stop, trim_at_stop
+from services.batching import BatchScheduler
+from services.inference import get_executor
+
+MODEL_PATH = "./LLM_model_trainig/sprintsync-model/final"
+BASE_MODEL = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+# Written by LLM_model_trainig/evaluate_checkpoints.py: which checkpoint to serve
+SERVING_MARKER = os.path.join(os.path.dirname(MODEL_PATH), "serving.json")
+
+# Sampling settings for description generation; part of the cache key
+GENERATION_PARAMS = {"max_new_tokens": 150, "temperature": 0.7, "do_sample": True}
+
+INFERENCE_PROFILES = ("fp32", "bf16", "int8")
+
+# Trailing tokens decoded per step to spot a stop sequence ("<|endoftext|>" is 7)
+STOP_WINDOW_TOKENS = 12
+
+
+def serving_adapter_path(model_dir: Optional[str] = None) -> str:
+    """
+    Adapter chosen by evaluate_checkpoints.py, else the final one.
+
+    `model_dir` is the sprintsync-model directory, for the training scripts
+    that run from LLM_model_trainig/ rather than backend/.
+    """
+    marker, final = SERVING_MARKER, MODEL_PATH
+    if model_dir is not None:
+        marker, final = os.path.join(model_dir, "serving.json"), os.path.join(model_dir, "final")
+    if not os.path.exists(marker):
+        return final
+    with open(marker) as f:
+        path = os.path.join(os.path.dirname(marker), json.load(f)["checkpoint"])
+    if not os.path.isdir(path):
+        print(f"Serving marker points at missing {path}, using {final}.")
+        return final
+    return path
+
+
+def _load_with_adapter(base_model: str, adapter_path: str):
+    """Base weights from the HF cache wrapped with the LoRA adapter."""
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    from peft import PeftModel
+
+    base = AutoModelForCausalLM.from_pretrained(base_model)
+    model = PeftModel.from_pretrained(base, adapter_path)
+    tokenizer = AutoTokenizer.from_pretrained(adapter_path)
+    return model, tokenizer, model_fingerprint(adapter_path, base_model)
+
+
+def _load_merged(path: str):
+    """Artifact written by LLM_model_trainig/merge_adapter.py."""
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    # safetensors are memory-mapped; low_cpu_mem_usage skips the random
+    # init + copy so pages are only faulted in as layers are touched
+    model = AutoModelForCausalLM.from_pretrained(path, low_cpu_mem_usage=True)
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    with open(os.path.join(path, "merge_info.json")) as f:
+        # Same identity as the adapter it was merged from, so cached
+        # descriptions stay valid across the switch
+        model_id = json.load(f)["adapter_fingerprint"]
+    return model, tokenizer, model_id
+
+
+def _merged_is_current(path: str) -> bool:
+    info_path = os.path.join(path, "merge_info.json")
+    if not os.path.exists(info_path):
+        return False
+    adapter_path = serving_adapter_path()
+    if not os.path.isdir(adapter_path):
+        return True  # only the merged artifact was shipped
+    with open(info_path) as f:
+        merged_from = json.load(f).get("adapter_fingerprint")
+    if merged_from != model_fingerprint(adapter_path, BASE_MODEL):
+        print("Merged model is stale (adapter changed since merge), ignoring it.")
+        return False
+    return True
+
+
+def _configure_threads(intra_op: int, inter_op: int) -> None:
+    """Pin torch thread pools; 0 keeps torch's default (one thread per core)."""
+    import torch
+
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            # Only settable once, before any inter-op work has started
+            print("Inter-op thread count already fixed, keeping it.")
+
+
+def _apply_profile(model, profile: str):
+    """Convert a loaded model to the fp32 / bf16 / int8 inference profile."""
+    if profile not in INFERENCE_PROFILES:
+        raise ValueError(f"Unknown AI_INFERENCE_PROFILE '{profile}', expected one of {INFERENCE_PROFILES}")
+    import torch
+
+    if profile == "fp32":
+        return model.float()
+    if profile == "bf16":
+        return model.to(torch.bfloat16)
+
+    # int8: quantize_dynamic swaps nn.Linear for int8 kernels, which the
+    # PEFT wrapper does not expect, so fold the adapter in first
+    if hasattr(model, "merge_and_unload"):
+        model = model.merge_and_unload()
+    return torch.ao.quantization.quantize_dynamic(model.float(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class TorchCustomBackend(AIBackend):
+    """
+    transformers `generate` on the inference pool.
+
+    Concurrent requests are merged by a BatchScheduler into one left-padded
+    generate call; streaming requests get their own call with a TextStreamer.
+    """
+
+    name = "torch-custom"
+    source = "custom-model"
+    supports_batching = True
+    supports_streaming = True
+    needs_loading = True
+
+    def __init__(self):
+        super().__init__()
+        self.model = None
+        self.tokenizer = None
+        self._batcher: Optional[BatchScheduler] = None
+
+    def cache_params(self) -> dict:
+        return {**GENERATION_PARAMS, "profile": settings.AI_INFERENCE_PROFILE}
+
+    def _load(self) -> None:
+        print("Loading custom SprintSync model...")
+        _configure_threads(settings.AI_TORCH_THREADS, settings.AI_TORCH_INTEROP_THREADS)
+        if _merged_is_current(settings.AI_MERGED_MODEL_PATH):
+            model, tokenizer, model_id = _load_merged(settings.AI_MERGED_MODEL_PATH)
+        else:
+            adapter_path = serving_adapter_path()
+            print(f"Serving adapter {adapter_path}")
+            model, tokenizer, model_id = _load_with_adapter(BASE_MODEL, adapter_path)
+        model = _apply_profile(model, settings.AI_INFERENCE_PROFILE)
+        self.install(model.eval(), tokenizer, model_id)
+        print(f"Custom model loaded successfully! (profile={settings.AI_INFERENCE_PROFILE})")
+
+    def install(self, model, tokenizer, model_id: Optional[str] = None) -> None:
+        """Serve an already loaded model (used by `_load` and the benchmarks)."""
+        # Batched generation needs left padding and a pad token
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        self.tokenizer, self.model_id = tokenizer, model_id
+        # Publish the model last: requests treat a set model as ready
+        self.model = model
+        self.state["status"] = "ready"
+
+    def _stopping_criteria(self, jobs: list[GenerationJob], prompt_len: int):
+        """Per-row stop: stop sequence decoded, time budget spent or request cancelled."""
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList
+
+        tokenizer = self.tokenizer
+
+        class _RowStop(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                start = max(prompt_len, input_ids.shape[1] - STOP_WINDOW_TOKENS)
+                tails = tokenizer.batch_decode(input_ids[:, start:])
+                done = [job.should_stop() or find_stop(tail) >= 0 for job, tail in zip(jobs, tails)]
+                return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+        return StoppingCriteriaList([_RowStop()])
+
+    def generate_batch(
+        self, titles: list[str], streamer=None, jobs: Optional[list[GenerationJob]] = None
+    ) -> list[str]:
+        """Generate descriptions for several titles in one left-padded generate call."""
+        import torch
+
+        jobs = jobs or [GenerationJob(title) for title in titles]
+        prompts = [PROMPT_TEMPLATE.format(title=title) for title in titles]
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True)
+        # Left padding puts every prompt flush against the generated tokens, so
+        # each row's completion starts at the same offset
+        prompt_len = inputs["input_ids"].shape[1]
+
+        with torch.no_grad():
+            outputs = self.model.generate(
+                **inputs,
+                **GENERATION_PARAMS,
+                pad_token_id=self.tokenizer.pad_token_id,
+                streamer=streamer,
+                stopping_criteria=self._stopping_criteria(jobs, prompt_len),
+            )
+
+        texts = self.tokenizer.batch_decode(outputs[:, prompt_len:], skip_special_tokens=True)
+        return [trim_at_stop(text).strip() for text in texts]
+
+    def _run_jobs(self, jobs: list[GenerationJob]) -> list[str]:
+        return self.generate_batch([job.title for job in jobs], jobs=jobs)
+
+    def _get_batcher(self) -> BatchScheduler:
+        if self._batcher is None:
+            self._batcher = BatchScheduler(
+                self._run_jobs,
+                max_batch_size=settings.AI_BATCH_MAX_SIZE,
+                max_wait_ms=settings.AI_BATCH_WAIT_MS,
+            )
+        return self._batcher
+
+    async def describe(self, title: str) -> str:
+        # Concurrent requests are merged into one generate call, which runs
+        # on the inference pool so the event loop stays responsive
+        job = GenerationJob(title)
+        try:
+            return await self._get_batcher().submit(job)
+        except asyncio.CancelledError:
+            job.cancelled.set()  # frees this row of the batch
+            raise
+
+    def _make_streamer(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        """TextStreamer that hands decoded text from the worker thread to the event loop."""
+        from transformers import TextStreamer
+
+        class _QueueStreamer(TextStreamer):
+            def on_finalized_text(self, text: str, stream_end: bool = False):
+                if text:
+                    loop.call_soon_threadsafe(queue.put_nowait, text)
+
+        return _QueueStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+    async def stream(self, title: str) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        job = GenerationJob(title)
+        # Streaming needs its own generate call, so it bypasses the batcher
+        task = asyncio.ensure_future(
+            get_executor().run(self.generate_batch, [title], self._make_streamer(loop, queue), [job])
+        )
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+
+        text, sent = "", 0
+        try:
+            while (chunk := await queue.get()) is not None:
+                text += chunk
+                visible = trim_at_stop(text)
+                if len(visible) > sent:
+                    yield visible[sent:]
+                    sent = len(visible)
+            await task  # surfaces generation errors
+        finally:
+            # Client went away mid-stream: stop decoding for nobody
+            job.cancelled.set()
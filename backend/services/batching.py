@@ -0,0 +1,59 @@
+"""Dynamic micro-batching of concurrent inference requests."""
+import asyncio
+from typing import Any, Callable, Optional
+
+from services.inference import get_executor
+from services.logging import incr
+
+
+class BatchScheduler:
+    """
+    Collects concurrent submissions and runs them as one batched call.
+
+    A batch is dispatched as soon as `max_batch_size` items are waiting or
+    `max_wait_ms` has elapsed since the first item arrived, whichever comes
+    first. `run_batch` receives the list of items and must return one result
+    per item, in order; it runs on the shared inference pool.
+    """
+
+    def __init__(self, run_batch: Callable[[list], list], max_batch_size: int, max_wait_ms: float):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000
+        self._pending: list[tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_s, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [(item, fut) for item, fut in self._pending[: self.max_batch_size] if not fut.done()]
+        self._pending = self._pending[self.max_batch_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait_s, self._flush)
+        if batch:
+            asyncio.ensure_future(self._dispatch(batch))
+
+    async def _dispatch(self, batch: list[tuple[Any, asyncio.Future]]) -> None:
+        incr("ai_batches_total")
+        incr("ai_batched_items_total", len(batch))
+        try:
+            results = await get_executor().run(self.run_batch, [item for item, _ in batch])
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
@@ -0,0 +1,64 @@
+"""
+Conditional GETs: weak ETags built from change counters, and a 304 before any row is read.
+
+The counters live on the users row:
+- users.version is bumped by every profile change;
+- users.tasks_version is bumped by a trigger on every write to that user's tasks.
+
+So an ETag costs at most one small query, and for a user's own tasks none
+at all, because get_current_user has already loaded the row.
+"""
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models import User
+
+
+def weak_etag(*parts) -> str:
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def _opaque(tag: str) -> str:
+    return tag.strip().removeprefix("W/")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2): W/"x" and "x" match."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in if_none_match.split(",")}
+
+
+def not_modified(if_none_match: Optional[str], etag: str, response: Response) -> Optional[Response]:
+    """
+    A 304 when the client already has `etag`; otherwise None, after putting
+    the validator on `response`. The response varies by user, so shared
+    caches must not keep it and browsers must revalidate.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def owner_tasks_version(db: Session, owner_id: int) -> int:
+    return db.execute(select(User.tasks_version).where(User.id == owner_id)).scalar() or 0
+
+
+def global_versions(db: Session) -> tuple[int, int]:
+    """
+    (sum of tasks_version, sum of version) over all users.
+
+    The first sum only ever grows. A task write adds to it, and
+    routers/users.delete_user moves the deleted user's counter, plus one,
+    onto the admin deleting them (admins cannot delete themselves).
+    Together the two sums never repeat.
+    """
+    row = db.execute(select(func.coalesce(func.sum(User.tasks_version), 0), func.coalesce(func.sum(User.version), 0))).one()
+    return row[0], row[1]
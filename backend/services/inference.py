@@ -0,0 +1,127 @@
+"""Bounded worker pool that keeps blocking model calls off the event loop."""
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import settings
+from services.logging import incr, record_inference, register_gauge
+
+
+class InferenceUnavailable(Exception):
+    """The model cannot take this request right now; the client should retry."""
+
+    detail = "AI model is unavailable, please retry shortly"
+
+    def __init__(self, retry_after: int):
+        super().__init__(self.detail)
+        self.retry_after = retry_after
+
+
+class InferenceQueueFull(InferenceUnavailable):
+    """Raised when every worker is busy and the wait queue is at capacity."""
+
+    detail = "AI model is busy, please retry shortly"
+
+
+class ModelLoading(InferenceUnavailable):
+    """Raised while the custom model is still loading in the background."""
+
+    detail = "AI model is still loading, please retry shortly"
+
+
+class InferenceExecutor:
+    """
+    Runs blocking inference callables on a dedicated thread pool.
+
+    At most `max_queue` jobs may wait for a free worker; further submissions
+    are rejected immediately with InferenceQueueFull instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._avg_run_s = 1.0  # EWMA of job duration, used for Retry-After
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        backlog = self._queued + self._running
+        return max(1, math.ceil(self._avg_run_s * backlog / self.workers))
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._queued + self._running >= self.workers + self.max_queue:
+                incr("inference_rejected_total")
+                raise InferenceQueueFull(self.retry_after())
+            self._queued += 1
+
+        submitted = time.perf_counter()
+        try:
+            future = self._pool.submit(self._execute, submitted, fn, args)
+        except BaseException:
+            self._release_queued()
+            raise
+        future.add_done_callback(self._release_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _release_if_cancelled(self, future: Future) -> None:
+        # A job cancelled before a worker picked it up (the caller went away,
+        # or shutdown) never reaches _execute, so its queue slot is freed here
+        if future.cancelled():
+            self._release_queued()
+
+    def _release_queued(self) -> None:
+        with self._lock:
+            self._queued -= 1
+
+    def _execute(self, submitted: float, fn: Callable[..., Any], args: tuple) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._running -= 1
+                self._avg_run_s = 0.8 * self._avg_run_s + 0.2 * (finished - started)
+            record_inference((started - submitted) * 1000, (finished - started) * 1000)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: Optional[InferenceExecutor] = None
+
+
+def get_executor() -> InferenceExecutor:
+    global _executor
+    if _executor is None:
+        _executor = InferenceExecutor(settings.AI_INFERENCE_WORKERS, settings.AI_INFERENCE_QUEUE_SIZE)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+register_gauge("inference_queue_depth", lambda: _executor.queue_depth if _executor else 0)
+register_gauge("inference_running", lambda: _executor.running if _executor else 0)
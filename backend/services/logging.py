@@ -7,8 +7,8 @@ from collections import defaultdict
 from typing import Callable
 
 import structlog
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # ── Configure structlog ──────────────────────────────────────────────────────
 structlog.configure(
@@ -30,6 +30,8 @@ logger = structlog.get_logger("sprintsync")
 
 # ── Metrics counters (in-memory, Prometheus-style) ───────────────────────────
 _metrics: dict = defaultdict(int)
+# Point-in-time values (queue depth, cache size, ...) sampled when /metrics is read
+_gauges: dict[str, Callable[[], float]] = {}
 
 
 def record_request(method: str, path: str, status_code: int, latency_ms: float) -> None:
@@ -38,15 +40,50 @@ def record_request(method: str, path: str, status_code: int, latency_ms: float)
     _metrics["latency_ms_total"] += latency_ms
 
 
+def record_inference(wait_ms: float, run_ms: float) -> None:
+    _metrics["inference_jobs_total"] += 1
+    _metrics["inference_wait_ms_total"] += wait_ms
+    _metrics["inference_run_ms_total"] += run_ms
+    _metrics["inference_wait_ms_max"] = max(_metrics["inference_wait_ms_max"], wait_ms)
+
+
+def incr(name: str, value: int = 1) -> None:
+    _metrics[name] += value
+
+
+def register_gauge(name: str, fn: Callable[[], float]) -> None:
+    _gauges[name] = fn
+
+
 def get_metrics() -> dict:
-    return dict(_metrics)
+    data = dict(_metrics)
+    for name, fn in _gauges.items():
+        data[name] = fn()
+    return data
 
 
 # ── Request logging middleware ────────────────────────────────────────────────
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+class LoggingMiddleware:
+    """
+    Log and count every HTTP request.
+
+    Plain ASGI rather than BaseHTTPMiddleware: the latter swaps the
+    `receive` channel, so endpoints behind it never see `http.disconnect`
+    and cannot cancel work for clients that hung up.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
         start = time.perf_counter()
         user_id = None
+        status_code = 500
 
         try:
             from jose import jwt as _jwt
@@ -59,20 +96,15 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         except Exception:
             pass
 
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
         try:
-            response = await call_next(request)
-            latency_ms = (time.perf_counter() - start) * 1000
-            record_request(request.method, request.url.path, response.status_code, latency_ms)
-            logger.info(
-                "request",
-                method=request.method,
-                path=request.url.path,
-                status_code=response.status_code,
-                latency_ms=round(latency_ms, 2),
-                user_id=user_id,
-            )
-            return response
-        except Exception as exc:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
             latency_ms = (time.perf_counter() - start) * 1000
             record_request(request.method, request.url.path, 500, latency_ms)
             logger.error(
@@ -85,3 +117,14 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                 stack_trace=traceback.format_exc(),
             )
             raise
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        record_request(request.method, request.url.path, status_code, latency_ms)
+        logger.info(
+            "request",
+            method=request.method,
+            path=request.url.path,
+            status_code=status_code,
+            latency_ms=round(latency_ms, 2),
+            user_id=user_id,
+        )
@@ -0,0 +1,192 @@
+"""Application-scoped OpenAI client: pooled connections, concurrency cap, retries, circuit breaker."""
+import asyncio
+import random
+import time
+from typing import Any, AsyncIterator, Optional
+
+from config import settings
+from services.logging import incr, register_gauge
+
+
+class CircuitOpen(Exception):
+    """Upstream has been failing; calls are short-circuited until the breaker resets."""
+
+    def __init__(self):
+        super().__init__("OpenAI circuit breaker is open")
+
+
+class CircuitBreaker:
+    """
+    Classic closed → open → half-open breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects calls for `reset_after_s`; then a single probe is let through.
+    Only a successful probe closes the breaker; any other ending re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_after_s: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_after_s = reset_after_s
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_after_s:
+            self.state = self.HALF_OPEN
+            return True  # the probe
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+def _is_transient(exc: Exception) -> bool:
+    import openai
+
+    return isinstance(
+        exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+    )
+
+
+class OpenAIGateway:
+    """
+    Wraps one AsyncOpenAI client for the whole process.
+
+    Concurrent upstream calls are capped by a semaphore, transient errors
+    (connection, timeout, 429, 5xx) are retried with full-jitter exponential
+    backoff, and the circuit breaker fails fast while upstream is unhealthy.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_concurrency: int,
+        max_retries: int,
+        backoff_base_s: float,
+        breaker: CircuitBreaker,
+    ):
+        self.client = client
+        self.max_retries = max(0, max_retries)
+        self.backoff_base_s = backoff_base_s
+        self.breaker = breaker
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.inflight = 0
+
+    async def _create(self, **kwargs: Any) -> Any:
+        """One upstream call with retries; the caller holds the semaphore."""
+        if not self.breaker.allow():
+            incr("openai_short_circuits_total")
+            raise CircuitOpen()
+
+        probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+        try:
+            for attempt in range(self.max_retries + 1):
+                incr("openai_requests_total")
+                try:
+                    response = await self.client.chat.completions.create(**kwargs)
+                except Exception as exc:
+                    if not _is_transient(exc):
+                        raise
+                    if attempt == self.max_retries:
+                        incr("openai_failures_total")
+                        self.breaker.record_failure()
+                        raise
+                    incr("openai_retries_total")
+                    await asyncio.sleep(random.uniform(0, self.backoff_base_s * 2 ** attempt))
+                else:
+                    self.breaker.record_success()
+                    return response
+        finally:
+            # A probe that ends any other way (client error, cancellation)
+            # must still settle the breaker, or it stays half-open for good
+            if probe and self.breaker.state == CircuitBreaker.HALF_OPEN:
+                self.breaker.record_failure()
+
+    async def chat(self, **kwargs: Any) -> Any:
+        """chat.completions.create with the gateway's limits applied."""
+        async with self._semaphore:
+            self.inflight += 1
+            try:
+                return await self._create(**kwargs)
+            finally:
+                self.inflight -= 1
+
+    async def stream_chat(self, **kwargs: Any) -> AsyncIterator[str]:
+        """Yield content deltas of a streamed chat completion, holding a slot until it ends."""
+        async with self._semaphore:
+            self.inflight += 1
+            try:
+                stream = await self._create(stream=True, **kwargs)
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            finally:
+                self.inflight -= 1
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+def build_gateway(http_client=None) -> OpenAIGateway:
+    """Create a gateway from settings; `http_client` lets tests point it at a fake server."""
+    import httpx
+    from openai import AsyncOpenAI
+
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+            timeout=settings.OPENAI_TIMEOUT_S,
+        )
+    client = AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        timeout=settings.OPENAI_TIMEOUT_S,
+        max_retries=0,  # retries are ours, so the breaker sees every failure
+        http_client=http_client,
+    )
+    return OpenAIGateway(
+        client,
+        max_concurrency=settings.OPENAI_MAX_CONCURRENCY,
+        max_retries=settings.OPENAI_MAX_RETRIES,
+        backoff_base_s=settings.OPENAI_BACKOFF_BASE_S,
+        breaker=CircuitBreaker(settings.OPENAI_BREAKER_THRESHOLD, settings.OPENAI_BREAKER_RESET_S),
+    )
+
+
+_gateway: Optional[OpenAIGateway] = None
+
+
+def get_openai() -> OpenAIGateway:
+    global _gateway
+    if _gateway is None:
+        _gateway = build_gateway()
+    return _gateway
+
+
+async def close_openai() -> None:
+    global _gateway
+    if _gateway is not None:
+        await _gateway.close()
+        _gateway = None
+
+
+_BREAKER_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.OPEN: 1, CircuitBreaker.HALF_OPEN: 2}
+register_gauge("openai_circuit_state", lambda: _BREAKER_STATES[_gateway.breaker.state] if _gateway else 0)
+register_gauge("openai_inflight", lambda: _gateway.inflight if _gateway else 0)
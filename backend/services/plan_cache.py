@@ -0,0 +1,82 @@
+"""Per-user cache of generated daily plans."""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+
+from config import settings
+from services.logging import incr, register_gauge
+
+
+def plan_fingerprint(username: str, tasks: list[dict]) -> str:
+    """Hash of everything the plan prompt is built from."""
+    payload = json.dumps(
+        [username, [[t["title"], t["status"], t["total_minutes"]] for t in tasks]],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PlanCache:
+    """
+    One plan per owner, valid for the calendar day it was generated on.
+
+    An entry is served only while the owner's task fingerprint is unchanged;
+    task writes also drop the entry eagerly via `invalidate`. At most
+    `max_items` owners are kept, least recently used first out.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._entries: OrderedDict[int, tuple[str, date, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, owner_id: int, fingerprint: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(owner_id)
+            if entry is None or entry[0] != fingerprint or entry[1] != date.today():
+                incr("ai_plan_cache_misses")
+                return None
+            self._entries.move_to_end(owner_id)
+            incr("ai_plan_cache_hits")
+            return entry[2]
+
+    def put(self, owner_id: int, fingerprint: str, plan: dict) -> None:
+        with self._lock:
+            self._entries[owner_id] = (fingerprint, date.today(), plan)
+            self._entries.move_to_end(owner_id)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, owner_id: int) -> None:
+        with self._lock:
+            if self._entries.pop(owner_id, None) is not None:
+                incr("ai_plan_cache_invalidations")
+
+
+_plan_cache: Optional[PlanCache] = None
+
+
+def get_plan_cache() -> Optional[PlanCache]:
+    """The process-wide plan cache, or None when AI_CACHE_ENABLED is off."""
+    global _plan_cache
+    if not settings.AI_CACHE_ENABLED:
+        return None
+    if _plan_cache is None:
+        _plan_cache = PlanCache(settings.AI_PLAN_CACHE_ITEMS)
+    return _plan_cache
+
+
+def invalidate_plan(owner_id: int) -> None:
+    """Forget the cached plan of a user whose tasks just changed."""
+    cache = get_plan_cache()
+    if cache is not None:
+        cache.invalidate(owner_id)
+
+
+register_gauge("ai_plan_cache_items", lambda: len(_plan_cache) if _plan_cache else 0)
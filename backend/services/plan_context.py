@@ -0,0 +1,90 @@
+"""Compact, token-budgeted task context for daily-plan prompts."""
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Task
+
+# Most relevant first: work already under way, then work waiting to start
+STATUS_PRIORITY = ["in_progress", "review", "backlog"]
+MAX_TITLE_CHARS = 80
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token for English text with OpenAI tokenizers."""
+    return len(text) // 4 + 1
+
+
+def load_plan_tasks(db: Session, owner_id: int) -> list[dict]:
+    """
+    The owner's tasks as plain dicts, most recently touched first.
+
+    Only the columns the prompt needs are selected, so no ORM objects are
+    built even for users with thousands of tasks.
+    """
+    rows = (
+        db.query(Task.title, Task.status, Task.total_minutes)
+        .filter(Task.owner_id == owner_id)
+        .order_by(func.coalesce(Task.updated_at, Task.created_at).desc(), Task.id.desc())
+        .all()
+    )
+    return [
+        {"title": title, "status": status.value, "total_minutes": minutes or 0}
+        for title, status, minutes in rows
+    ]
+
+
+def _task_line(task: dict) -> str:
+    title = task["title"]
+    if len(title) > MAX_TITLE_CHARS:
+        title = title[: MAX_TITLE_CHARS - 1] + "…"
+    return f"- [{task['status']}] {title} ({task['total_minutes']}m logged)"
+
+
+def _summary_line(count: int, label: str, minutes: int) -> str:
+    return f"- +{count} {label} task{'s' if count != 1 else ''} ({minutes}m logged)"
+
+
+def build_plan_context(tasks: list[dict], budget_tokens: int) -> str:
+    """
+    One line per active task, in priority order, until `budget_tokens` is spent.
+
+    Done tasks and active tasks that do not fit are folded into per-status
+    summary lines, whose space is reserved up front so the result stays
+    within budget however many tasks there are.
+    """
+    by_status: dict[str, list[dict]] = {}
+    for task in tasks:
+        by_status.setdefault(task["status"], []).append(task)
+
+    def summary(group: list[dict], label: str) -> str:
+        return _summary_line(len(group), label, sum(t["total_minutes"] for t in group))
+
+    done = by_status.get("done", [])
+    done_line = summary(done, "finished") if done else None
+    # Worst case every status needs a summary line; reserve room for all of them
+    remaining = budget_tokens - sum(
+        estimate_tokens(summary(by_status[status], f"more {status}"))
+        for status in STATUS_PRIORITY
+        if status in by_status
+    )
+    if done_line:
+        remaining -= estimate_tokens(done_line)
+
+    lines = []
+    for status in STATUS_PRIORITY:
+        group = by_status.get(status, [])
+        shown = 0
+        for task in group:
+            line = _task_line(task)
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                break
+            lines.append(line)
+            remaining -= cost
+            shown += 1
+        if shown < len(group):
+            lines.append(summary(group[shown:], f"more {status}" if shown else status))
+    if done_line:
+        lines.append(done_line)
+
+    return "\n".join(lines) if lines else "- (no tasks)"
@@ -0,0 +1,267 @@
+"""
+Nearest-title lookup over known descriptions (training examples and saved tasks).
+
+Saved tasks belong to their owner: a lookup only ever returns a training
+example or one of the requester's own descriptions.
+"""
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import Task
+from services.backends.stub import STUB_DESCRIPTION
+from services.logging import incr, logger, register_gauge
+
+TRAINING_DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "LLM_model_trainig", "training_data.jsonl")
+
+NGRAM = 3
+DIMS = 2048  # hashed feature buckets; short titles use a few dozen each
+SHARED = -1  # owner of entries every user may be served (training examples)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _ngram_features(title: str) -> tuple[np.ndarray, np.ndarray]:
+    """Bucket indices and sublinear term frequencies of a title's character n-grams."""
+    text = f" {_WHITESPACE.sub(' ', title.strip().lower())} "
+    grams = [text[i:i + NGRAM] for i in range(max(1, len(text) - NGRAM + 1))]
+    buckets = np.fromiter((zlib.crc32(g.encode()) % DIMS for g in grams), dtype=np.int64, count=len(grams))
+    idx, counts = np.unique(buckets, return_counts=True)
+    return idx, (1.0 + np.log(counts)).astype(np.float32)
+
+
+def is_reusable(description: Optional[str]) -> bool:
+    """Whether a saved description is worth handing out again."""
+    if not description or not description.strip():
+        return False
+    return not description.startswith("[STUB]") and description != STUB_DESCRIPTION
+
+
+class RetrievalIndex:
+    """
+    TF-IDF over hashed character trigrams of titles, cosine similarity in NumPy.
+
+    Each entry keeps its sparse term frequencies in flat (row, bucket, tf)
+    arrays; adding or removing an entry touches only its own nonzeros and
+    the document frequencies. IDF weights and row norms are applied at
+    query time, which costs one pass over the nonzeros rather than a
+    rebuild of a dense matrix after every write.
+    At most `max_items` entries are kept, oldest first out.
+
+    An entry with an owner is only visible to searches by that owner;
+    entries without one (the training examples) are visible to all.
+    """
+
+    def __init__(self, max_items: int, threshold: float):
+        self.max_items = max_items
+        self.threshold = threshold
+        self._entries: OrderedDict[str, int] = OrderedDict()  # key → row, oldest first
+        self._df = np.zeros(DIMS, dtype=np.float32)
+        # Per row: description, owner id (or SHARED), span of its nonzeros
+        self._descriptions: list[Optional[str]] = []
+        self._owners = np.empty(0, dtype=np.int64)
+        self._spans: list[tuple[int, int]] = []
+        self._free: list[int] = []
+        # Nonzeros of every row; removed rows leave zeroed holes until compaction
+        self._rows = np.empty(0, dtype=np.int64)
+        self._cols = np.empty(0, dtype=np.int64)
+        self._tfs = np.empty(0, dtype=np.float32)
+        self._used = 0
+        self._holes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: str, title: str, description: str, owner_id: Optional[int] = None) -> None:
+        idx, tf = _ngram_features(title)
+        with self._lock:
+            self._discard(key)
+            row = self._free.pop() if self._free else self._new_row()
+            self._reserve(len(idx))
+            start, end = self._used, self._used + len(idx)
+            self._rows[start:end], self._cols[start:end], self._tfs[start:end] = row, idx, tf
+            self._used = end
+            self._descriptions[row] = description
+            self._owners[row] = SHARED if owner_id is None else owner_id
+            self._spans[row] = (start, end)
+            self._entries[key] = row
+            self._df[idx] += 1
+            while len(self._entries) > self.max_items:
+                self._discard(next(iter(self._entries)))
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key: str) -> bool:
+        row = self._entries.pop(key, None)
+        if row is None:
+            return False
+        start, end = self._spans[row]
+        self._df[self._cols[start:end]] -= 1
+        self._tfs[start:end] = 0.0
+        self._holes += end - start
+        self._descriptions[row] = None
+        self._owners[row] = SHARED
+        self._free.append(row)
+        return True
+
+    def _new_row(self) -> int:
+        row = len(self._descriptions)
+        self._descriptions.append(None)
+        self._spans.append((0, 0))
+        self._owners = np.append(self._owners, SHARED)
+        return row
+
+    def _reserve(self, count: int) -> None:
+        """Make room for `count` more nonzeros, compacting or growing the arrays."""
+        if self._used + count <= len(self._tfs):
+            return
+        live = self._used - self._holes
+        if self._holes:
+            order = sorted(self._entries.values(), key=lambda row: self._spans[row][0])
+            keep = np.concatenate([np.arange(*self._spans[row]) for row in order]) if order else np.empty(0, np.int64)
+            position = 0
+            for row in order:
+                start, end = self._spans[row]
+                self._spans[row] = (position, position + end - start)
+                position += end - start
+        else:
+            keep = np.arange(self._used)
+        capacity = max(2 * (live + count), 1024)
+        rows, cols, tfs = (np.zeros(capacity, dtype=a.dtype) for a in (self._rows, self._cols, self._tfs))
+        rows[:live], cols[:live], tfs[:live] = self._rows[keep], self._cols[keep], self._tfs[keep]
+        self._rows, self._cols, self._tfs = rows, cols, tfs
+        self._used, self._holes = live, 0
+
+    def search(self, title: str, owner_id: Optional[int] = None) -> Optional[tuple[str, float]]:
+        """
+        Closest description visible to `owner_id` and its similarity, or None
+        below the threshold. Without an owner only shared entries are searched.
+        """
+        idx, tf = _ngram_features(title)
+        with self._lock:
+            if not self._entries:
+                return None
+            idf = np.log((1.0 + len(self._entries)) / (1.0 + self._df)) + 1.0
+            query = np.zeros(DIMS, dtype=np.float32)
+            query[idx] = tf * idf[idx]
+            query /= np.linalg.norm(query)
+            rows, cols = self._rows[:self._used], self._cols[:self._used]
+            weights = self._tfs[:self._used] * idf[cols]
+            n_rows = len(self._descriptions)
+            norms = np.sqrt(np.bincount(rows, weights * weights, minlength=n_rows))
+            scores = np.bincount(rows, weights * query[cols], minlength=n_rows) / np.maximum(norms, 1e-12)
+            visible = self._owners == SHARED
+            if owner_id is not None:
+                visible |= self._owners == owner_id
+            visible[self._free] = False
+            scores = np.where(visible, scores, -1.0)
+            best = int(scores.argmax())
+            if scores[best] < self.threshold:
+                return None
+            return self._descriptions[best], float(scores[best])
+
+
+def _load_training_examples(index: RetrievalIndex, path: str = TRAINING_DATA_PATH) -> None:
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        for n, line in enumerate(f):
+            if not line.strip():
+                continue
+            example = json.loads(line)
+            title = example["prompt"].removeprefix("Task title:").strip()
+            index.add(f"example:{n}", title, example["completion"].strip())
+
+
+_index: Optional[RetrievalIndex] = None
+_index_lock = threading.Lock()
+_lookups = {"hits": 0, "misses": 0}
+
+
+def get_retrieval_index() -> Optional[RetrievalIndex]:
+    """The process-wide index (seeded with the training examples), or None when disabled."""
+    global _index
+    if not settings.AI_RETRIEVAL_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = RetrievalIndex(settings.AI_RETRIEVAL_MAX_ITEMS, settings.AI_RETRIEVAL_THRESHOLD)
+                _load_training_examples(index)
+                _index = index
+    return _index
+
+
+def lookup_description(title: str, owner_id: Optional[int]) -> Optional[str]:
+    """
+    A known description for a near-identical title, from the training
+    examples or `owner_id`'s own tasks, counting hits and misses.
+    """
+    index = get_retrieval_index()
+    if index is None:
+        return None
+    match = index.search(title, owner_id)
+    outcome = "misses" if match is None else "hits"
+    _lookups[outcome] += 1
+    incr(f"ai_retrieval_{outcome}")
+    return match[0] if match else None
+
+
+def index_task(task_id: int, title: str, description: Optional[str], owner_id: int) -> None:
+    """Keep the index in step with a task that was just saved."""
+    index = get_retrieval_index()
+    if index is None:
+        return
+    if is_reusable(description):
+        index.add(f"task:{task_id}", title, description.strip(), owner_id)
+    else:
+        index.remove(f"task:{task_id}")
+
+
+def forget_task(task_id: int) -> None:
+    index = get_retrieval_index()
+    if index is not None:
+        index.remove(f"task:{task_id}")
+
+
+def warm_retrieval_index(db: Session) -> int:
+    """Index the most recently saved task descriptions; returns how many were added."""
+    index = get_retrieval_index()
+    if index is None:
+        return 0
+    rows = (
+        db.query(Task.id, Task.title, Task.description, Task.owner_id)
+        .filter(Task.description != "")
+        .order_by(func.coalesce(Task.updated_at, Task.created_at).desc(), Task.id.desc())
+        .limit(settings.AI_RETRIEVAL_MAX_ITEMS)
+        .all()
+    )
+    added = 0
+    # Oldest first, so the newest descriptions are the last to be evicted
+    for task_id, title, description, owner_id in reversed(rows):
+        if is_reusable(description):
+            index.add(f"task:{task_id}", title, description.strip(), owner_id)
+            added += 1
+    logger.info("retrieval_index_warmed", tasks=added, items=len(index))
+    return added
+
+
+def _hit_rate() -> float:
+    total = _lookups["hits"] + _lookups["misses"]
+    return round(_lookups["hits"] / total, 4) if total else 0.0
+
+
+register_gauge("ai_retrieval_items", lambda: len(_index) if _index else 0)
+register_gauge("ai_retrieval_hit_rate", _hit_rate)
@@ -0,0 +1,99 @@
+"""Deterministic daily-plan scheduler — packs open tasks into a working-day template."""
+from typing import Optional
+
+from config import clock_minutes, settings
+
+MAX_ITEMS = 8  # same cap the LLM prompt asks for
+MIN_BLOCK_MINUTES = 30
+WRAP_UP_MINUTES = 30
+
+# Order work is scheduled in, and how each activity is phrased
+STATUS_ORDER = ["review", "in_progress", "backlog"]
+ACTIVITY = {
+    "review": "Review and close out: {title}",
+    "in_progress": "Continue: {title}",
+    "backlog": "Start: {title}",
+}
+
+
+def _hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class WorkdayTemplate:
+    """Working hours plus fixed breaks, all in minutes since midnight."""
+
+    def __init__(self, start: str, end: str, breaks: str = "", block_minutes: int = 90):
+        self.start = clock_minutes(start)
+        self.end = clock_minutes(end)
+        self.block_minutes = max(MIN_BLOCK_MINUTES, block_minutes)
+        # "12:00-13:00,15:00-15:15" -> [(720, 780), (900, 915)]
+        self.breaks = sorted(
+            (clock_minutes(a), clock_minutes(b))
+            for a, b in (span.split("-") for span in breaks.split(",") if span.strip())
+        )
+        if self.end <= self.start:
+            raise ValueError("working day must end after it starts")
+
+    @classmethod
+    def from_settings(cls) -> "WorkdayTemplate":
+        return cls(
+            settings.AI_PLAN_DAY_START,
+            settings.AI_PLAN_DAY_END,
+            settings.AI_PLAN_BREAKS,
+            settings.AI_PLAN_BLOCK_MINUTES,
+        )
+
+
+def _round15(minutes: int) -> int:
+    return max(15, (minutes + 7) // 15 * 15)
+
+
+def _duration(task: dict, block: int) -> int:
+    """Review is a short pass; in-progress work gets less time the more has been logged."""
+    if task["status"] == "review":
+        return MIN_BLOCK_MINUTES
+    if task["status"] == "in_progress":
+        return max(MIN_BLOCK_MINUTES, _round15(block - task["total_minutes"] // 4))
+    return block
+
+
+def schedule_day(tasks: list[dict], template: Optional[WorkdayTemplate] = None) -> dict:
+    """
+    Lay open tasks out as `{"plan": [{"time": "HH:MM", "activity": ...}]}`.
+
+    Tasks are taken review → in_progress → backlog, in the order given
+    within each status (load_plan_tasks yields most recently touched
+    first). Blocks are shortened to fit before a break, and the last slot
+    of the day is kept for wrap-up. Pure and deterministic: the same tasks
+    and template always give the same plan.
+    """
+    template = template or WorkdayTemplate.from_settings()
+    queue = [t for status in STATUS_ORDER for t in tasks if t["status"] == status]
+    breaks = list(template.breaks)
+    day_end = template.end - WRAP_UP_MINUTES
+    plan = []
+    cursor = template.start
+
+    if not queue:
+        plan.append({"time": _hhmm(cursor), "activity": "No open tasks — groom the backlog and plan the sprint"})
+
+    while queue and cursor < day_end and len(plan) < MAX_ITEMS - 1:
+        if breaks and cursor >= breaks[0][0]:
+            start, stop = breaks.pop(0)
+            if stop > cursor:
+                plan.append({"time": _hhmm(max(cursor, start)), "activity": "Break"})
+                cursor = stop
+            continue
+
+        limit = min(breaks[0][0] if breaks else day_end, day_end)
+        length = min(_duration(queue[0], template.block_minutes), limit - cursor)
+        if length < MIN_BLOCK_MINUTES:
+            cursor = limit  # too short to start anything; skip to the break / wrap-up
+            continue
+        task = queue.pop(0)
+        plan.append({"time": _hhmm(cursor), "activity": ACTIVITY[task["status"]].format(title=task["title"])})
+        cursor += length
+
+    plan.append({"time": _hhmm(max(day_end, template.start)), "activity": "Wrap up, update task statuses, log time"})
+    return {"plan": plan}
@@ -0,0 +1,52 @@
+"""Coalesce identical concurrent async calls into one execution."""
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from services.logging import incr
+
+
+class SingleFlight:
+    """
+    At most one in-flight call per key.
+
+    The first caller for a key starts `fn`; callers arriving while it runs
+    await the same future and receive its result or its exception. A caller
+    being cancelled (e.g. client disconnect) does not cancel the shared call
+    while others still wait for it; when the last waiter goes, so does the call.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._waiters: dict[str, int] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            incr(f"{self.name}_calls_total")
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            self._waiters[key] = 0
+            future.add_done_callback(lambda f: self._done(key, f))
+        else:
+            incr(f"{self.name}_coalesced_total")
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self._waiters.get(key) == 1 and not future.done():
+                incr(f"{self.name}_abandoned_total")
+                future.cancel()
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                self._waiters[key] -= 1
+
+    def _done(self, key: str, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+            del self._waiters[key]
+        # Mark the exception retrieved even if every waiter went away
+        if not future.cancelled():
+            future.exception()
@@ -4,6 +4,7 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 # Use in-memory SQLite for tests
 os.environ["DATABASE_URL"] = "sqlite://"
@@ -13,10 +14,13 @@ os.environ["SECRET_KEY"] = "test-secret-key"
 from database import Base, get_db
 from main import app
 from models import User, Task, TaskStatus
+from services import openai_client
 from services.auth import hash_password
+from services.openai_client import build_gateway
+from tests.fake_openai import FakeOpenAI
 
 TEST_DB_URL = "sqlite://"
-engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
+engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool)
 TestingSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -52,6 +56,20 @@ def db():
         session.close()
 
 
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """Route the shared OpenAI gateway to an in-process fake server."""
+    server = FakeOpenAI()
+    monkeypatch.setattr(openai_client.settings, "USE_AI_STUB", False)
+    monkeypatch.setattr(openai_client.settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(openai_client.settings, "OPENAI_BASE_URL", "http://fake-openai/v1")
+    monkeypatch.setattr(openai_client.settings, "OPENAI_BACKOFF_BASE_S", 0.0)
+    monkeypatch.setattr(openai_client.settings, "OPENAI_MAX_RETRIES", 2)
+    monkeypatch.setattr(openai_client.settings, "OPENAI_BREAKER_THRESHOLD", 2)
+    monkeypatch.setattr(openai_client, "_gateway", build_gateway(http_client=server.http_client()))
+    return server
+
+
 @pytest.fixture
 def admin_user(db):
     user = User(
@@ -0,0 +1,70 @@
+"""Minimal local stand-in for the OpenAI chat completions API."""
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PLAN = {"plan": [{"time": "09:00", "activity": "Review pull requests"}]}
+
+
+class FakeOpenAI:
+    """
+    Serves /v1/chat/completions in-process.
+
+    Set `fail_next` to answer that many calls with `fail_status` before
+    succeeding, and `latency_s` to make every answer take that long;
+    `calls` counts every request that reached the server.
+    """
+
+    def __init__(self, content: str = json.dumps(PLAN)):
+        self.content = content
+        self.calls = 0
+        self.fail_next = 0
+        self.fail_status = 500
+        self.latency_s = 0.0
+        self.app = FastAPI()
+        self.app.post("/v1/chat/completions")(self._completions)
+
+    async def _completions(self, request: Request):
+        self.calls += 1
+        body = await request.json()
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            return JSONResponse(
+                {"error": {"message": "upstream unavailable", "type": "server_error"}},
+                status_code=self.fail_status,
+            )
+        if body.get("stream"):
+            return StreamingResponse(self._chunks(body["model"]), media_type="text/event-stream")
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.content},
+                "finish_reason": "stop",
+            }],
+        }
+
+    async def _chunks(self, model: str):
+        for i in range(0, len(self.content), 8):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": self.content[i:i + 8]}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    def http_client(self) -> httpx.AsyncClient:
+        """An httpx client that routes requests to this app instead of the network."""
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app))
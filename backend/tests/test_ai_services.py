@@ -0,0 +1,900 @@
+"""Unit tests — AI serving infrastructure (inference pool, batching, caching, coalescing, metrics)."""
+import asyncio
+import json
+import threading
+
+import pytest
+from pydantic import ValidationError
+from config import Settings
+from models import Task, TaskStatus
+from tests.conftest import auth_headers
+from tests.fake_openai import PLAN
+
+from services import ai as ai_service
+from services import ai_cache, backends, openai_client, plan_cache, retrieval
+from services.ai_cache import DescriptionCache, make_key, model_fingerprint
+from services.backends import AIBackend, create_backend, torch_custom
+from services.backends.base import GenerationJob, find_stop, trim_at_stop
+from services.batching import BatchScheduler
+from services.inference import InferenceExecutor, InferenceQueueFull
+from services.openai_client import CircuitOpen
+from services.plan_cache import PlanCache, plan_fingerprint
+from services.plan_context import build_plan_context, estimate_tokens, load_plan_tasks
+from services.retrieval import RetrievalIndex, warm_retrieval_index
+from services.scheduler import WorkdayTemplate, schedule_day
+from services.singleflight import SingleFlight
+
+
+class TestInferenceExecutor:
+    def test_event_loop_stays_responsive(self):
+        """A blocking job on the pool does not stall other coroutines."""
+        release = threading.Event()
+        executor = InferenceExecutor(workers=1, max_queue=1)
+
+        async def scenario():
+            job = asyncio.create_task(executor.run(release.wait, 5))
+            # The loop can still schedule other work while the job blocks
+            await asyncio.sleep(0.01)
+            assert not job.done()
+            release.set()
+            return await job
+
+        assert asyncio.run(scenario()) is True
+        executor.shutdown()
+
+    def test_rejects_when_queue_full(self):
+        """Submissions beyond workers + queue size raise with a Retry-After hint."""
+        release = threading.Event()
+        executor = InferenceExecutor(workers=1, max_queue=1)
+
+        async def scenario():
+            running = asyncio.create_task(executor.run(release.wait, 5))
+            queued = asyncio.create_task(executor.run(release.wait, 5))
+            await asyncio.sleep(0.01)
+            assert executor.queue_depth == 1
+            with pytest.raises(InferenceQueueFull) as info:
+                await executor.run(release.wait, 5)
+            assert info.value.retry_after >= 1
+            release.set()
+            await asyncio.gather(running, queued)
+
+        asyncio.run(scenario())
+        executor.shutdown()
+
+    def test_cancelled_waiting_jobs_free_their_slots(self):
+        """Jobs cancelled before a worker takes them, by the caller or by shutdown, give their slot back."""
+        release = threading.Event()
+        executor = InferenceExecutor(workers=1, max_queue=2)
+
+        async def scenario():
+            running = asyncio.create_task(executor.run(release.wait, 5))
+            waiting = [asyncio.create_task(executor.run(release.wait, 5)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            assert executor.queue_depth == 2
+            waiting[0].cancel()
+            await asyncio.sleep(0.01)
+            assert executor.queue_depth == 1
+            executor.shutdown()
+            await asyncio.sleep(0.01)
+            assert executor.queue_depth == 0
+            release.set()
+            assert await running is True
+            for job in waiting:
+                with pytest.raises(asyncio.CancelledError):
+                    await job
+
+        asyncio.run(scenario())
+
+
+class TestBatchScheduler:
+    def test_concurrent_requests_share_one_batch(self):
+        """Concurrent submissions are merged and each caller gets its own slice."""
+        batches = []
+
+        def run_batch(items):
+            batches.append(list(items))
+            return [item.upper() for item in items]
+
+        scheduler = BatchScheduler(run_batch, max_batch_size=4, max_wait_ms=50)
+
+        async def scenario():
+            return await asyncio.gather(*(scheduler.submit(t) for t in ["a", "b", "c"]))
+
+        assert asyncio.run(scenario()) == ["A", "B", "C"]
+        assert batches == [["a", "b", "c"]]
+
+    def test_batch_errors_reach_every_caller(self):
+        def run_batch(items):
+            raise RuntimeError("model exploded")
+
+        scheduler = BatchScheduler(run_batch, max_batch_size=2, max_wait_ms=1)
+
+        async def scenario():
+            return await asyncio.gather(
+                scheduler.submit("a"), scheduler.submit("b"), return_exceptions=True
+            )
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+
+class _FakeBackend(AIBackend):
+    name = "fake"
+    source = "custom-model"
+    supports_batching = True
+
+    def __init__(self):
+        super().__init__()
+        self.state["status"] = "ready"
+        self.model_id = "test-model"
+        self.calls = 0
+
+    async def describe(self, title):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return f"Generated for {title}"
+
+
+@pytest.fixture
+def fake_model(monkeypatch, tmp_path):
+    """Serve descriptions from a counting fake backend, with a fresh cache and an empty retrieval index."""
+    backend = _FakeBackend()
+    monkeypatch.setattr(backends, "_backend", backend)
+    monkeypatch.setattr(retrieval, "_index", RetrievalIndex(max_items=16, threshold=0.85))
+    monkeypatch.setattr(
+        ai_cache, "_cache", DescriptionCache(str(tmp_path / "cache.db"), memory_items=4, disk_items=4)
+    )
+    return backend
+
+
+class TestInferenceProfile:
+    def test_int8_profile_quantizes_linear_layers(self):
+        torch = pytest.importorskip("torch")
+        model = torch.nn.Sequential(torch.nn.Linear(8, 8))
+        quantized = torch_custom._apply_profile(model, "int8")
+        assert isinstance(quantized[0], torch.ao.nn.quantized.dynamic.Linear)
+        assert quantized(torch.randn(2, 8)).shape == (2, 8)
+
+    def test_bf16_profile_casts_weights(self):
+        torch = pytest.importorskip("torch")
+        model = torch_custom._apply_profile(torch.nn.Linear(4, 4), "bf16")
+        assert model.weight.dtype == torch.bfloat16
+
+    def test_unknown_profile_is_rejected(self):
+        with pytest.raises(ValueError):
+            torch_custom._apply_profile(object(), "fp8")
+
+
+class TestDescriptionCache:
+    def test_key_normalizes_title_and_tracks_model(self):
+        params = {"max_new_tokens": 150}
+        assert make_key("Fix  login bug.", "m1", params) == make_key("fix login bug", "m1", params)
+        assert make_key("Fix login bug", "m1", params) != make_key("Fix login bug", "m2", params)
+        assert make_key("Fix login bug", "m1", params) != make_key("Fix login bug", "m1", {"max_new_tokens": 50})
+
+    def test_fingerprint_changes_with_adapter_files(self, tmp_path):
+        (tmp_path / "adapter_config.json").write_text("{}")
+        before = model_fingerprint(str(tmp_path), "base")
+        (tmp_path / "adapter_model.safetensors").write_bytes(b"weights")
+        assert model_fingerprint(str(tmp_path), "base") != before
+
+    def test_stale_merged_artifact_is_ignored(self, tmp_path, monkeypatch):
+        """A merge made from an older adapter must not be served."""
+        adapter = tmp_path / "final"
+        merged = tmp_path / "merged"
+        adapter.mkdir()
+        merged.mkdir()
+        (adapter / "adapter_config.json").write_text("{}")
+        monkeypatch.setattr(torch_custom, "MODEL_PATH", str(adapter))
+
+        fingerprint = model_fingerprint(str(adapter), torch_custom.BASE_MODEL)
+        (merged / "merge_info.json").write_text(f'{{"adapter_fingerprint": "{fingerprint}"}}')
+        assert torch_custom._merged_is_current(str(merged))
+
+        (adapter / "adapter_config.json").write_text('{"r": 16}')
+        assert not torch_custom._merged_is_current(str(merged))
+
+    def test_disk_tier_survives_restart_and_evicts(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = DescriptionCache(path, memory_items=1, disk_items=2)
+
+        async def fill():
+            await cache.put("a", "A")
+            await cache.put("b", "B")
+            await cache.put("c", "C")  # evicts the least recently used row ("a")
+
+        asyncio.run(fill())
+        cache.close()
+
+        reopened = DescriptionCache(path, memory_items=1, disk_items=2)
+        assert asyncio.run(reopened.get("a")) is None
+        assert asyncio.run(reopened.get("b")) == "B"
+        assert asyncio.run(reopened.get("c")) == "C"
+        reopened.close()
+
+    def test_disk_hits_are_recorded_with_the_next_insert(self, tmp_path):
+        """Reads write nothing; their recency still decides which row the next insert evicts."""
+        path = str(tmp_path / "cache.db")
+        cache = DescriptionCache(path, memory_items=1, disk_items=2)
+        asyncio.run(cache.put("a", "A"))
+        asyncio.run(cache.put("b", "B"))
+        cache.close()
+
+        reopened = DescriptionCache(path, memory_items=1, disk_items=2)
+        changes = reopened._db.total_changes
+        assert asyncio.run(reopened.get("a")) == "A"  # now more recent than "b"
+        assert reopened._db.total_changes == changes
+        asyncio.run(reopened.put("c", "C"))  # evicts "b", not "a"
+        reopened.close()
+
+        final = DescriptionCache(path, memory_items=1, disk_items=2)
+        assert asyncio.run(final.get("b")) is None
+        assert asyncio.run(final.get("a")) == "A"
+        assert asyncio.run(final.get("c")) == "C"
+        final.close()
+
+    def test_disk_reads_run_off_the_event_loop(self, tmp_path):
+        cache = DescriptionCache(str(tmp_path / "cache.db"), memory_items=1, disk_items=4)
+        threads = []
+        read = cache._read
+
+        def recording_read(key):
+            threads.append(threading.current_thread())
+            return read(key)
+
+        cache._read = recording_read
+        asyncio.run(cache.get("missing"))
+        assert threads and threads[0] is not threading.main_thread()
+        cache.close()
+
+    def test_repeat_title_is_served_from_cache(self, fake_model):
+        first = asyncio.run(ai_service.generate_task_description("Write unit tests"))
+        second = asyncio.run(ai_service.generate_task_description("write unit tests"))
+        assert first["source"] == "custom-model"
+        assert second["source"] == "cache"
+        assert second["description"] == first["description"]
+        assert fake_model.calls == 1
+
+
+class TestSingleFlight:
+    def test_concurrent_identical_calls_run_once(self):
+        flights = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def scenario():
+            return await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+
+        assert asyncio.run(scenario()) == ["result"] * 5
+        assert len(calls) == 1
+
+    def test_errors_reach_every_waiter(self):
+        flights = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        async def scenario():
+            return await asyncio.gather(
+                *(flights.do("k", work) for _ in range(3)), return_exceptions=True
+            )
+
+        assert all(isinstance(r, ValueError) for r in asyncio.run(scenario()))
+
+    def test_last_waiter_leaving_cancels_the_call(self):
+        flights = SingleFlight("test")
+        started, cancelled = asyncio.Event(), []
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        async def scenario():
+            waiter = asyncio.create_task(flights.do("k", work))
+            await started.wait()
+            waiter.cancel()
+            await asyncio.sleep(0.01)
+            return flights._inflight
+
+        assert asyncio.run(scenario()) == {}
+        assert cancelled == [1]
+
+    def test_call_survives_while_someone_still_waits(self):
+        flights = SingleFlight("test")
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def scenario():
+            first = asyncio.create_task(flights.do("k", work))
+            second = asyncio.create_task(flights.do("k", work))
+            await started.wait()
+            first.cancel()
+            return await second
+
+        assert asyncio.run(scenario()) == "result"
+
+    def test_duplicate_description_requests_share_generation(self, fake_model):
+        async def scenario():
+            return await asyncio.gather(
+                ai_service.generate_task_description("Fix login bug"),
+                ai_service.generate_task_description("Fix login bug"),
+            )
+
+        first, second = asyncio.run(scenario())
+        assert first["description"] == second["description"]
+        assert fake_model.calls == 1
+
+
+class TestOpenAIGateway:
+    def test_daily_plan_uses_shared_client(self, fake_openai):
+        first = asyncio.run(ai_service.generate_daily_plan("alice", []))
+        second = asyncio.run(ai_service.generate_daily_plan("alice", [{"title": "x", "status": "todo", "total_minutes": 0}]))
+        assert first["source"] == second["source"] == "openai"
+        assert first["plan"] == PLAN["plan"]
+        assert openai_client.get_openai() is openai_client._gateway
+        assert fake_openai.calls == 2
+
+    def test_transient_errors_are_retried(self, fake_openai):
+        fake_openai.fail_next = 2
+        plan = asyncio.run(ai_service.generate_daily_plan("alice", []))
+        assert plan["source"] == "openai"
+        assert fake_openai.calls == 3
+
+    def test_client_errors_are_not_retried(self, fake_openai):
+        fake_openai.fail_next = 1
+        fake_openai.fail_status = 400
+        plan = asyncio.run(ai_service.generate_daily_plan("alice", []))
+        assert plan["source"] == "stub-fallback"
+        assert fake_openai.calls == 1
+
+    def test_breaker_opens_and_short_circuits(self, fake_openai):
+        """After the threshold of failed calls the fake server is no longer contacted."""
+        fake_openai.fail_next = 100
+        gateway = openai_client.get_openai()
+
+        async def call():
+            return await gateway.chat(model="gpt-4o-mini", messages=[])
+
+        for _ in range(2):
+            with pytest.raises(Exception):
+                asyncio.run(call())
+        calls = fake_openai.calls
+        assert gateway.breaker.state == "open"
+
+        with pytest.raises(CircuitOpen):
+            asyncio.run(call())
+        plan = asyncio.run(ai_service.generate_daily_plan("alice", []))
+        assert plan["source"] == "stub-fallback"
+        assert fake_openai.calls == calls
+
+    def test_breaker_closes_after_successful_probe(self, fake_openai):
+        gateway = openai_client.get_openai()
+        gateway.breaker.reset_after_s = 0
+        for _ in range(2):
+            gateway.breaker.record_failure()
+        assert gateway.breaker.state == "open"
+        assert asyncio.run(ai_service.generate_daily_plan("alice", []))["source"] == "openai"
+        assert gateway.breaker.state == "closed"
+
+    def test_rejected_probe_reopens_breaker(self, fake_openai):
+        """A probe answered with a non-transient error does not leave the breaker half-open."""
+        gateway = openai_client.get_openai()
+        gateway.breaker.reset_after_s = 0
+        for _ in range(2):
+            gateway.breaker.record_failure()
+        fake_openai.fail_next = 1
+        fake_openai.fail_status = 401
+        assert asyncio.run(ai_service.generate_daily_plan("alice", []))["source"] == "stub-fallback"
+        assert gateway.breaker.state == "open"
+        assert asyncio.run(ai_service.generate_daily_plan("alice", []))["source"] == "openai"
+        assert gateway.breaker.state == "closed"
+
+    def test_cancelled_probe_reopens_breaker(self, fake_openai):
+        """Cancelling the probe re-opens the breaker so a later call can probe again."""
+        gateway = openai_client.get_openai()
+        gateway.breaker.reset_after_s = 0
+        for _ in range(2):
+            gateway.breaker.record_failure()
+        fake_openai.latency_s = 5
+
+        async def scenario():
+            probe = asyncio.create_task(gateway.chat(model="gpt-4o-mini", messages=[]))
+            await asyncio.sleep(0.05)
+            assert gateway.breaker.state == "half_open"
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+
+        asyncio.run(scenario())
+        assert gateway.breaker.state == "open"
+        fake_openai.latency_s = 0
+        assert asyncio.run(ai_service.generate_daily_plan("alice", []))["source"] == "openai"
+        assert gateway.breaker.state == "closed"
+
+    def test_stream_goes_through_gateway(self, fake_openai):
+        async def collect():
+            return [event async for event in ai_service.stream_daily_plan("alice", [])]
+
+        events = asyncio.run(collect())
+        assert "".join(e["text"] for e in events if e["event"] == "token") == json.dumps(PLAN)
+        assert events[-1]["source"] == "openai"
+        assert openai_client.get_openai().inflight == 0
+
+
+class TestRetrieval:
+    def test_near_duplicate_title_is_found(self):
+        index = RetrievalIndex(max_items=64, threshold=0.85)
+        retrieval._load_training_examples(index)
+        description, score = index.search("Set up CI pipelines")
+        assert description.startswith("Configure GitHub Actions") and score >= 0.85
+        assert index.search("Migrate billing to Stripe") is None
+
+    def test_updates_replace_and_evict(self):
+        index = RetrievalIndex(max_items=2, threshold=0.85)
+        index.add("task:1", "Fix flaky upload test", "Old text")
+        index.add("task:1", "Fix flaky upload test", "New text")
+        assert index.search("Fix flaky upload test")[0] == "New text"
+        index.add("task:2", "Add audit log", "Audit")
+        index.add("task:3", "Rotate API keys", "Rotate")
+        assert len(index) == 2 and index.search("Fix flaky upload test") is None
+        index.remove("task:3")
+        assert index.search("Rotate API keys") is None
+
+    def test_owned_entries_are_only_searched_by_their_owner(self):
+        index = RetrievalIndex(max_items=8, threshold=0.85)
+        index.add("example:0", "Write release notes", "Shared")
+        index.add("task:1", "Fix flaky upload test", "Alice's", owner_id=1)
+        index.add("task:2", "Fix flaky upload tests", "Bob's", owner_id=2)
+        assert index.search("Fix flaky upload test", owner_id=1)[0] == "Alice's"
+        assert index.search("Fix flaky upload test", owner_id=2)[0] == "Bob's"
+        assert index.search("Fix flaky upload test", owner_id=3) is None
+        assert index.search("Fix flaky upload test") is None
+        assert index.search("Write release notes", owner_id=3)[0] == "Shared"
+
+    def test_churn_keeps_scores_in_step(self):
+        """Repeated saves reuse rows and compact storage without changing what a search finds."""
+        index = RetrievalIndex(max_items=4, threshold=0.85)
+        for n in range(500):
+            index.add(f"task:{n % 6}", f"Fix flaky upload test {n}", f"Text {n}", owner_id=1)
+            if n % 7 == 0:
+                index.remove(f"task:{(n + 3) % 6}")
+        assert len(index) <= 4
+        assert index.search("Fix flaky upload test 499", owner_id=1)[0] == "Text 499"
+        description, score = index.search("Fix flaky upload test 498", owner_id=1)
+        assert description == "Text 498" and score == pytest.approx(1.0, abs=1e-5)
+        assert index.search("Fix flaky upload test 490", owner_id=1) is None  # evicted
+
+    def test_retrieval_hit_skips_the_model(self, fake_model):
+        retrieval.index_task(7, "Add CSV export", "Export the task list as CSV.", owner_id=1)
+        result = asyncio.run(ai_service.generate_task_description("add csv export", owner_id=1))
+        assert result == {"title": "add csv export", "description": "Export the task list as CSV.", "source": "retrieval"}
+        assert asyncio.run(ai_service.generate_task_description("Plan the offsite", owner_id=1))["source"] == "custom-model"
+        assert fake_model.calls == 1
+
+    def test_saved_tasks_feed_the_index(self, client, user_token, db, fake_model):
+        headers = auth_headers(user_token)
+        task = client.post(
+            "/tasks/", json={"title": "Tune search ranking", "description": "Weight title matches higher."},
+            headers=headers,
+        ).json()
+        owner = task["owner_id"]
+        assert retrieval.lookup_description("Tune search ranking", owner) == "Weight title matches higher."
+        client.patch(f"/tasks/{task['id']}", json={"description": "[STUB] placeholder"}, headers=headers)
+        assert retrieval.lookup_description("Tune search ranking", owner) is None
+
+        db.add(Task(title="Archive old sprints", description="Move closed sprints to cold storage.", owner_id=task["owner_id"]))
+        db.commit()
+        assert warm_retrieval_index(db) == 1
+        assert retrieval.lookup_description("Archive old sprints", owner) == "Move closed sprints to cold storage."
+        assert client.get("/metrics").json()["ai_retrieval_hit_rate"] > 0
+
+    def test_saved_descriptions_are_only_served_to_their_owner(self, client, user_token, admin_token, fake_model):
+        """User A's private description never answers user B's near-identical title, however it was saved."""
+        owner, other = auth_headers(user_token), auth_headers(admin_token)
+        client.post("/tasks/", json={"title": "Rotate payroll keys", "description": "Secret: vault path /hr/payroll."},
+                    headers=owner)
+        client.post("/tasks/bulk", json={"operations": [
+            {"op": "create", "title": "Audit salary exports", "description": "Secret: bucket s3://hr-exports."},
+        ]}, headers=owner)
+
+        for title in ("Rotate payroll keys", "Audit salary exports"):
+            suggest = f"/ai/suggest?mode=description&title={title}"
+            assert client.post(suggest, headers=owner).json()["source"] == "retrieval"
+            leaked = client.post(suggest, headers=other).json()
+            assert leaked["source"] == "custom-model" and "Secret" not in leaked["description"]
+
+
+class TestPlanCache:
+    def test_fingerprint_tracks_task_fields(self):
+        tasks = [{"title": "Fix bug", "status": "todo", "total_minutes": 30}]
+        moved = [{"title": "Fix bug", "status": "in_progress", "total_minutes": 30}]
+        assert plan_fingerprint("alice", tasks) == plan_fingerprint("alice", [dict(tasks[0])])
+        assert plan_fingerprint("alice", tasks) != plan_fingerprint("alice", moved)
+        assert plan_fingerprint("alice", tasks) != plan_fingerprint("bob", tasks)
+
+    def test_entry_expires_on_day_boundary(self, monkeypatch):
+        import datetime
+
+        cache = PlanCache(max_items=4)
+        cache.put(1, "fp", PLAN)
+        assert cache.get(1, "fp") == PLAN
+        assert cache.get(1, "other") is None
+
+        class Tomorrow(datetime.date):
+            @classmethod
+            def today(cls):
+                return datetime.date.today() + datetime.timedelta(days=1)
+
+        monkeypatch.setattr(plan_cache, "date", Tomorrow)
+        assert cache.get(1, "fp") is None
+
+    def test_repeat_request_skips_openai_until_tasks_change(self, client, user_token, fake_openai, monkeypatch):
+        monkeypatch.setattr(plan_cache.settings, "AI_CACHE_ENABLED", True)
+        monkeypatch.setattr(plan_cache, "_plan_cache", PlanCache(max_items=4))
+        headers = auth_headers(user_token)
+
+        first = client.post("/ai/suggest?mode=daily_plan", headers=headers).json()
+        second = client.post("/ai/suggest?mode=daily_plan", headers=headers).json()
+        assert (first["source"], second["source"]) == ("openai", "cache")
+        assert second["plan"] == first["plan"]
+        assert fake_openai.calls == 1
+
+        task = client.post("/tasks/", json={"title": "New work"}, headers=headers).json()
+        assert len(plan_cache._plan_cache) == 0
+        assert client.post("/ai/suggest?mode=daily_plan", headers=headers).json()["source"] == "openai"
+        assert fake_openai.calls == 2
+
+        assert len(plan_cache._plan_cache) == 1
+        client.post(f"/tasks/{task['id']}/transition", json={"new_status": "in_progress"}, headers=headers)
+        assert len(plan_cache._plan_cache) == 0
+
+
+class TestPlanContext:
+    @staticmethod
+    def _tasks(n, status, minutes=30):
+        return [{"title": f"{status} task {i}", "status": status, "total_minutes": minutes} for i in range(n)]
+
+    def test_active_work_comes_first_and_done_is_summarized(self):
+        tasks = self._tasks(2, "backlog") + self._tasks(3, "done") + self._tasks(1, "in_progress") + self._tasks(1, "review")
+        lines = build_plan_context(tasks, budget_tokens=600).splitlines()
+        assert [line.split("]")[0] for line in lines[:4]] == ["- [in_progress", "- [review", "- [backlog", "- [backlog"]
+        assert lines[-1] == "- +3 finished tasks (90m logged)"
+        assert not any("done task" in line for line in lines)
+
+    def test_thousand_tasks_stay_within_budget(self):
+        tasks = self._tasks(300, "in_progress") + self._tasks(400, "backlog") + self._tasks(300, "done")
+        context = build_plan_context(tasks, budget_tokens=300)
+        assert estimate_tokens(context) <= 300
+        assert "- [in_progress] in_progress task 0" in context
+        assert "more in_progress tasks" in context
+        assert "- +400 backlog tasks (12000m logged)" in context
+
+    def test_loads_only_the_owners_tasks(self, db, regular_user, admin_user):
+        db.add_all([
+            Task(title="Mine", status=TaskStatus.review, total_minutes=5, owner_id=regular_user.id),
+            Task(title="Not mine", owner_id=admin_user.id),
+        ])
+        db.commit()
+        assert load_plan_tasks(db, regular_user.id) == [{"title": "Mine", "status": "review", "total_minutes": 5}]
+
+
+class TestLocalScheduler:
+    TASKS = [
+        {"title": "Write docs", "status": "backlog", "total_minutes": 0},
+        {"title": "Ship login", "status": "in_progress", "total_minutes": 120},
+        {"title": "Old work", "status": "done", "total_minutes": 300},
+        {"title": "Check PR", "status": "review", "total_minutes": 15},
+    ]
+
+    def test_packs_open_tasks_around_breaks(self):
+        template = WorkdayTemplate("09:00", "17:30", "12:00-13:00", block_minutes=90)
+        plan = schedule_day(self.TASKS, template)["plan"]
+        assert plan == [
+            {"time": "09:00", "activity": "Review and close out: Check PR"},
+            {"time": "09:30", "activity": "Continue: Ship login"},
+            {"time": "10:30", "activity": "Start: Write docs"},
+            {"time": "17:00", "activity": "Wrap up, update task statuses, log time"},
+        ]
+        assert schedule_day(self.TASKS, template) == schedule_day(list(self.TASKS), template)
+
+    def test_blocks_never_overlap_breaks_and_plan_is_capped(self):
+        template = WorkdayTemplate("09:00", "17:30", "10:00-10:15,12:00-13:00", block_minutes=90)
+        tasks = [{"title": f"T{i}", "status": "backlog", "total_minutes": 0} for i in range(20)]
+        plan = schedule_day(tasks, template)["plan"]
+        times = [item["time"] for item in plan]
+        assert len(plan) <= 8
+        assert times == sorted(times)
+        assert {"time": "10:00", "activity": "Break"} in plan
+        assert {"time": "12:00", "activity": "Break"} in plan
+
+    @pytest.mark.parametrize(
+        "env",
+        [
+            {"AI_PLAN_BREAKS": "12-13"},
+            {"AI_PLAN_BREAKS": "13:00-12:00"},
+            {"AI_PLAN_DAY_START": "9am"},
+            {"AI_PLAN_DAY_START": "18:00", "AI_PLAN_DAY_END": "17:30"},
+        ],
+    )
+    def test_bad_workday_settings_fail_at_load(self, env, monkeypatch):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        with pytest.raises(ValidationError) as info:
+            Settings()
+        assert "AI_PLAN_" in str(info.value)
+
+    def test_daily_plan_defaults_to_local_without_key(self, client, user_token, monkeypatch):
+        monkeypatch.setattr(ai_service.settings, "USE_AI_STUB", False)
+        monkeypatch.setattr(ai_service.settings, "OPENAI_API_KEY", None)
+        plan = client.post("/ai/suggest?mode=daily_plan", headers=auth_headers(user_token)).json()
+        assert plan["source"] == "local-scheduler"
+        assert plan["plan"][-1]["activity"].startswith("Wrap up")
+
+    def test_stub_setting_still_wins(self, monkeypatch):
+        monkeypatch.setattr(ai_service.settings, "AI_PLAN_ENGINE", "local")
+        assert asyncio.run(ai_service.generate_daily_plan("alice", self.TASKS))["source"] == "stub"
+
+    def test_rephrase_keeps_schedule(self, fake_openai, monkeypatch):
+        monkeypatch.setattr(ai_service.settings, "AI_PLAN_ENGINE", "local")
+        monkeypatch.setattr(ai_service.settings, "AI_PLAN_REPHRASE", True)
+        local = schedule_day(self.TASKS)["plan"]
+        fake_openai.content = json.dumps({"plan": [{**item, "activity": item["activity"].upper()} for item in local]})
+
+        plan = asyncio.run(ai_service.generate_daily_plan("alice", self.TASKS))
+        assert plan["source"] == "local-scheduler" and plan["rephrased"]
+        assert [item["time"] for item in plan["plan"]] == [item["time"] for item in local]
+
+        fake_openai.content = json.dumps(PLAN)  # different times: rejected, local plan served as is
+        plan = asyncio.run(ai_service.generate_daily_plan("alice", self.TASKS))
+        assert plan["plan"] == local and "rephrased" not in plan
+
+
+@pytest.fixture
+def loading_backend(monkeypatch):
+    """The torch backend, caught mid-load."""
+    backend = create_backend("torch-custom")
+    backend.state["status"] = "loading"
+    monkeypatch.setattr(backends, "_backend", backend)
+    return backend
+
+
+class TestBackgroundModelLoading:
+    def test_suggest_returns_503_while_loading(self, client, user_token, loading_backend):
+        resp = client.post(
+            "/ai/suggest?mode=description&title=Anything",
+            headers=auth_headers(user_token),
+        )
+        assert resp.status_code == 503
+        assert "Retry-After" in resp.headers
+
+    def test_other_routes_served_while_loading(self, client, user_token, loading_backend):
+        headers = auth_headers(user_token)
+        assert client.get("/health").status_code == 200
+        assert client.get("/tasks/", headers=headers).status_code == 200
+        assert client.post("/ai/suggest?mode=daily_plan", headers=headers).status_code == 200
+
+        ready = client.get("/ready").json()
+        assert ready["model"]["status"] == "loading"
+        assert ready["model"]["backend"] == "torch-custom"
+
+    def test_loader_reports_failure(self, monkeypatch):
+        def broken(*args):
+            raise OSError("weights missing")
+
+        monkeypatch.setattr(torch_custom, "_merged_is_current", lambda path: False)
+        monkeypatch.setattr(torch_custom, "_load_with_adapter", broken)
+        backend = create_backend("torch-custom")
+        backend.load()
+        state = backend.status()
+        assert state["status"] == "failed"
+        assert "weights missing" in state["error"]
+        assert state["load_seconds"] is not None
+        assert not backend.ready
+
+
+class TestBackends:
+    def test_unknown_backend_is_rejected(self):
+        with pytest.raises(ValueError):
+            create_backend("tensorflow")
+
+    def test_selection_follows_settings_and_stub_wins(self, monkeypatch):
+        monkeypatch.setattr(backends, "_backend", None)
+        monkeypatch.setattr(backends.settings, "AI_BACKEND", "openai")
+        monkeypatch.setattr(backends.settings, "USE_AI_STUB", True)
+        assert backends.get_backend().name == "stub"
+
+        monkeypatch.setattr(backends, "_backend", None)
+        monkeypatch.setattr(backends.settings, "USE_AI_STUB", False)
+        backend = backends.get_backend()
+        assert backend.name == "openai"
+        assert backend.capabilities == {"batching": False, "streaming": True}
+
+    def test_openai_backend_uses_gateway(self, fake_openai, monkeypatch, tmp_path):
+        monkeypatch.setattr(
+            ai_cache, "_cache", DescriptionCache(str(tmp_path / "cache.db"), memory_items=4, disk_items=4)
+        )
+        fake_openai.content = "Implement the login form and cover it with tests."
+        backend = create_backend("openai")
+        backend.load()
+        monkeypatch.setattr(backends, "_backend", backend)
+        result = asyncio.run(ai_service.generate_task_description("Build login"))
+        assert result == {"title": "Build login", "description": fake_openai.content, "source": "openai"}
+
+    def test_onnx_backend_matches_torch(self, tmp_path, monkeypatch):
+        """Greedy decoding through the exported KV-cache graph gives the torch output, batched too."""
+        torch = pytest.importorskip("torch")
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+        from transformers import AutoTokenizer, LlamaConfig, LlamaForCausalLM
+
+        from LLM_model_trainig.export_onnx import export_onnx
+
+        tokenizer = AutoTokenizer.from_pretrained(torch_custom.MODEL_PATH)
+        torch.manual_seed(0)
+        model = LlamaForCausalLM(LlamaConfig(
+            vocab_size=len(tokenizer), hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+            num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=128,
+        )).eval()
+        export_onnx(model, tokenizer, str(tmp_path), "tiny")
+
+        monkeypatch.setitem(torch_custom.GENERATION_PARAMS, "do_sample", False)
+        monkeypatch.setitem(torch_custom.GENERATION_PARAMS, "max_new_tokens", 8)
+        monkeypatch.setattr(backends.settings, "AI_ONNX_MODEL_PATH", str(tmp_path))
+        onnx = create_backend("onnx")
+        onnx.load()
+        assert onnx.ready and onnx.model_id == "tiny"
+
+        reference = create_backend("torch-custom")
+        reference.install(model, tokenizer, "tiny")
+        titles = ["Fix login", "Add full text search to the task list"]
+        assert onnx.generate_batch(titles) == reference.generate_batch(titles)
+
+
+class TestGenerationLimits:
+    def test_text_is_cut_at_the_earliest_stop_sequence(self):
+        assert find_stop("no stop here") == -1
+        assert trim_at_stop("Add tests.<|endoftext|>Task title: x") == "Add tests."
+        assert trim_at_stop("First paragraph.\n\nSecond one.<|endoftext|>") == "First paragraph."
+
+    def test_job_deadline_follows_budget(self):
+        assert GenerationJob("t", time_budget_s=0).deadline is None
+        assert GenerationJob("t", time_budget_s=0.0001).deadline is not None
+        job = GenerationJob("t", time_budget_s=60)
+        assert not job.should_stop()
+        job.cancelled.set()
+        assert job.should_stop()
+
+    def test_cancelled_row_stops_while_batch_continues(self, monkeypatch):
+        """A cancelled job ends its own row; the other row decodes to max_new_tokens."""
+        torch = pytest.importorskip("torch")
+        from transformers import AutoTokenizer, LlamaConfig, LlamaForCausalLM
+
+        tokenizer = AutoTokenizer.from_pretrained(torch_custom.MODEL_PATH)
+        torch.manual_seed(0)
+        model = LlamaForCausalLM(LlamaConfig(
+            vocab_size=len(tokenizer), hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+            num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=128,
+        )).eval()
+        backend = create_backend("torch-custom")
+        backend.install(model, tokenizer, "tiny")
+        monkeypatch.setitem(torch_custom.GENERATION_PARAMS, "do_sample", False)
+        monkeypatch.setitem(torch_custom.GENERATION_PARAMS, "max_new_tokens", 16)
+
+        live, cancelled = GenerationJob("Fix login"), GenerationJob("Fix logout")
+        cancelled.cancelled.set()
+        criteria = backend._stopping_criteria([live, cancelled], prompt_len=2)
+        assert criteria[0](torch.tensor([[1, 2, 3], [1, 2, 3]]), None).tolist() == [False, True]
+
+        texts = backend.generate_batch(["Fix login", "Fix logout"], jobs=[live, cancelled])
+        assert len(tokenizer(texts[1], add_special_tokens=False)["input_ids"]) <= 1
+        assert len(texts[0]) > len(texts[1])
+
+    def test_disconnected_client_cancels_suggestion(self, monkeypatch):
+        from routers import ai as ai_router
+
+        cancelled = []
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        class _GoneRequest:
+            async def is_disconnected(self):
+                return True
+
+        monkeypatch.setattr(ai_router, "DISCONNECT_POLL_S", 0.01)
+
+        async def scenario():
+            response = await ai_router._unless_disconnected(_GoneRequest(), slow())
+            await asyncio.sleep(0)
+            return response
+
+        assert asyncio.run(scenario()).status_code == 499
+        assert cancelled == [1]
+
+    def test_client_hanging_up_cancels_through_the_app(self, user_token, monkeypatch):
+        """The disconnect reaches the endpoint through the full middleware stack."""
+        from main import app
+        from routers import ai as ai_router
+        from services.logging import get_metrics
+
+        cancelled = []
+
+        async def slow(title, owner_id=None):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(title)
+                raise
+
+        monkeypatch.setattr(ai_router, "DISCONNECT_POLL_S", 0.01)
+        monkeypatch.setattr(ai_service, "generate_task_description", slow)
+        before = get_metrics()
+
+        async def scenario():
+            inbox = asyncio.Queue()
+            inbox.put_nowait({"type": "http.request", "body": b"", "more_body": False})
+            asyncio.get_running_loop().call_later(0.05, inbox.put_nowait, {"type": "http.disconnect"})
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "POST",
+                "scheme": "http",
+                "path": "/ai/suggest",
+                "raw_path": b"/ai/suggest",
+                "root_path": "",
+                "query_string": b"mode=description&title=Hang+up",
+                "headers": [(b"authorization", f"Bearer {user_token}".encode())],
+                "client": ("testclient", 50000),
+                "server": ("testserver", 80),
+            }
+            await asyncio.wait_for(app(scope, inbox.get, send), timeout=2)
+            return sent[0]
+
+        assert asyncio.run(scenario())["status"] == 499
+        assert cancelled == ["Hang up"]
+        after = get_metrics()
+        assert after["ai_requests_cancelled_total"] == before.get("ai_requests_cancelled_total", 0) + 1
+        assert after["requests_by_status_499"] == before.get("requests_by_status_499", 0) + 1
+
+
+class TestAISuggestBackpressure:
+    def test_queue_full_returns_503(self, client, user_token, monkeypatch):
+        """A saturated inference pool surfaces as 503 with Retry-After."""
+        async def saturated(title, owner_id=None):
+            raise InferenceQueueFull(retry_after=7)
+
+        monkeypatch.setattr(ai_service, "generate_task_description", saturated)
+        resp = client.post(
+            "/ai/suggest?mode=description&title=Busy",
+            headers=auth_headers(user_token),
+        )
+        assert resp.status_code == 503
+        assert resp.headers["Retry-After"] == "7"
+
+    def test_metrics_expose_queue_depth(self, client):
+        resp = client.get("/metrics")
+        assert resp.status_code == 200
+        assert "inference_queue_depth" in resp.json()
@@ -0,0 +1,92 @@
+"""Unit tests — offline description backfill (keyset chunks, bulk updates, resume, rate limit)."""
+import json
+
+import pytest
+from models import Task
+
+import backfill_descriptions as bf
+from services import openai_client, retrieval
+from services.backends import create_backend
+from services.openai_client import build_gateway
+from services.retrieval import RetrievalIndex
+
+
+class _BatchBackend:
+    name = "fake"
+
+    def __init__(self):
+        self.batches = []
+
+    def generate_batch(self, titles):
+        self.batches.append(list(titles))
+        return [f"About {title}" if "blank" not in title else "  " for title in titles]
+
+
+@pytest.fixture
+def tasks(db, regular_user, monkeypatch):
+    monkeypatch.setattr(retrieval, "_index", RetrievalIndex(max_items=16, threshold=0.85))
+    rows = [Task(title=f"Task {i}", description="", owner_id=regular_user.id) for i in range(7)]
+    rows.append(Task(title="Documented", description="Already written.", owner_id=regular_user.id))
+    rows.append(Task(title="Task blank", description=None, owner_id=regular_user.id))
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def _descriptions(db):
+    db.expire_all()
+    return {t.title: t.description for t in db.query(Task).order_by(Task.id)}
+
+
+class TestBackfill:
+    def test_fills_empty_descriptions_in_batches(self, db, tasks, tmp_path):
+        backend = _BatchBackend()
+        stats = bf.backfill(db, backend, chunk_size=4, batch_size=3, state_path=str(tmp_path / "s.json"), report=lambda _: None)
+
+        assert stats["updated"] == 7 and stats["skipped"] == 1
+        assert all(len(batch) <= 3 for batch in backend.batches)
+        descriptions = _descriptions(db)
+        assert descriptions["Task 0"] == "About Task 0"
+        assert descriptions["Documented"] == "Already written."
+        assert not descriptions["Task blank"]
+
+    def test_resumes_after_the_last_committed_batch(self, db, tasks, tmp_path):
+        state = str(tmp_path / "s.json")
+        bf.backfill(db, _BatchBackend(), chunk_size=2, batch_size=2, state_path=state, limit=4, report=lambda _: None)
+        assert json.load(open(state)) == {"last_id": tasks[3].id, "updated": 4}
+
+        backend = _BatchBackend()
+        stats = bf.backfill(db, backend, chunk_size=2, batch_size=2, state_path=state, report=lambda _: None)
+        assert backend.batches[0] == ["Task 4", "Task 5"]
+        assert stats["updated"] == 7
+
+    def test_backends_without_batching_share_one_event_loop(self, db, tasks, fake_openai, monkeypatch):
+        """Every batch through the OpenAI gateway runs on the loop its pool and semaphore are bound to."""
+        monkeypatch.setattr(openai_client.settings, "OPENAI_MAX_CONCURRENCY", 1)
+        monkeypatch.setattr(openai_client, "_gateway", build_gateway(http_client=fake_openai.http_client()))
+        fake_openai.content = "Generated upstream."
+        fake_openai.latency_s = 0.01  # so concurrent calls in a batch queue on the semaphore
+
+        stats = bf.backfill(db, create_backend("openai"), batch_size=3, state_path=None, report=lambda _: None)
+        assert stats["updated"] == 8 and fake_openai.calls == 8
+        assert _descriptions(db)["Task 6"] == "Generated upstream."
+
+    def test_description_typed_meanwhile_is_kept(self, db, tasks):
+        written = bf.write_descriptions(db, [
+            {"task_id": tasks[0].id, "new_description": "generated"},
+            {"task_id": tasks[7].id, "new_description": "generated"},
+        ])
+        assert written == 1
+        assert _descriptions(db)["Documented"] == "Already written."
+
+    def test_dry_run_writes_nothing(self, db, tasks, tmp_path):
+        bf.backfill(db, _BatchBackend(), state_path=str(tmp_path / "s.json"), dry_run=True, report=lambda _: None)
+        assert _descriptions(db)["Task 0"] == ""
+        assert not (tmp_path / "s.json").exists()
+
+    def test_rate_limiter_spaces_batches(self):
+        now, slept = [0.0], []
+        limiter = bf.RateLimiter(60, clock=lambda: now[0], sleep=slept.append)
+        limiter.acquire(2)
+        limiter.acquire(2)
+        assert slept == [2.0]
@@ -63,3 +63,46 @@ class TestAISuggestIntegration:
         """Unauthenticated request to /ai/suggest returns 401."""
         resp = client.post("/ai/suggest?mode=description&title=Test")
         assert resp.status_code == 401
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    import json
+
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestAISuggestStreamIntegration:
+    """/ai/suggest/stream delivers the stub output as Server-Sent Events."""
+
+    def test_stream_description_stub(self, client, user_token):
+        resp = client.post(
+            "/ai/suggest/stream?mode=description&title=Implement+search+feature",
+            headers=auth_headers(user_token),
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+
+        events = _parse_sse(resp.text)
+        tokens = [data["text"] for name, data in events if name == "token"]
+        name, done = events[-1]
+        assert name == "done"
+        assert len(tokens) > 1
+        assert "".join(tokens).strip() == done["description"]
+        assert done["source"] == "stub"
+        assert done["title"] == "Implement search feature"
+
+    def test_stream_daily_plan_stub(self, client, user_token):
+        resp = client.post("/ai/suggest/stream?mode=daily_plan", headers=auth_headers(user_token))
+        assert resp.status_code == 200
+        name, done = _parse_sse(resp.text)[-1]
+        assert name == "done"
+        assert done["source"] == "stub"
+        assert all("time" in item and "activity" in item for item in done["plan"])
+
+    def test_stream_description_missing_title(self, client, user_token):
+        resp = client.post("/ai/suggest/stream?mode=description", headers=auth_headers(user_token))
+        assert resp.status_code == 400
@@ -0,0 +1,23 @@
+"""Startup cost guards — heavy AI dependencies must stay lazy."""
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_app_does_not_load_ml_stack():
+    """`import main` must not pull in torch/transformers/peft/openai/onnxruntime."""
+    code = (
+        "import sys, main; "
+        "print(','.join(m for m in ('torch', 'transformers', 'peft', 'openai', 'onnxruntime') if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "DATABASE_URL": "sqlite://"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.strip() == ""
@@ -0,0 +1,151 @@
+"""Unit tests — training data pipeline (packing, cache, throughput reporting)."""
+import json
+
+import numpy as np
+import pytest
+
+from LLM_model_trainig import prepare_dataset as prep
+
+EXAMPLES = [
+    {"prompt": "Task title: Fix login", "completion": "Repair the session cookie."},
+    {"prompt": "Task title: Add search", "completion": "Index titles and descriptions."},
+]
+
+
+@pytest.fixture
+def tokenizer():
+    pytest.importorskip("transformers")
+    from transformers import AutoTokenizer
+
+    from services.backends.torch_custom import MODEL_PATH
+
+    return AutoTokenizer.from_pretrained(MODEL_PATH)
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "training_data.jsonl"
+    path.write_text("".join(json.dumps(e) + "\n" for e in EXAMPLES))
+    return path
+
+
+class TestPacking:
+    def test_examples_are_joined_with_eos_and_padded(self):
+        rows, tokens = prep.pack([[5, 6, 7], [8, 9]], eos_token_id=2, seq_len=4)
+        assert tokens == 7
+        assert rows.tolist() == [[5, 6, 7, 2], [8, 9, 2, 2]]
+        assert rows.dtype == np.uint16
+
+    def test_cache_is_reused_until_data_changes(self, tokenizer, data_file, tmp_path, monkeypatch):
+        cache_dir = str(tmp_path / "cache")
+        first = prep.prepare_dataset(tokenizer, str(data_file), seq_len=16, cache_dir=cache_dir)
+
+        monkeypatch.setattr(prep, "pack", lambda *a: pytest.fail("re-packed an unchanged dataset"))
+        assert prep.prepare_dataset(tokenizer, str(data_file), seq_len=16, cache_dir=cache_dir) == first
+        monkeypatch.undo()
+
+        with open(data_file, "a") as f:
+            f.write(json.dumps({"prompt": "Task title: New", "completion": "More data."}) + "\n")
+        assert prep.prepare_dataset(tokenizer, str(data_file), seq_len=16, cache_dir=cache_dir) != first
+
+    def test_dataset_masks_padding_of_the_last_row(self, tokenizer, data_file, tmp_path):
+        path = prep.prepare_dataset(tokenizer, str(data_file), seq_len=16, cache_dir=str(tmp_path))
+        dataset = prep.PackedDataset(path)
+        assert isinstance(dataset.rows, np.memmap)
+
+        last = dataset[len(dataset) - 1]
+        real = dataset.tokens - (len(dataset) - 1) * 16
+        assert last["attention_mask"].sum().item() == real
+        assert (last["labels"][real:] == prep.IGNORE_INDEX).all()
+        assert dataset[0]["attention_mask"].all()
+
+
+class TestTrainingThroughput:
+    def test_callback_reports_tokens_per_step(self, tokenizer, data_file, tmp_path, capsys):
+        torch = pytest.importorskip("torch")
+        from transformers import LlamaConfig, LlamaForCausalLM, Trainer, TrainingArguments, default_data_collator
+
+        from LLM_model_trainig.train_model import TokensPerSecondCallback
+
+        dataset = prep.PackedDataset(
+            prep.prepare_dataset(tokenizer, str(data_file), seq_len=16, cache_dir=str(tmp_path / "cache"))
+        )
+        torch.manual_seed(0)
+        model = LlamaForCausalLM(LlamaConfig(
+            vocab_size=len(tokenizer), hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+            num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=64,
+        ))
+        callback = TokensPerSecondCallback(dataset.tokens / len(dataset))
+        trainer = Trainer(
+            model=model,
+            args=TrainingArguments(
+                output_dir=str(tmp_path / "out"), max_steps=2, per_device_train_batch_size=1,
+                report_to=[], save_strategy="no", use_cpu=True, dataloader_pin_memory=False,
+            ),
+            train_dataset=dataset,
+            data_collator=default_data_collator,
+            callbacks=[callback],
+        )
+        trainer.train()
+
+        assert len(callback.rates) == 2 and all(rate > 0 for rate in callback.rates)
+        assert "tokens/s" in capsys.readouterr().out
+
+
+class TestCheckpointEvaluation:
+    def test_checkpoints_are_found_in_training_order(self, tmp_path):
+        from LLM_model_trainig import evaluate_checkpoints as ev
+
+        for name in ("final", "checkpoint-100", "checkpoint-50", "logs"):
+            (tmp_path / name).mkdir()
+            if name != "logs":
+                (tmp_path / name / "adapter_config.json").write_text("{}")
+        assert ev.find_checkpoints(str(tmp_path)) == ["checkpoint-50", "checkpoint-100", "final"]
+
+    def test_faster_checkpoint_wins_within_tolerance(self):
+        from LLM_model_trainig import evaluate_checkpoints as ev
+
+        results = {
+            "checkpoint-50": {"perplexity": 9.0, "latency_p50_ms": 300.0},
+            "checkpoint-100": {"perplexity": 8.0, "latency_p50_ms": 900.0},
+            "final": {"perplexity": 8.2, "latency_p50_ms": 400.0},
+            "broken": {"error": "missing weights"},
+        }
+        assert ev.choose_checkpoint(results, tolerance=0.05) == "final"
+        assert ev.choose_checkpoint(results, tolerance=0.0) == "checkpoint-100"
+        assert ev.choose_checkpoint({"broken": {"error": "x"}}) is None
+
+    def test_evaluation_reports_quality_and_cost(self, tokenizer, monkeypatch):
+        torch = pytest.importorskip("torch")
+        from transformers import LlamaConfig, LlamaForCausalLM
+
+        from LLM_model_trainig import evaluate_checkpoints as ev
+        from services.backends import torch_custom
+
+        monkeypatch.setitem(torch_custom.GENERATION_PARAMS, "max_new_tokens", 4)
+        torch.manual_seed(0)
+        model = LlamaForCausalLM(LlamaConfig(
+            vocab_size=len(tokenizer), hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+            num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=128,
+        ))
+        metrics = ev.evaluate_model(model, tokenizer, EXAMPLES)
+        assert metrics["examples"] == 2
+        assert metrics["perplexity"] > 1 and metrics["latency_p50_ms"] > 0
+        assert 0 <= metrics["hit_max_tokens"] <= 1 and metrics["length_p95"] > 0
+
+    def test_serving_marker_selects_the_adapter(self, tmp_path, monkeypatch):
+        from LLM_model_trainig import evaluate_checkpoints as ev
+        from services.backends import torch_custom
+
+        (tmp_path / "checkpoint-50").mkdir()
+        (tmp_path / "checkpoint-50" / "adapter_config.json").write_text("{}")
+        monkeypatch.setattr(torch_custom, "SERVING_MARKER", str(tmp_path / "serving.json"))
+        assert torch_custom.serving_adapter_path() == torch_custom.MODEL_PATH
+
+        results = {"checkpoint-50": {"perplexity": 5.0, "latency_p50_ms": 10.0}}
+        ev.mark_serving("checkpoint-50", results["checkpoint-50"], str(tmp_path))
+        assert "**checkpoint-50** (serving)" in ev.write_report(results, "checkpoint-50", str(tmp_path))
+        assert torch_custom.serving_adapter_path() == str(tmp_path / "checkpoint-50")
+        # merge_adapter.py / export_onnx.py resolve the same adapter from their own directory
+        assert torch_custom.serving_adapter_path(str(tmp_path)) == str(tmp_path / "checkpoint-50")
+        assert torch_custom.serving_adapter_path(str(tmp_path / "elsewhere")) == str(tmp_path / "elsewhere" / "final")
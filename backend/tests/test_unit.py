@@ -1,4 +1,6 @@
 """Unit tests — happy paths for auth and task CRUD."""
+import re
+
 import pytest
 from tests.conftest import auth_headers
 
@@ -115,3 +117,294 @@ class TestTasks:
 
         resp = client.get(f"/tasks/{task_id}", headers=headers)
         assert resp.status_code == 404
+
+
+class TestTaskListing:
+    @pytest.fixture
+    def many_tasks(self, db, regular_user, admin_user):
+        from models import Task, TaskStatus
+
+        db.add_all(
+            [Task(title=f"Mine {i}", status=TaskStatus.done if i % 3 == 0 else TaskStatus.backlog,
+                  owner_id=regular_user.id) for i in range(7)]
+            + [Task(title="Admin's", owner_id=admin_user.id)]
+        )
+        db.commit()
+
+    def test_pages_follow_next_cursor(self, client, user_token, many_tasks):
+        """Keyset pages cover every task once, in id order, then stop."""
+        headers = auth_headers(user_token)
+        seen, params = [], {"limit": 3}
+        while True:
+            resp = client.get("/tasks/", params=params, headers=headers)
+            assert resp.status_code == 200
+            assert len(resp.json()) <= 3
+            seen += [t["title"] for t in resp.json()]
+            if "X-Next-Cursor" not in resp.headers:
+                break
+            params["cursor"] = resp.headers["X-Next-Cursor"]
+        assert seen == [f"Mine {i}" for i in range(7)]
+
+    def test_filters_and_owner_scope(self, client, user_token, admin_token, admin_user, many_tasks):
+        """Status filter applies server-side; only admins may list another owner's tasks."""
+        headers = auth_headers(user_token)
+        done = client.get("/tasks/", params={"status": "done"}, headers=headers).json()
+        assert [t["title"] for t in done] == ["Mine 0", "Mine 3", "Mine 6"]
+        assert client.get("/tasks/", params={"owner_id": admin_user.id}, headers=headers).status_code == 403
+
+        admin = client.get("/tasks/", params={"owner_id": admin_user.id}, headers=auth_headers(admin_token)).json()
+        assert [t["title"] for t in admin] == ["Admin's"]
+        assert client.get("/tasks/", params={"created_after": "2999-01-01T00:00:00"}, headers=headers).json() == []
+
+    def test_page_size_is_capped_and_cursor_validated(self, client, user_token):
+        headers = auth_headers(user_token)
+        assert client.get("/tasks/", params={"limit": 10_000}, headers=headers).status_code == 422
+        assert client.get("/tasks/", params={"cursor": "not-a-cursor"}, headers=headers).status_code == 400
+
+
+class TestOptimisticConcurrency:
+    def _create(self, client, headers):
+        resp = client.post("/tasks/", json={"title": "Drag me"}, headers=headers)
+        return resp.json()["id"]
+
+    def test_if_match_rejects_stale_writes(self, client, user_token):
+        """Every write bumps the version; a write against an old ETag gets 409."""
+        headers = auth_headers(user_token)
+        task_id = self._create(client, headers)
+        assert client.get(f"/tasks/{task_id}", headers=headers).headers["ETag"] == '"1"'
+
+        resp = client.patch(f"/tasks/{task_id}", json={"title": "Renamed"}, headers={**headers, "If-Match": '"1"'})
+        assert resp.status_code == 200
+        assert resp.json()["version"] == 2 and resp.headers["ETag"] == '"2"'
+
+        stale = client.patch(f"/tasks/{task_id}", json={"title": "Lost"}, headers={**headers, "If-Match": '"1"'})
+        assert stale.status_code == 409 and stale.headers["ETag"] == '"2"'
+        stale = client.post(
+            f"/tasks/{task_id}/transition", json={"new_status": "in_progress"}, headers={**headers, "If-Match": '"1"'}
+        )
+        assert stale.status_code == 409
+
+        resp = client.post(
+            f"/tasks/{task_id}/transition", json={"new_status": "in_progress"}, headers={**headers, "If-Match": '"2"'}
+        )
+        assert resp.status_code == 200 and resp.json()["version"] == 3
+        assert client.get(f"/tasks/{task_id}", headers=headers).json()["title"] == "Renamed"
+
+    def test_racing_transitions_cannot_both_win(self, client, user_token):
+        """Two drags out of in_progress: the second one finds the status already moved."""
+        headers = auth_headers(user_token)
+        task_id = self._create(client, headers)
+        client.post(f"/tasks/{task_id}/transition", json={"new_status": "in_progress"}, headers=headers)
+
+        first = client.post(f"/tasks/{task_id}/transition", json={"new_status": "review"}, headers=headers)
+        second = client.post(f"/tasks/{task_id}/transition", json={"new_status": "backlog"}, headers=headers)
+        assert first.status_code == 200
+        assert second.status_code == 400
+        assert client.get(f"/tasks/{task_id}", headers=headers).json()["status"] == "review"
+
+    def test_transition_is_a_single_statement(self, client, user_token, admin_token):
+        """The success path is one UPDATE ... RETURNING; 404 / 403 still come back."""
+        from sqlalchemy import event
+        from tests.conftest import engine
+
+        headers = auth_headers(user_token)
+        task_id = self._create(client, headers)
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            resp = client.post(f"/tasks/{task_id}/transition", json={"new_status": "in_progress"}, headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert resp.status_code == 200 and resp.json()["updated_at"] is not None
+        task_statements = [s for s in statements if re.search(r"\btasks\b", s)]
+        assert len(task_statements) == 1 and "RETURNING" in task_statements[0]
+
+        other = client.post("/tasks/", json={"title": "Not yours"}, headers=auth_headers(admin_token)).json()["id"]
+        move = {"new_status": "in_progress"}
+        assert client.post(f"/tasks/{other}/transition", json=move, headers=headers).status_code == 403
+        assert client.post("/tasks/9999/transition", json=move, headers=headers).status_code == 404
+        assert client.patch(f"/tasks/{task_id}", json={}, headers={**headers, "If-Match": "nope"}).status_code == 400
+
+
+class TestBulkOperations:
+    def test_mixed_operations_report_per_item(self, client, user_token, admin_token):
+        """Valid operations are applied together; invalid ones come back with the single-endpoint status."""
+        headers = auth_headers(user_token)
+        ids = [client.post("/tasks/", json={"title": f"T{i}"}, headers=headers).json()["id"] for i in range(4)]
+        other = client.post("/tasks/", json={"title": "Admin's"}, headers=auth_headers(admin_token)).json()
+
+        resp = client.post("/tasks/bulk", headers=headers, json={"operations": [
+            {"op": "create", "title": "New"},
+            {"op": "update", "id": ids[0], "title": "T0 renamed", "version": 1},
+            {"op": "transition", "id": ids[1], "new_status": "in_progress"},
+            {"op": "delete", "id": ids[2]},
+            {"op": "transition", "id": ids[3], "new_status": "done"},   # not allowed from backlog
+            {"op": "update", "id": ids[0], "total_minutes": 5},         # named twice
+            {"op": "delete", "id": other["id"]},
+            {"op": "update", "id": 9999, "title": "x"},
+            {"op": "create", "title": "For admin", "owner_id": other["owner_id"]},
+        ]})
+        assert resp.status_code == 200
+        body = resp.json()
+        assert [r["status"] for r in body["results"]] == [201, 200, 200, 204, 400, 400, 403, 404, 403]
+        assert (body["applied"], body["failed"]) == (4, 5)
+        assert body["results"][1]["task"]["version"] == 2
+        assert body["results"][2]["task"]["status"] == "in_progress"
+
+        titles = {t["title"]: t for t in client.get("/tasks/", headers=headers).json()}
+        assert set(titles) == {"T0 renamed", "T1", "T3", "New"}
+        stale = client.post("/tasks/bulk", headers=headers, json={"operations": [
+            {"op": "transition", "id": ids[0], "new_status": "in_progress", "version": 1},
+        ]})
+        assert stale.json()["results"][0]["status"] == 409
+
+    def test_closing_a_sprint_is_one_request(self, client, user_token, db, regular_user):
+        """500 transitions go out as a handful of statements, not one round trip each."""
+        from sqlalchemy import event
+        from models import Task, TaskStatus
+        from tests.conftest import engine
+
+        db.add_all(Task(title=f"Story {i}", status=TaskStatus.review, owner_id=regular_user.id) for i in range(500))
+        db.commit()
+        ids = [t.id for t in db.query(Task.id)]
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            resp = client.post("/tasks/bulk", headers=auth_headers(user_token), json={
+                "operations": [{"op": "transition", "id": task_id, "new_status": "done"} for task_id in ids],
+            })
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert resp.json()["applied"] == 500
+        assert len([s for s in statements if re.search(r"\btasks\b", s)]) == 2  # check, guarded UPDATE ... RETURNING
+        assert db.query(Task).filter(Task.status == TaskStatus.done).count() == 500
+
+    def test_writes_landing_after_the_check_are_not_overwritten(self, client, user_token, db, regular_user):
+        """A task changed or deleted between the check and the write is reported as 409, never clobbered."""
+        from sqlalchemy import event
+        from models import Task, TaskStatus
+        from tests.conftest import engine
+
+        moved = Task(title="Moved meanwhile", status=TaskStatus.review, owner_id=regular_user.id)
+        edited = Task(title="Edited meanwhile", owner_id=regular_user.id)
+        gone = Task(title="Deleted meanwhile", status=TaskStatus.review, owner_id=regular_user.id)
+        untouched = Task(title="Untouched", status=TaskStatus.review, owner_id=regular_user.id)
+        db.add_all([moved, edited, gone, untouched])
+        db.commit()
+
+        def concurrent_writes(conn, cursor, statement, *args):
+            # Other requests commit right after the bulk request has checked its tasks
+            if statement.startswith("UPDATE tasks") and not concurrent_writes.done:
+                concurrent_writes.done = True
+                raw = conn.connection.cursor()
+                raw.execute("UPDATE tasks SET status = 'in_progress', version = version + 1 WHERE id = ?", (moved.id,))
+                raw.execute("UPDATE tasks SET title = 'Theirs', version = version + 1 WHERE id = ?", (edited.id,))
+                raw.execute("DELETE FROM tasks WHERE id = ?", (gone.id,))
+
+        concurrent_writes.done = False
+        event.listen(engine, "before_cursor_execute", concurrent_writes)
+        try:
+            resp = client.post("/tasks/bulk", headers=auth_headers(user_token), json={"operations": [
+                {"op": "update", "id": edited.id, "title": "Mine"},
+                {"op": "transition", "id": moved.id, "new_status": "done"},
+                {"op": "transition", "id": gone.id, "new_status": "done"},
+                {"op": "transition", "id": untouched.id, "new_status": "done"},
+            ]})
+        finally:
+            event.remove(engine, "before_cursor_execute", concurrent_writes)
+
+        assert resp.status_code == 200
+        assert [r["status"] for r in resp.json()["results"]] == [409, 409, 409, 200]
+        db.expire_all()
+        assert db.get(Task, moved.id).status == TaskStatus.in_progress  # in_progress -> done never happened
+        assert db.get(Task, edited.id).title == "Theirs"
+        assert db.get(Task, untouched.id).status == TaskStatus.done
+
+    def test_request_shape_is_validated(self, client, user_token):
+        headers = auth_headers(user_token)
+        too_many = [{"op": "create", "title": "x"}] * 1001
+        assert client.post("/tasks/bulk", json={"operations": too_many}, headers=headers).status_code == 422
+        unknown = [{"op": "archive", "id": 1}]
+        assert client.post("/tasks/bulk", json={"operations": unknown}, headers=headers).status_code == 422
+        assert client.post("/tasks/bulk", json={"operations": []}, headers=headers).status_code == 422
+
+
+class TestConditionalGet:
+    def _get(self, client, path, headers, etag=None):
+        return client.get(path, headers={**headers, **({"If-None-Match": etag} if etag else {})})
+
+    def test_task_list_revalidates_without_reading_tasks(self, client, user_token, admin_token):
+        from sqlalchemy import event
+        from tests.conftest import engine
+
+        headers = auth_headers(user_token)
+        client.post("/tasks/", json={"title": "One"}, headers=headers)
+        first = self._get(client, "/tasks/", headers)
+        etag = first.headers["ETag"]
+        assert etag.startswith('W/"') and first.headers["Cache-Control"] == "private, no-cache"
+
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            again = self._get(client, "/tasks/", headers, etag)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert again.status_code == 304 and again.content == b""
+        assert not [s for s in statements if re.search(r"\btasks\b", s)]
+
+        # Someone else's task does not invalidate my list; my own write does
+        client.post("/tasks/", json={"title": "Admin's"}, headers=auth_headers(admin_token))
+        assert self._get(client, "/tasks/", headers, etag).status_code == 304
+        task_id = first.json()[0]["id"]
+        client.post(f"/tasks/{task_id}/transition", json={"new_status": "in_progress"}, headers=headers)
+        changed = self._get(client, "/tasks/", headers, etag)
+        assert changed.status_code == 200 and changed.headers["ETag"] != etag
+        assert changed.json()[0]["status"] == "in_progress"
+
+        # The admin's view of everyone changes with any owner's write
+        admin = auth_headers(admin_token)
+        all_etag = self._get(client, "/tasks/", admin).headers["ETag"]
+        client.patch(f"/tasks/{task_id}", json={"total_minutes": 30}, headers=headers)
+        assert self._get(client, "/tasks/", admin, all_etag).status_code == 200
+
+    def test_single_task_user_and_stats(self, client, user_token, admin_token, regular_user, admin_user):
+        headers = auth_headers(user_token)
+        task_id = client.post("/tasks/", json={"title": "One"}, headers=headers).json()["id"]
+
+        etag = self._get(client, f"/tasks/{task_id}", headers).headers["ETag"]
+        assert self._get(client, f"/tasks/{task_id}", headers, f"W/{etag}").status_code == 304
+        client.patch(f"/tasks/{task_id}", json={"title": "Renamed"}, headers=headers)
+        assert self._get(client, f"/tasks/{task_id}", headers, etag).json()["title"] == "Renamed"
+
+        me = self._get(client, "/users/me", headers).headers["ETag"]
+        assert self._get(client, f"/users/{regular_user.id}", headers).headers["ETag"] == me
+        assert self._get(client, "/users/me", headers, me).status_code == 304
+        client.patch(f"/users/{regular_user.id}", json={"username": "renamed"}, headers=headers)
+        assert self._get(client, f"/users/{regular_user.id}", headers, me).json()["username"] == "renamed"
+
+        admin = auth_headers(admin_token)
+        stats = {path: self._get(client, path, admin).headers["ETag"] for path in ("/stats/top-users", "/stats/cycle-time")}
+        assert all(self._get(client, path, admin, etag).status_code == 304 for path, etag in stats.items())
+        # Deleting a user (and with them their tasks) must not bring back an old validator
+        client.delete(f"/users/{regular_user.id}", headers=admin)
+        assert all(self._get(client, path, admin, etag).status_code == 200 for path, etag in stats.items())
+
+    def test_admin_cannot_delete_themselves(self, client, admin_token, admin_user):
+        """Self-deletion would drop the admin's tasks_version from the sum behind the global ETags."""
+        admin = auth_headers(admin_token)
+        resp = client.delete(f"/users/{admin_user.id}", headers=admin)
+        assert resp.status_code == 400
+        assert self._get(client, "/users/me", admin).status_code == 200
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { api } from './api';
 
 /* ─── Design tokens ──────────────────────────────────────────────────────── */
@@ -166,15 +166,15 @@ function TaskCard({ task, onRefresh }) {
 
   const handleTransition = async (status) => {
     setTransitioning(true);
-    try { await api.tasks.transition(task.id, status); onRefresh(); }
-    catch (e) { alert(e.message); }
+    try { await api.tasks.transition(task.id, status, task.version); onRefresh(); }
+    catch (e) { alert(e.message); if (e.status === 409) onRefresh(); }
     finally { setTransitioning(false); }
   };
 
   const handleSave = async () => {
     setSaving(true);
-    try { await api.tasks.update(task.id, form); onRefresh(); setEditing(false); }
-    catch (e) { alert(e.message); }
+    try { await api.tasks.update(task.id, form, task.version); onRefresh(); setEditing(false); }
+    catch (e) { alert(e.message); if (e.status === 409) onRefresh(); }
     finally { setSaving(false); }
   };
 
@@ -188,7 +188,11 @@ function TaskCard({ task, onRefresh }) {
   const handleAISuggest = async () => {
     setAiLoading(true); setAiResult(null);
     try {
-      const r = await api.ai.suggest('description', task.title);
+      let text = '';
+      const r = await api.ai.suggestStream('description', task.title, (chunk) => {
+        text += chunk;
+        setAiResult({ description: text, source: 'streaming…', partial: true });
+      });
       setAiResult(r);
     } catch (e) { alert(e.message); }
     finally { setAiLoading(false); }
@@ -234,7 +238,7 @@ function TaskCard({ task, onRefresh }) {
                   <div style={{ fontSize: 13, color: 'var(--text)', lineHeight: 1.6, borderTop: '1px solid var(--border)', paddingTop: 8 }}>
                     <div style={{ color: 'var(--muted)', fontSize: 11, fontFamily: 'var(--font-mono)', marginBottom: 4 }}>source: {aiResult.source}</div>
                     {aiResult.description}
-                    <Btn size="sm" variant="secondary" style={{ marginTop: 8 }} onClick={() => { setForm(f => ({ ...f, description: aiResult.description })); setEditing(true); }}>Use this</Btn>
+                    {!aiResult.partial && <Btn size="sm" variant="secondary" style={{ marginTop: 8 }} onClick={() => { setForm(f => ({ ...f, description: aiResult.description })); setEditing(true); }}>Use this</Btn>}
                   </div>
                 )}
               </div>
@@ -295,11 +299,12 @@ function CreateTaskModal({ onClose, onCreated }) {
 /* ─── Daily plan panel ───────────────────────────────────────────────────── */
 function DailyPlanPanel({ onClose }) {
   const [plan, setPlan] = useState(null);
+  const [draft, setDraft] = useState('');
   const [loading, setLoading] = useState(true);
   const [err, setErr] = useState('');
 
   useEffect(() => {
-    api.ai.suggest('daily_plan')
+    api.ai.suggestStream('daily_plan', null, chunk => setDraft(d => d + chunk))
       .then(setPlan)
       .catch(e => setErr(e.message))
       .finally(() => setLoading(false));
@@ -316,7 +321,8 @@ function DailyPlanPanel({ onClose }) {
           <Btn variant="ghost" onClick={onClose} style={{ fontSize: 20, lineHeight: 1 }}>×</Btn>
         </div>
 
-        {loading && <div style={{ textAlign: 'center', color: 'var(--muted)', padding: 40, fontFamily: 'var(--font-mono)', animation: 'pulse 1.5s infinite' }}>Generating plan…</div>}
+        {loading && !draft && <div style={{ textAlign: 'center', color: 'var(--muted)', padding: 40, fontFamily: 'var(--font-mono)', animation: 'pulse 1.5s infinite' }}>Generating plan…</div>}
+        {loading && draft && <pre style={{ whiteSpace: 'pre-wrap', fontSize: 12, color: 'var(--muted)', fontFamily: 'var(--font-mono)' }}>{draft}</pre>}
         {err && <div style={{ color: 'var(--danger)' }}>{err}</div>}
         {plan && (
           <div style={{ display: 'flex', flexDirection: 'column', gap: 4 }}>
@@ -337,6 +343,19 @@ function DailyPlanPanel({ onClose }) {
 /* ─── Kanban column ──────────────────────────────────────────────────────── */
 function KanbanView({ tasks, onRefresh }) {
   const statuses = ['backlog', 'in_progress', 'review', 'done'];
+  const [completing, setCompleting] = useState(false);
+
+  // Close out the sprint: every card in review → done in one request
+  const completeReview = async (col) => {
+    setCompleting(true);
+    try {
+      const r = await api.tasks.bulk(col.map(t => ({ op: 'transition', id: t.id, new_status: 'done', version: t.version })));
+      if (r.failed) alert(`${r.failed} of ${col.length} tasks were not moved: ${r.results.find(x => x.error).error}`);
+      onRefresh();
+    } catch (e) { alert(e.message); }
+    finally { setCompleting(false); }
+  };
+
   return (
     <div style={{ display: 'grid', gridTemplateColumns: 'repeat(4, 1fr)', gap: 16, minWidth: 0 }}>
       {statuses.map(status => {
@@ -349,6 +368,9 @@ function KanbanView({ tasks, onRefresh }) {
               <span style={{ fontSize: 12, fontWeight: 700, letterSpacing: '0.08em', textTransform: 'uppercase', color: meta.color }}>{meta.label}</span>
               <span style={{ marginLeft: 'auto', fontSize: 12, color: 'var(--muted)', fontFamily: 'var(--font-mono)' }}>{col.length}</span>
             </div>
+            {status === 'review' && col.length > 1 && (
+              <Btn variant="ghost" size="sm" loading={completing} onClick={() => completeReview(col)}>Complete all → Done</Btn>
+            )}
             {col.map(task => <TaskCard key={task.id} task={task} onRefresh={onRefresh} />)}
           </div>
         );
@@ -357,30 +379,70 @@ function KanbanView({ tasks, onRefresh }) {
   );
 }
 
+/* ─── Lazy page loader ───────────────────────────────────────────────────── */
+// Fetches the next page when scrolled into view; the button covers
+// browsers without IntersectionObserver and tall viewports.
+function LoadMore({ hasMore, loading, onLoad }) {
+  const ref = useRef(null);
+  useEffect(() => {
+    if (!hasMore || !ref.current || !('IntersectionObserver' in window)) return;
+    const observer = new IntersectionObserver(entries => {
+      if (entries.some(e => e.isIntersecting)) onLoad();
+    }, { rootMargin: '200px' });
+    observer.observe(ref.current);
+    return () => observer.disconnect();
+  }, [hasMore, onLoad]);
+
+  if (!hasMore) return null;
+  return (
+    <div ref={ref} style={{ display: 'flex', justifyContent: 'center', padding: 16 }}>
+      <Btn variant="ghost" size="sm" loading={loading} onClick={onLoad}>Load more</Btn>
+    </div>
+  );
+}
+
 /* ─── Main App ───────────────────────────────────────────────────────────── */
 export default function App() {
   const [authed, setAuthed] = useState(!!localStorage.getItem('ss_token'));
   const [user, setUser] = useState(null);
   const [tasks, setTasks] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [view, setView] = useState('list');   // list | kanban
   const [showCreate, setShowCreate] = useState(false);
   const [showPlan, setShowPlan] = useState(false);
   const [filterStatus, setFilterStatus] = useState('all');
   const [searchQ, setSearchQ] = useState('');
 
+  // The status filter is applied by the server so pages stay full
+  const status = filterStatus === 'all' ? null : filterStatus;
+
   const loadData = useCallback(async () => {
     setLoading(true);
     try {
-      const [me, taskList] = await Promise.all([api.me(), api.tasks.list()]);
+      const [me, page] = await Promise.all([api.me(), api.tasks.list({ status })]);
       setUser(me);
-      setTasks(taskList);
+      setTasks(page.items);
+      setNextCursor(page.nextCursor);
     } catch (e) {
       if (e.message === 'Unauthorized') setAuthed(false);
     } finally {
       setLoading(false);
     }
-  }, []);
+  }, [status]);
+
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await api.tasks.list({ status, cursor: nextCursor });
+      setTasks(ts => [...ts, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [status, nextCursor, loadingMore]);
 
   useEffect(() => { if (authed) loadData(); }, [authed, loadData]);
 
@@ -419,7 +481,7 @@ export default function App() {
 
         {/* Quick stats */}
         <div style={{ display: 'flex', gap: 20, marginLeft: 'auto', fontSize: 12, fontFamily: 'var(--font-mono)', color: 'var(--muted)' }}>
-          <span><b style={{ color: 'var(--text)' }}>{stats.done}</b>/{stats.total} done</span>
+          <span><b style={{ color: 'var(--text)' }}>{stats.done}</b>/{stats.total}{nextCursor ? '+' : ''} done</span>
           <span><b style={{ color: 'var(--text)' }}>{stats.minutes}m</b> logged</span>
         </div>
 
@@ -460,15 +522,19 @@ export default function App() {
 
         {/* Content */}
         {view === 'kanban' ? (
-          <KanbanView tasks={filtered} onRefresh={loadData} />
+          <>
+            <KanbanView tasks={filtered} onRefresh={loadData} />
+            <LoadMore hasMore={!!nextCursor} loading={loadingMore} onLoad={loadMore} />
+          </>
         ) : (
           <div style={{ display: 'flex', flexDirection: 'column', gap: 10 }}>
             {filtered.length === 0 && (
               <div style={{ textAlign: 'center', padding: '60px 20px', color: 'var(--muted)', fontSize: 14 }}>
-                {tasks.length === 0 ? 'No tasks yet. Create one to get started!' : 'No tasks match your filters.'}
+                {tasks.length === 0 && filterStatus === 'all' ? 'No tasks yet. Create one to get started!' : 'No tasks match your filters.'}
               </div>
             )}
             {filtered.map(task => <TaskCard key={task.id} task={task} onRefresh={loadData} />)}
+            <LoadMore hasMore={!!nextCursor} loading={loadingMore} onLoad={loadMore} />
           </div>
         )}
       </main>
@@ -4,31 +4,113 @@ function getToken() {
   return localStorage.getItem('ss_token');
 }
 
-async function request(path, options = {}) {
+// Last ETag and body of each GET, per token. The server's validators come
+// from change counters, so a 304 costs it almost nothing; we replay the copy.
+const validators = new Map();
+
+async function send(path, options = {}) {
   const token = getToken();
+  const key = !options.method || options.method === 'GET' ? `${token}|${path}` : null;
+  const cached = key && validators.get(key);
   const headers = {
     'Content-Type': 'application/json',
     ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    ...(cached ? { 'If-None-Match': cached.etag } : {}),
     ...options.headers,
   };
 
   const res = await fetch(`${BASE}${path}`, { ...options, headers });
 
+  if (res.status === 304 && cached) {
+    return new Response(cached.body, { status: 200, headers: cached.headers });
+  }
+  const etag = key && res.ok && res.headers.get('ETag');
+  if (etag) {
+    validators.set(key, { etag, body: await res.clone().text(), headers: new Headers(res.headers) });
+  }
+
   if (res.status === 401) {
     localStorage.removeItem('ss_token');
+    validators.clear();
     window.location.reload();
     throw new Error('Unauthorized');
   }
 
   if (!res.ok) {
     const err = await res.json().catch(() => ({ detail: res.statusText }));
-    throw new Error(err.detail || 'Request failed');
+    const error = new Error(err.detail || 'Request failed');
+    error.status = res.status; // 409: the task changed since it was loaded
+    throw error;
   }
 
+  return res;
+}
+
+async function request(path, options = {}) {
+  const res = await send(path, options);
   if (res.status === 204) return null;
   return res.json();
 }
 
+// GET one page of a keyset-paginated list: { items, nextCursor }, where
+// nextCursor (from the X-Next-Cursor header) is null on the last page.
+async function page(path, params = {}) {
+  const query = new URLSearchParams(Object.entries(params).filter(([, v]) => v != null && v !== ''));
+  const res = await send(`${path}?${query}`);
+  return { items: await res.json(), nextCursor: res.headers.get('X-Next-Cursor') };
+}
+
+// POST a Server-Sent Events endpoint and feed `token` text to onToken as it
+// arrives. Resolves with the payload of the final `done` event.
+async function stream(path, onToken) {
+  const token = getToken();
+  const res = await fetch(`${BASE}${path}`, {
+    method: 'POST',
+    headers: { Accept: 'text/event-stream', ...(token ? { Authorization: `Bearer ${token}` } : {}) },
+  });
+
+  if (res.status === 401) {
+    localStorage.removeItem('ss_token');
+    window.location.reload();
+    throw new Error('Unauthorized');
+  }
+
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({ detail: res.statusText }));
+    throw new Error(err.detail || 'Request failed');
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      const payload = JSON.parse(data || '{}');
+      if (event === 'token') onToken?.(payload.text);
+      else if (event === 'done') result = payload;
+      else if (event === 'error') throw new Error(payload.detail || 'Stream failed');
+    }
+  }
+  return result;
+}
+
+function ifMatch(version) {
+  return version != null ? { 'If-Match': `"${version}"` } : {};
+}
+
 export const api = {
   login: (username, password) => {
     const body = new URLSearchParams({ username, password });
@@ -40,11 +122,16 @@ export const api = {
   register: (data) => request('/auth/register', { method: 'POST', body: JSON.stringify(data) }),
   me: () => request('/users/me'),
   tasks: {
-    list: () => request('/tasks/'),
+    // params: status, owner_id, created_after/_before, updated_after/_before, limit, cursor
+    list: (params) => page('/tasks/', params),
     create: (data) => request('/tasks/', { method: 'POST', body: JSON.stringify(data) }),
-    update: (id, data) => request(`/tasks/${id}`, { method: 'PATCH', body: JSON.stringify(data) }),
+    // version: the task's version when it was loaded, sent as If-Match
+    update: (id, data, version) => request(`/tasks/${id}`, { method: 'PATCH', body: JSON.stringify(data), headers: ifMatch(version) }),
     delete: (id) => request(`/tasks/${id}`, { method: 'DELETE' }),
-    transition: (id, new_status) => request(`/tasks/${id}/transition`, { method: 'POST', body: JSON.stringify({ new_status }) }),
+    // operations: [{ op: 'create' | 'update' | 'transition' | 'delete', id, version, ... }]
+    // resolves to { applied, failed, results: [{ index, status, task, error }] }
+    bulk: (operations) => request('/tasks/bulk', { method: 'POST', body: JSON.stringify({ operations }) }),
+    transition: (id, new_status, version) => request(`/tasks/${id}/transition`, { method: 'POST', body: JSON.stringify({ new_status }), headers: ifMatch(version) }),
   },
   ai: {
     suggest: (mode, title) => {
@@ -52,6 +139,11 @@ export const api = {
       if (title) params.set('title', title);
       return request(`/ai/suggest?${params}`, { method: 'POST' });
     },
+    suggestStream: (mode, title, onToken) => {
+      const params = new URLSearchParams({ mode });
+      if (title) params.set('title', title);
+      return stream(`/ai/suggest/stream?${params}`, onToken);
+    },
   },
   stats: {
     topUsers: () => request('/stats/top-users'),